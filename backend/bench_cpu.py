@@ -0,0 +1,196 @@
+# =============================================================
+# 🟦 De Facto — Micro-benchmarks du travail CPU local
+# =============================================================
+# Mesure les chemins chauds qui ne dépendent pas du réseau :
+#   - extract_json sur des réponses longues ou mal formées
+#   - compute_score
+#   - fallback BeautifulSoup sur une grosse page HTML
+#   - construction AnalyzeResponse + model_dump
+#   - json.dumps de la réponse (historique / réponse HTTP)
+#
+# Données : les analyses de logs.jsonl (extraits, résumés, commentaires)
+# servent à fabriquer des réponses réalistes ; les pages HTML sont
+# construites à partir de ces textes, ou lues dans --pages (pages
+# réellement enregistrées, *.html).
+#
+# Chaque mesure = meilleur temps par appel sur plusieurs répétitions,
+# divisé par le temps d'une boucle Python de référence mesurée juste
+# avant : le ratio compense la vitesse de la machine et ses variations
+# (CPU partagé, turbo), ce qui permet de garder une baseline commune.
+# Elle est stockée dans bench_cpu_baseline.json : un cas dont le ratio
+# dépasse baseline × (1 + seuil) fait échouer le script (code de sortie 1).
+#
+# Usage (depuis backend/) :
+#   python3 bench_cpu.py                    # compare à la baseline (seuil 25 %)
+#   python3 bench_cpu.py --threshold 0.10
+#   python3 bench_cpu.py --save-baseline    # après une optimisation voulue
+#   python3 bench_cpu.py --pages pages/     # ajoute des pages HTML réelles
+# La suite pytest lance les mêmes cas (tests/test_bench_cpu.py) : une
+# régression au-delà du seuil fait échouer le build.
+# =============================================================
+
+import argparse, glob, json, os, platform, sys, tempfile, timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "bench_cpu_baseline.json")
+LOGS_FILE = os.path.join(HERE, "..", "logs.jsonl")
+
+# Pas de logs ni de traces pendant la mesure, données dans un dossier jetable
+# (sous pytest, server est déjà importé avec la configuration de conftest.py)
+if "server" not in sys.modules:
+    _tmp = tempfile.mkdtemp(prefix="defacto-bench-cpu-")
+    os.environ.update({"LOG_LEVEL": "ERROR", "ENABLE_TRACING": "0", "DATA_DIR": _tmp,
+                       "HISTORY_FILE": os.path.join(_tmp, "logs.jsonl")})
+sys.path.insert(0, HERE)
+import server
+
+def load_entries() -> list:
+    with open(LOGS_FILE, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return [e for e in entries if e.get("resume")]
+
+def fake_axes(entry: dict) -> dict:
+    """Axes complets dans le format de evaluate_axes, à partir d'une analyse réelle."""
+    note = server.snap_note(entry.get("score_global", 60))
+    justification = entry.get("commentaire", "") * 3
+    return {
+        category: {key: {"note": note, "justification": justification} for key in axes_def}
+        for category, axes_def in server.AXES_CONFIG.items()
+    }
+
+def fake_response(entry: dict) -> dict:
+    axes = fake_axes(entry)
+    for category, axes_def in server.AXES_CONFIG.items():
+        for key, meta in axes_def.items():
+            axes[category][key].update(couleur=server.color_for(axes[category][key]["note"]),
+                                       label=meta["label"], tooltip=meta["tooltip"])
+    score = entry.get("score_global", 60)
+    return {
+        "score_global": score, "couleur_global": server.color_for(score),
+        "resume": entry["resume"], "commentaire": entry.get("commentaire", ""),
+        "axes": axes, "justesse": score, "completude": score, "ton": score, "sophismes": score,
+        "confiance_analyse": 80, "explication_confiance": "3 évaluations indépendantes : notes identiques.",
+    }
+
+def long_model_output(entries: list) -> str:
+    """Réponse de modèle bavarde : texte autour, bloc ```json, accents, gros JSON."""
+    payload = {"axes": fake_axes(entries[0]), "notes": [e["resume"] for e in entries]}
+    return ("Voici mon évaluation détaillée du texte.\n```json\n"
+            + json.dumps(payload, ensure_ascii=False, indent=2)
+            + "\n```\nJ'espère que cela vous aide.")
+
+def malformed_model_output(entries: list) -> str:
+    """JSON tronqué (réponse coupée par max_tokens) → chemin d'erreur + fallback."""
+    return long_model_output(entries)[:-200].replace("```", "")
+
+def build_page(entries: list, repeat: int = 40) -> str:
+    """Page d'article lourde : menus, scripts, styles, pied de page, commentaires."""
+    paragraphs = "".join(
+        f"<p>{e.get('input_excerpt', '')}</p><p>{e['resume']}</p><p>{e.get('commentaire', '')}</p>"
+        for e in entries
+    )
+    nav = "".join(f'<li><a href="/rubrique/{i}">Rubrique {i}</a></li>' for i in range(200))
+    script = "<script>" + "var x = {};" * 2000 + "</script>"
+    return (
+        "<!doctype html><html><head><title>Article de test</title>"
+        f"<style>{'.c{color:red}' * 1000}</style>{script}</head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header><main><article>{paragraphs * repeat}</article>"
+        f"<section class='comments'>{paragraphs}</section></main><footer>{nav}</footer></body></html>"
+    )
+
+def cases(entries: list, pages: list) -> dict:
+    response = fake_response(entries[1])
+    axes = fake_axes(entries[1])
+    long_out = long_model_output(entries)
+    bad_out = malformed_model_output(entries)
+    history_item = {"timestamp": entries[1]["timestamp"], "input_excerpt": entries[1].get("input_excerpt", ""),
+                    "response": response}
+    result = {
+        "extract_json.long": lambda: server.extract_json(long_out, {}),
+        "extract_json.malformed": lambda: server.extract_json(bad_out, {}),
+        "compute_score": lambda: server.compute_score(axes),
+        "bs4_fallback.generated": (lambda page: lambda: server.text_from_page(page))(build_page(entries)),
+        "AnalyzeResponse.build_dump": lambda: server.AnalyzeResponse(**response).model_dump(),
+        "json.dumps.response": lambda: json.dumps(history_item, ensure_ascii=False),
+    }
+    for path in pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            page = f.read()
+        result[f"bs4_fallback.{os.path.basename(path)}"] = (lambda p: lambda: server.text_from_page(p))(page)
+    return result
+
+def measure(fn, repeat: int) -> float:
+    """Meilleur temps par appel (µs) : autorange puis `repeat` répétitions."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def reference_work():
+    """Charge de référence : dict, str et arithmétique en pur Python."""
+    d = {}
+    for i in range(500):
+        d[str(i)] = i * i
+    return sum(len(k) for k in d)
+
+def measure_relative(fn, repeat: int) -> tuple:
+    """(µs par appel, ratio au temps de référence mesuré dans la foulée)."""
+    ref_us = measure(reference_work, repeat)
+    us = measure(fn, repeat)
+    ref_us = min(ref_us, measure(reference_work, repeat))
+    return us, us / ref_us
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+def run_cases(pages: list = (), only: str = None, repeat: int = 5):
+    """Mesure chaque cas : (nom, µs par appel, ratio), au fil de l'eau."""
+    for name, fn in cases(load_entries(), pages).items():
+        if only and only not in name:
+            continue
+        us, ratio = measure_relative(fn, repeat)
+        yield name, us, ratio
+
+def is_regression(ratio: float, ref: float, threshold: float) -> bool:
+    return bool(ref) and ratio > ref * (1 + threshold)
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks CPU avec baseline et seuil de régression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="régression tolérée (0.25 = +25 %%)")
+    parser.add_argument("--repeat", type=int, default=5, help="répétitions par cas")
+    parser.add_argument("--pages", help="dossier de pages HTML enregistrées (*.html)")
+    parser.add_argument("--only", help="ne lancer que les cas dont le nom contient ce texte")
+    parser.add_argument("--save-baseline", action="store_true", help="enregistre les mesures comme baseline")
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(args.pages, "*.html"))) if args.pages else []
+    baseline = load_baseline()
+
+    results, regressions = {}, []
+    print(f"{'cas':36} {'µs/appel':>12} {'ratio':>10} {'baseline':>10} {'écart':>8}")
+    for name, us, ratio in run_cases(pages, args.only, args.repeat):
+        results[name] = round(ratio, 4)
+        ref = baseline.get(name)
+        delta = f"{(ratio / ref - 1) * 100:+.0f}%" if ref else "—"
+        flag = ""
+        if is_regression(ratio, ref, args.threshold):
+            regressions.append(name)
+            flag = "  ❌"
+        print(f"{name:36} {us:>12.1f} {ratio:>10.3f} {ref or '—':>10} {delta:>8}{flag}")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "results": {**baseline, **results}}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n💾 baseline enregistrée : {BASELINE_FILE}")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de +{args.threshold:.0%} : {', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print(f"\n✅ aucune régression au-delà de +{args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# =============================================================
+# 🟦 De Facto — Payloads compacts : tokens économisés vs scores
+# =============================================================
+# Pour chaque entrée d'un corpus (URL ou texte par ligne) :
+#   A) étapes 5-6 avec l'ancien payload (json.dumps brut)
+#   B) étapes 5-6 avec le payload compact (LEAN_PAYLOADS)
+# Les étapes 1 à 4 sont mémoïsées (STEP_MEMO) : A et B voient
+# exactement les mêmes résumés, présupposés et sources ; les étapes
+# 5 à 8 sont toujours rejouées.
+# On compare les tokens envoyés et les scores obtenus. Les notes ont
+# leur propre bruit d'une exécution à l'autre : --noise rejoue A une
+# 2e fois pour mesurer ce bruit de fond (écart A/A vs écart A/B).
+#
+# Appelle réellement OpenAI (et Google CSE si configuré).
+# Usage (depuis backend/) :
+#   python3 bench_payload.py corpus.txt
+#   python3 bench_payload.py corpus.txt --noise --limit 50
+# =============================================================
+
+import argparse, os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.environ["STEP_MEMO"] = "1"
+os.environ.setdefault("DATA_DIR", os.path.join(HERE, "..", "data", "bench-payload"))
+os.environ.setdefault("HISTORY_FILE", os.path.join(os.environ["DATA_DIR"], "logs.jsonl"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, HERE)
+import server
+
+def read_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+DOWNSTREAM_STEPS = ("compare", "evaluate_axes", "synthesis")
+
+def run(text: str, lean: bool) -> dict:
+    """Analyse complète : étapes 1-4 mémoïsées, étapes 5 à 8 toujours rejouées."""
+    server.ENABLE_LEAN_PAYLOADS = lean
+    server.db().execute(
+        f"DELETE FROM step_memo WHERE step IN ({','.join('?' * len(DOWNSTREAM_STEPS))})", DOWNSTREAM_STEPS
+    )
+    start_id = server.db().execute("SELECT COALESCE(MAX(id), 0) FROM payload_stats").fetchone()[0]
+    result = server.run_pipeline(text)
+    tokens = server.db().execute(
+        "SELECT COALESCE(SUM(CASE WHEN ? THEN tokens_after ELSE tokens_before END), 0) "
+        "FROM payload_stats WHERE id > ?", (lean, start_id)
+    ).fetchone()[0]
+    return {"score": result["score_global"], "couleur": result["couleur_global"], "tokens": tokens}
+
+def main():
+    parser = argparse.ArgumentParser(description="Payloads compacts : tokens économisés et stabilité des scores")
+    parser.add_argument("corpus", help="fichier texte : une URL ou un texte par ligne")
+    parser.add_argument("--limit", type=int, default=0, help="nombre maximum d'entrées")
+    parser.add_argument("--noise", action="store_true", help="mesure aussi le bruit A/A")
+    args = parser.parse_args()
+
+    inputs = read_corpus(args.corpus)[:args.limit or None]
+    rows = []
+    print(f"{'#':>3} {'tokens A':>9} {'tokens B':>9} {'score A':>8} {'score B':>8}"
+          + (f" {'score A2':>9}" if args.noise else ""))
+    for i, entry in enumerate(inputs, 1):
+        text = entry
+        if entry.startswith(("http://", "https://")):
+            text = server.extract_article_from_url(entry)[:8000]
+            if len(text) <= 300:
+                print(f"{i:>3} extraction impossible : {entry}")
+                continue
+        try:
+            a = run(text, lean=False)
+            b = run(text, lean=True)
+            a2 = run(text, lean=False) if args.noise else None
+        except Exception as e:
+            print(f"{i:>3} erreur : {type(e).__name__}: {e}")
+            continue
+        rows.append((a, b, a2))
+        print(f"{i:>3} {a['tokens']:>9} {b['tokens']:>9} {a['score']:>5} {a['couleur']} {b['score']:>5} {b['couleur']}"
+              + (f" {a2['score']:>6} {a2['couleur']}" if a2 else ""))
+
+    if not rows:
+        return
+    n = len(rows)
+    before = sum(a["tokens"] for a, _, _ in rows)
+    after = sum(b["tokens"] for _, b, _ in rows)
+    print(f"\n🧮 tokens (étapes 5-6) : {before} → {after} ({(1 - after / max(before, 1)) * 100:.0f}% économisés, "
+          f"{(before - after) / n:.0f} par analyse)")
+    print(f"🎯 A/B : écart moyen {sum(abs(a['score'] - b['score']) for a, b, _ in rows) / n:.1f} pts, "
+          f"{sum(a['couleur'] != b['couleur'] for a, b, _ in rows)}/{n} changements de couleur")
+    if args.noise:
+        print(f"🎲 A/A (bruit) : écart moyen {sum(abs(a['score'] - a2['score']) for a, _, a2 in rows) / n:.1f} pts, "
+              f"{sum(a['couleur'] != a2['couleur'] for a, _, a2 in rows)}/{n} changements de couleur")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# =============================================================
+# 🟦 De Facto — Benchmark du pipeline sur cassettes (sans réseau)
+# =============================================================
+# 1) record : analyse un corpus fixe d'articles avec les vrais services
+#    (OpenAI, Google CSE, sites d'info) et enregistre chaque échange
+#    dans des cassettes (voir CASSETTE_MODE dans server.py)
+# 2) replay : rejoue exactement les mêmes analyses à partir des
+#    cassettes, à la vitesse enregistrée (--fast : instantanément)
+#    → les durées sont comparables d'un run à l'autre.
+#
+# Pour que les requêtes soient identiques entre record et replay, les
+# états qui dépendent de l'ordre des analyses sont désactivés : corpus
+# local, index vectoriel, cache de preuves, quasi-doublons. Chaque run
+# utilise un DATA_DIR temporaire ; seules les cassettes sont gardées.
+# Le CX Google CSE entre dans la clé des cassettes : record le note dans
+# <cassettes>/meta.json, replay le reprend (inutile de le configurer).
+#
+# Usage (depuis backend/) :
+#   python3 bench_pipeline.py record corpus.txt           # une URL ou un texte par ligne
+#   python3 bench_pipeline.py replay corpus.txt --concurrency 8
+#   python3 bench_pipeline.py replay corpus.txt --fast    # CPU local seulement
+# =============================================================
+
+import argparse, json, os, sys, tempfile, time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+META_FILE = "meta.json"
+
+def read_meta(cassettes: str) -> dict:
+    try:
+        with open(os.path.join(cassettes, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_meta(cassettes: str):
+    """Paramètres de l'enregistrement qui entrent dans les clés des cassettes."""
+    os.makedirs(cassettes, exist_ok=True)
+    with open(os.path.join(cassettes, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"cse_cx": os.getenv("GOOGLE_CSE_CX"),
+                   "recorded_at": datetime.now(timezone.utc).isoformat()}, f, indent=2)
+
+def configure(mode: str, cassettes: str):
+    """Variables lues par server.py à l'import : à poser AVANT `import server`."""
+    tmp = tempfile.mkdtemp(prefix="defacto-bench-")
+    os.environ.update({
+        "CASSETTE_MODE": mode,
+        "CASSETTE_DIR": cassettes,
+        "DATA_DIR": tmp,
+        "HISTORY_FILE": os.path.join(tmp, "logs.jsonl"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "ENABLE_LOCAL_CORPUS": "0",
+        "ENABLE_VECTOR_INDEX": "0",
+        "ENABLE_EVIDENCE_CACHE": "0",
+        "ENABLE_NEAR_DUP": "0",
+    })
+    if mode.startswith("replay"):
+        # Aucun appel réel possible : fausses clés, mêmes requêtes
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+        os.environ.setdefault("GOOGLE_CSE_API_KEY", "replay")
+        cx = read_meta(cassettes).get("cse_cx")
+        if cx:
+            os.environ["GOOGLE_CSE_CX"] = cx  # sinon aucune cassette CSE ne correspond
+        else:
+            print(f"⚠️  {META_FILE} absent ou sans CX : les recherches Google CSE ne seront pas rejouées")
+            os.environ.setdefault("GOOGLE_CSE_CX", "replay")
+
+def read_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline sur cassettes enregistrées")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("corpus", help="fichier texte : une URL ou un texte par ligne")
+    parser.add_argument("--cassettes", default=os.path.join(HERE, "..", "data", "cassettes"),
+                        help="dossier des cassettes")
+    parser.add_argument("--fast", action="store_true", help="rejeu instantané (sans les latences réseau)")
+    parser.add_argument("--concurrency", type=int, default=1, help="analyses simultanées")
+    args = parser.parse_args()
+
+    mode = "replay-fast" if args.mode == "replay" and args.fast else args.mode
+    configure(mode, os.path.abspath(args.cassettes))
+    sys.path.insert(0, HERE)
+    import server
+    if mode == "record":
+        save_meta(os.path.abspath(args.cassettes))  # après load_dotenv : CX de .env compris
+
+    inputs = read_corpus(args.corpus)
+    client = server.app.test_client()
+
+    def one(text: str):
+        t0 = time.perf_counter()
+        r = client.post("/analyze", json={"text": text, "force": True})
+        return time.perf_counter() - t0, r.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, inputs))
+    elapsed = time.perf_counter() - start
+
+    latencies = [d for d, status in results if status == 200]
+    failures = len(results) - len(latencies)
+    print(f"\n📼 {mode} · {len(inputs)} analyses · {args.concurrency} simultanées · cassettes : {args.cassettes}")
+    if failures:
+        print(f"❌ {failures} échecs (cassette manquante ? relancer en mode record)")
+    if latencies:
+        print(f"⏱️  {elapsed:.2f}s au total → {len(latencies) / elapsed * 60:.1f} analyses/min")
+        print(f"    p50 {percentile(latencies, 0.5):.3f}s · p95 {percentile(latencies, 0.95):.3f}s · "
+              f"max {max(latencies):.3f}s")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
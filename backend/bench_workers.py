@@ -0,0 +1,188 @@
+# =============================================================
+# 🟦 De Facto — Benchmark des modèles de workers gunicorn
+# =============================================================
+# Compare le débit d'analyses concurrentes :
+#   A) gunicorn par défaut (workers "sync")
+#   B) gunicorn.conf.py (workers "gthread")
+# contre un FAUX backend OpenAI local (latence simulée), sans réseau
+# ni clé API. Google CSE est désactivé (pas de clé → étape 4 vide).
+#
+# Usage (depuis la racine du projet) :
+#   python3 backend/bench_workers.py --requests 40 --concurrency 20 --latency 0.5
+# =============================================================
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Une seule réponse JSON valable pour TOUTES les étapes du pipeline
+MOCK_CONTENT = {
+    "message": "Message global simulé.",
+    "opinion_retention": "Perception simulée.",
+    "sujets_majeurs": ["politique"],
+    "resume": "Résumé simulé.",
+    "faits": [{"texte": "Fait simulé."}],
+    "opinions": ["Opinion simulée."],
+    "presupposes": [],
+    "reason": "Texte simulé.",
+    "faits_manquants": [],
+    "contradictions": [],
+    "divergences": [],
+    "impact": "faible",
+    "perception_impactee": "",
+    "axes": {
+        "fond": {
+            "Vrai": {"note": 80, "justification": "Simulé."},
+            "Complet": {"note": 60, "justification": "Simulé."},
+        },
+        "forme": {
+            "Neutre": {"note": 80, "justification": "Simulé."},
+            "Logique": {"note": 80, "justification": "Simulé."},
+        },
+    },
+}
+
+
+def make_mock_handler(latency: float):
+    class MockOpenAI(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(latency)
+            n = body.get("n", 1)
+            payload = json.dumps({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [
+                    {
+                        "index": i,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": json.dumps(MOCK_CONTENT, ensure_ascii=False)},
+                    }
+                    for i in range(n)
+                ],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return MockOpenAI
+
+
+def start_mock_openai(latency: float) -> str:
+    """Démarre le faux backend OpenAI dans un thread, renvoie son URL de base."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_mock_handler(latency))
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Serveur injoignable : {url}")
+
+
+def run_scenario(name: str, gunicorn_args: list, env: dict, n_requests: int, concurrency: int) -> dict:
+    port = free_port()
+    cmd = [sys.executable, "-m", "gunicorn", f"--bind=127.0.0.1:{port}", *gunicorn_args, "backend.server:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(base + "/history?limit=1")
+
+        def one(i):
+            t0 = time.perf_counter()
+            r = requests.post(base + "/analyze", json={"text": f"Texte de benchmark numéro {i}."}, timeout=600)
+            r.raise_for_status()
+            return time.perf_counter() - t0
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(one, range(n_requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    return {
+        "scenario": name,
+        "elapsed_s": round(elapsed, 2),
+        "analyses_per_min": round(n_requests / elapsed * 60, 1),
+        "p50_s": round(latencies[len(latencies) // 2], 2),
+        "p95_s": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs gthread contre un faux backend OpenAI.")
+    parser.add_argument("--requests", type=int, default=40, help="nombre d'analyses envoyées")
+    parser.add_argument("--concurrency", type=int, default=20, help="analyses simultanées côté client")
+    parser.add_argument("--latency", type=float, default=0.5, help="latence simulée d'un appel OpenAI (s)")
+    parser.add_argument("--workers", type=int, default=2, help="processus gunicorn (identique pour A et B)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="defacto-bench-")
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": start_mock_openai(args.latency),
+        "OPENAI_API_KEY": "mock",
+        "GOOGLE_CSE_API_KEY": "",
+        "GOOGLE_CSE_CX": "",
+        "LOG_LEVEL": "WARNING",
+        "DATA_DIR": tmp,
+        "HISTORY_FILE": os.path.join(tmp, "logs.jsonl"),
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+
+    results = [
+        run_scenario("A) sync (défaut)", ["--config=/dev/null", f"--workers={args.workers}"],
+                     env, args.requests, args.concurrency),
+        run_scenario("B) gunicorn.conf.py (gthread)", ["--config=gunicorn.conf.py"],
+                     env, args.requests, args.concurrency),
+    ]
+
+    print(f"\n{args.requests} analyses, {args.concurrency} simultanées, "
+          f"{args.workers} workers, latence OpenAI simulée {args.latency}s\n")
+    print(f"{'scénario':32} {'durée':>8} {'analyses/min':>13} {'p50':>7} {'p95':>7}")
+    for r in results:
+        print(f"{r['scenario']:32} {r['elapsed_s']:>7}s {r['analyses_per_min']:>13} "
+              f"{r['p50_s']:>6}s {r['p95_s']:>6}s")
+    gain = results[1]["analyses_per_min"] / results[0]["analyses_per_min"]
+    print(f"\n➡️  Gain de débit : x{gain:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# =============================================================
+# 🟦 De Facto — Scoring en masse (audits hors ligne, sans Flask)
+# =============================================================
+# Analyse une liste d'URL ou de textes avec le même pipeline que
+# /analyze (extract_article_from_url + run_pipeline) et écrit un
+# résultat par entrée en JSONL ou CSV.
+#
+# 🔁 Fonctionnement :
+# 1) Entrées : une URL ou un texte par ligne (ou une ligne JSON {"text": …})
+# 2) Reprise : chaque entrée terminée est notée dans <sortie>.ckpt ;
+#    relancer la même commande reprend là où le run s'est arrêté
+# 3) Cache : une URL déjà présente dans l'historique, ou un texte déjà
+#    (presque) analysé, n'est pas ré-analysé (--force pour ignorer)
+# 4) Analyses en parallèle (--concurrency), écritures dans le thread principal
+# 5) Débit (analyses/min) et temps restant estimé affichés en continu
+#
+# Usage (depuis backend/) :
+#   python3 bulk_score.py urls.txt -o audit.jsonl --concurrency 8
+#   python3 bulk_score.py urls.txt -o audit.csv              # format déduit de l'extension
+#   python3 bulk_score.py urls.txt -o audit.jsonl --restart  # ignore le checkpoint
+#   python3 bulk_score.py urls.txt -o v2.jsonl --memo         # après retouche d'un prompt :
+#       seules les étapes dont le prompt ou les entrées ont changé sont rejouées
+# =============================================================
+
+import argparse, csv, json, os, re, sys, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import server
+
+CSV_FIELDS = ["id", "input", "status", "score_global", "couleur_global", "fond.Vrai", "fond.Complet",
+              "forme.Neutre", "forme.Logique", "confiance_analyse", "resume", "error", "duree_s"]
+
+def read_inputs(path: str) -> list:
+    """Entrées du fichier : (id, entrée) ; id = empreinte de l'entrée."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["text"].strip()
+            items.append((server.text_sha(line)[:16], line))
+    return list(dict(items).items())  # dédoublonnage, ordre conservé
+
+def row_from_item(item: dict) -> dict:
+    """Résultat compact à partir d'une ligne d'historique."""
+    return {
+        "score_global": item["score_global"],
+        "couleur_global": item["couleur_global"],
+        "notes": item.get("notes", {}),
+        "confiance_analyse": item.get("response", {}).get("confiance_analyse"),
+        "resume": item["resume"],
+    }
+
+def history_by_url() -> dict:
+    """URL déjà analysées → dernier résultat, score aux poids actuels (une seule lecture de logs.jsonl)."""
+    known = {}
+    weights = server.axis_weights()
+    for line in server.iter_lines_forward(server.HISTORY_FILE):
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        if item.get("url") and "notes" in item:
+            known[item["url"]] = row_from_item(server.with_current_score(item, weights))
+    return known
+
+class BulkScorer:
+    def __init__(self, concurrency: int, force: bool, full: bool):
+        self.concurrency = concurrency
+        self.force = force
+        self.full = full
+        self.known_urls = {} if force else history_by_url()
+        self.stats = {"ok": 0, "cache": 0, "error": 0}
+
+    def score(self, item_id: str, entry: str) -> dict:
+        """Une entrée → une ligne de résultat (jamais d'exception)."""
+        server.start_request_logging(f"bulk-{item_id}")
+        t0 = time.perf_counter()
+        row = {"id": item_id, "input": entry[:300]}
+        try:
+            with server.StepTimer("bulk.analyze", cat="request", id=item_id):
+                row.update(self._score(entry))
+        except Exception as e:
+            row.update(status="error", error=f"{type(e).__name__}: {e}")
+        row["duree_s"] = round(time.perf_counter() - t0, 2)
+        return row
+
+    def _score(self, entry: str) -> dict:
+        source_url = None
+        text = entry
+        if re.match(r"^https?://", entry):
+            if entry in self.known_urls:
+                return {"status": "cache", **self.known_urls[entry]}
+            source_url = entry
+            text = server.extract_article_from_url(entry)
+            if len(text) <= 300:
+                return {"status": "error", "error": "extraction impossible"}
+            text = text[:8000]
+
+        if not self.force:
+            previous = server.find_previous_analysis(text)
+            if previous is not None:
+                item = server.build_history_item(text, source_url, previous)
+                return {"status": "cache", **row_from_item(item), **self._full(previous)}
+
+        result = server.run_pipeline(text)
+        item = server.build_history_item(text, source_url, result)
+        server.append_history(item)
+        return {"status": "ok", **row_from_item(item), **self._full(result)}
+
+    def _full(self, result: dict) -> dict:
+        return {"response": result} if self.full else {}
+
+class ResultWriter:
+    """Sortie JSONL ou CSV + checkpoint (ids terminés), ouverts en ajout."""
+    def __init__(self, path: str, fmt: str, restart: bool):
+        self.fmt = fmt
+        self.ckpt_path = path + ".ckpt"
+        if restart:
+            for p in (path, self.ckpt_path):
+                if os.path.exists(p):
+                    os.remove(p)
+        self.done = set()
+        if os.path.exists(self.ckpt_path):
+            with open(self.ckpt_path, encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.out = open(path, "a", encoding="utf-8", newline="")
+        self.ckpt = open(self.ckpt_path, "a", encoding="utf-8")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new_file:
+                self.csv.writeheader()
+
+    def write(self, row: dict):
+        if self.fmt == "csv":
+            self.csv.writerow({**row, **row.get("notes", {})})
+        else:
+            self.out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.out.flush()
+        # Checkpoint APRÈS le résultat : une entrée notée est forcément écrite
+        self.ckpt.write(row["id"] + "\n")
+        self.ckpt.flush()
+
+    def close(self):
+        self.out.close()
+        self.ckpt.close()
+
+def progress(done: int, total: int, start: float, stats: dict):
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    rate = done / elapsed
+    eta = (total - done) / rate if rate else 0
+    print(f"\r⏳ {done}/{total} · {stats['ok']} analysées · {stats['cache']} en cache · "
+          f"{stats['error']} erreurs · {rate * 60:.1f}/min · reste {int(eta // 60)}:{int(eta % 60):02d}",
+          end="", flush=True)
+
+def run(inputs: list, scorer: BulkScorer, writer: ResultWriter):
+    todo = [(i, e) for i, e in inputs if i not in writer.done]
+    if len(todo) < len(inputs):
+        print(f"↩️  reprise : {len(inputs) - len(todo)} entrées déjà faites")
+
+    start = time.perf_counter()
+    done = 0
+    pending = set()
+    queue = iter(todo)
+    # Fenêtre glissante : on ne soumet que 2 × concurrency entrées d'avance
+    with ThreadPoolExecutor(max_workers=scorer.concurrency) as pool:
+        try:
+            while True:
+                while len(pending) < scorer.concurrency * 2:
+                    nxt = next(queue, None)
+                    if nxt is None:
+                        break
+                    pending.add(pool.submit(scorer.score, *nxt))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = future.result()
+                    writer.write(row)
+                    scorer.stats[row["status"]] += 1
+                    done += 1
+                progress(done, len(todo), start, scorer.stats)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("\n⏸️  interrompu : relancer la même commande pour reprendre")
+            raise
+
+    elapsed = time.perf_counter() - start
+    if todo:
+        print()
+    s = scorer.stats
+    print(f"✅ {s['ok']} analysées · {s['cache']} en cache · {s['error']} erreurs "
+          f"en {elapsed:.1f}s → {done / max(elapsed, 1e-6) * 60:.1f} entrées/min")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring en masse d'URL ou de textes")
+    parser.add_argument("inputs", help="fichier : une URL ou un texte par ligne")
+    parser.add_argument("-o", "--output", required=True, help="fichier de sortie (.jsonl ou .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="par défaut : selon l'extension")
+    parser.add_argument("--concurrency", type=int, default=8, help="analyses simultanées")
+    parser.add_argument("--force", action="store_true", help="ré-analyser même les entrées en cache")
+    parser.add_argument("--full", action="store_true", help="JSONL : inclure la réponse complète")
+    parser.add_argument("--restart", action="store_true", help="ignorer le checkpoint et la sortie existante")
+    parser.add_argument("--memo", action="store_true",
+                        help="ré-analyse avec mémoïsation par étape (STEP_MEMO) ; implique --force")
+    args = parser.parse_args()
+
+    if args.memo:
+        server.ENABLE_STEP_MEMO = True
+        args.force = True
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    writer = ResultWriter(args.output, fmt, args.restart)
+    try:
+        run(read_inputs(args.inputs), BulkScorer(args.concurrency, args.force, args.full), writer)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        writer.close()
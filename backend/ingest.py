@@ -0,0 +1,210 @@
+# =============================================================
+# 🟦 De Facto — Ingestion dans le corpus local des sites fiables
+# =============================================================
+# Télécharge des articles (Trafilatura, comme /analyze) et les ajoute
+# à l'index plein texte local (data/defacto.db, table corpus_articles).
+# Seuls les sites de ALLOWED_SITES sont acceptés.
+#
+# 🔁 Pipeline :
+# 1) Sources : URL directes, flux RSS/Atom, sitemaps (URL ou fichier local)
+# 2) Dédoublonnage par URL (déjà dans le corpus ou déjà vue)
+# 3) Téléchargement + extraction en parallèle, avec une limite PAR SITE
+#    (on reste poli avec chaque média)
+# 4) Dédoublonnage par contenu (même texte sous une autre URL)
+# 5) Écriture en base par lots (une transaction par lot)
+# Le débit (articles/min) est affiché pendant et après l'ingestion.
+#
+# Usage (depuis backend/) :
+#   python3 ingest.py https://www.lemonde.fr/... https://www.bbc.com/...
+#   python3 ingest.py --file urls.txt                 # une URL par ligne
+#   python3 ingest.py --feed https://www.lemonde.fr/rss/une.xml
+#   python3 ingest.py --sitemap fixtures/sitemap.xml  # fichier local accepté
+#   python3 ingest.py --feed flux.xml --watch 900     # mode démon (toutes les 15 min)
+#   python3 ingest.py --stats                         # taille du corpus par site
+# =============================================================
+
+import argparse, os, sys, threading, time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import server
+
+def read_source(location: str) -> bytes:
+    """Contenu d'un flux/sitemap : fichier local ou URL."""
+    if os.path.exists(location):
+        with open(location, "rb") as f:
+            return f.read()
+    r = server.http_client.get(location)
+    r.raise_for_status()
+    return r.content
+
+def _local_name(tag: str) -> str:
+    """Nom de balise sans espace de noms ({http://…}loc → loc)."""
+    return tag.rsplit("}", 1)[-1]
+
+def urls_from_feed(location: str) -> list:
+    """Liens des articles d'un flux RSS 2.0 ou Atom."""
+    root = ET.fromstring(read_source(location))
+    urls = []
+    for el in root.iter():
+        name = _local_name(el.tag)
+        if name == "item":
+            link = next((c for c in el if _local_name(c.tag) == "link"), None)
+            if link is not None and (link.text or "").strip():
+                urls.append(link.text.strip())
+        elif name == "entry":
+            for c in el:
+                if _local_name(c.tag) == "link" and c.get("rel", "alternate") == "alternate" and c.get("href"):
+                    urls.append(c.get("href").strip())
+                    break
+    return urls
+
+def urls_from_sitemap(location: str, depth: int = 0) -> list:
+    """URL d'un sitemap ; suit les index de sitemaps (2 niveaux max)."""
+    root = ET.fromstring(read_source(location))
+    locs = [
+        (el.text or "").strip()
+        for el in root.iter() if _local_name(el.tag) == "loc" and (el.text or "").strip()
+    ]
+    if _local_name(root.tag) == "sitemapindex":
+        if depth >= 2:
+            return []
+        urls = []
+        for child in locs:
+            try:
+                urls += urls_from_sitemap(child, depth + 1)
+            except Exception as e:
+                print(f"⚠️  sitemap illisible : {child} ({e})")
+        return urls
+    return locs
+
+class Ingestor:
+    """Télécharge, dédoublonne et écrit des articles par lots."""
+    def __init__(self, workers: int, per_host: int, batch_size: int, refresh: bool):
+        self.workers = workers
+        self.per_host = per_host
+        self.batch_size = batch_size
+        self.refresh = refresh
+        self.host_slots = {}
+        self.lock = threading.Lock()
+        self.seen_hashes = set()
+        self.batch = []
+        self.stats = {"candidates": 0, "skipped_url": 0, "failed": 0,
+                      "duplicates": 0, "written": 0}
+
+    def _slot(self, url: str) -> threading.Semaphore:
+        """Sémaphore du site : au plus `per_host` téléchargements simultanés."""
+        host = server.domain_of(url) or ""
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.Semaphore(self.per_host)
+            return self.host_slots[host]
+
+    def _fetch(self, url: str):
+        with self._slot(url):
+            return url, server.fetch_article(url)
+
+    def _flush(self):
+        if self.batch:
+            self.stats["written"] += server.corpus_add_many(self.batch)
+            self.batch = []
+
+    def _progress(self, done: int, total: int, start: float):
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        rate = self.stats["written"] / elapsed * 60
+        print(f"\r⏳ {done}/{total} traitées · {self.stats['written']} écrites · "
+              f"{rate:.1f} articles/min", end="", flush=True)
+
+    def run(self, urls: list):
+        # 2) Dédoublonnage par URL (avant tout téléchargement)
+        todo = []
+        for url in dict.fromkeys(urls):
+            if not server.reliable_site(url):
+                self.stats["skipped_url"] += 1
+            elif not self.refresh and server.corpus_known(url=url):
+                self.stats["skipped_url"] += 1
+            else:
+                todo.append(url)
+        self.stats["candidates"] = len(todo)
+
+        start = time.perf_counter()
+        # 3) Téléchargements parallèles (limite globale + limite par site)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._fetch, url) for url in todo]
+            for done, future in enumerate(as_completed(futures), 1):
+                url, article = future.result()
+                if not article["text"]:
+                    self.stats["failed"] += 1
+                else:
+                    # 4) Dédoublonnage par contenu
+                    h = server.content_hash(article["text"])
+                    if h in self.seen_hashes or (not self.refresh and server.corpus_known(text_hash=h)):
+                        self.stats["duplicates"] += 1
+                    else:
+                        self.seen_hashes.add(h)
+                        self.batch.append({"url": url, **article})
+                # 5) Écriture par lots (thread principal uniquement)
+                if len(self.batch) >= self.batch_size:
+                    self._flush()
+                self._progress(done, len(todo), start)
+        self._flush()
+
+        elapsed = time.perf_counter() - start
+        if todo:
+            print()
+        s = self.stats
+        print(f"✅ {s['written']} écrits · {s['duplicates']} doublons de contenu · "
+              f"{s['failed']} échecs · {s['skipped_url']} URL ignorées (hors sites / déjà connues)")
+        print(f"⏱️  {elapsed:.1f}s → {s['written'] / max(elapsed, 1e-6) * 60:.1f} articles/min")
+        return s
+
+def collect_urls(args) -> list:
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    for feed in args.feed:
+        try:
+            urls += urls_from_feed(feed)
+        except Exception as e:
+            print(f"⚠️  flux illisible : {feed} ({e})")
+    for sitemap in args.sitemap:
+        try:
+            urls += urls_from_sitemap(sitemap)
+        except Exception as e:
+            print(f"⚠️  sitemap illisible : {sitemap} ({e})")
+    return urls
+
+def print_stats():
+    rows = server.db().execute(
+        "SELECT site, COUNT(*) AS n FROM corpus_articles GROUP BY site ORDER BY n DESC"
+    ).fetchall()
+    for row in rows:
+        print(f"{row['site']:20} {row['n']:>8}")
+    print(f"{'total':20} {sum(r['n'] for r in rows):>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion d'articles dans le corpus local")
+    parser.add_argument("urls", nargs="*", help="URL d'articles à ingérer")
+    parser.add_argument("--file", help="fichier texte : une URL par ligne")
+    parser.add_argument("--feed", action="append", default=[], help="flux RSS/Atom (URL ou fichier)")
+    parser.add_argument("--sitemap", action="append", default=[], help="sitemap XML (URL ou fichier)")
+    parser.add_argument("--workers", type=int, default=16, help="téléchargements simultanés au total")
+    parser.add_argument("--per-host", type=int, default=2, help="téléchargements simultanés par site")
+    parser.add_argument("--batch-size", type=int, default=50, help="articles par transaction")
+    parser.add_argument("--refresh", action="store_true", help="re-télécharger les URL déjà connues")
+    parser.add_argument("--watch", type=int, default=0, help="mode démon : relire les sources toutes les N s")
+    parser.add_argument("--stats", action="store_true", help="affiche la taille du corpus")
+    args = parser.parse_args()
+
+    while True:
+        urls = collect_urls(args)
+        if urls:
+            Ingestor(args.workers, args.per_host, args.batch_size, args.refresh).run(urls)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+    if args.stats or not (args.urls or args.file or args.feed or args.sitemap):
+        print_stats()
@@ -0,0 +1,72 @@
+# =============================================================
+# 🟦 De Facto — Profil du démarrage à froid
+# =============================================================
+# 1) Temps d'import de server.py, détaillé par paquet (python -X importtime)
+# 2) Durée de chaque étape du warm-up (imports différés + connexions)
+#
+# Usage (depuis backend/) :
+#   python3 profile_startup.py            # top 15 paquets
+#   python3 profile_startup.py --top 30
+# =============================================================
+
+import argparse, json, os, subprocess, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+WARMUP_PROBE = """
+import time
+t0 = time.perf_counter()
+import server
+t1 = time.perf_counter()
+server.start_warmup()
+server._warmup_thread.join()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "warmup_ms": (t2 - t1) * 1000, "steps": server.WARMUP["steps"]}))
+"""
+
+def import_breakdown(top: int):
+    """Lance `python -X importtime -c "import server"` et agrège par paquet racine."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=HERE, capture_output=True, text=True,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    per_package = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            self_us = int(parts[0].split(":")[1])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # ligne d'en-tête
+        name = parts[2].strip()
+        per_package[name.split(".")[0]] = per_package.get(name.split(".")[0], 0) + self_us
+        if name == "server":
+            total_us = cumulative_us
+
+    print(f"⏱️  import server : {total_us / 1000:.0f} ms au total\n")
+    print(f"{'paquet':28} {'ms (self)':>10}")
+    for name, us in sorted(per_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{name:28} {us / 1000:>10.1f}")
+
+def warmup_breakdown():
+    """Importe server dans un processus neuf puis chronomètre le warm-up."""
+    proc = subprocess.run(
+        [sys.executable, "-c", "import json\n" + WARMUP_PROBE],
+        cwd=HERE, capture_output=True, text=True,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    data = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(f"\n🔥 warm-up : {data['warmup_ms']:.0f} ms (en arrière-plan, après {data['import_ms']:.0f} ms d'import)\n")
+    for name, step in data["steps"].items():
+        print(f"  {name:24} {step['ms']:>8.1f} ms  {step['status'][:60]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profil du démarrage à froid de server.py")
+    parser.add_argument("--top", type=int, default=15, help="nombre de paquets affichés")
+    args = parser.parse_args()
+    import_breakdown(args.top)
+    warmup_breakdown()
@@ -15,75 +15,568 @@
 # 8) Score final
 # =============================================================
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
-from openai import OpenAI
-import os, json, re, requests, time
+import os, sys, io, json, re, requests, time, hashlib, threading, html, gzip, mimetypes, glob, functools
+import sqlite3, unicodedata, fcntl
+import logging, queue, random, uuid, atexit, contextvars
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np  # annotations seulement : NumPy est importé là où il sert
 
 # -------------------------------------------------------------
-# 🔵 0) CONFIG GLOBALE & MODE DEBUG
+# 🔵 0) CONFIG GLOBALE & LOGS STRUCTURÉS
 # -------------------------------------------------------------
-
-# ⚙️ Activer / désactiver les logs pédagogiques ici
-DEBUG = True
-
-# 🎨 Couleurs ANSI pour la console (juste pour le confort visuel)
-C_RESET = "\033[0m"
-C_BLUE = "\033[94m"
-C_GREEN = "\033[92m"
-C_YELLOW = "\033[93m"
-C_MAGENTA = "\033[95m"
-C_CYAN = "\033[96m"
-C_BOLD = "\033[1m"
-
-def log(title: str, message: str = "", color: str = C_CYAN, indent: int = 0):
-    """Petit utilitaire pour afficher un message de log coloré et indenté."""
-    if not DEBUG:
+# 👉 Chaque ligne de log est un objet JSON (une ligne = un événement) :
+#   {"ts": ..., "level": "INFO", "request_id": "a1b2c3", "step": "...", "event": "...", ...}
+# Les threads de requête ne font que DÉPOSER l'événement dans une file ;
+# un thread dédié (QueueListener) l'écrit sur stdout. Une analyse n'attend
+# donc jamais le pipe stdout du conteneur, et les lignes ne se mélangent pas.
+
+# 📁 Racine du projet (backend/.. ) : logs.jsonl et data/ y sont stockés, quel
+# que soit le dossier depuis lequel on lance le serveur (python3 server.py ou gunicorn).
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(ROOT_DIR, "data"))
+
+# ⚙️ Niveau de log : DEBUG (données intermédiaires), INFO (étapes), WARNING…
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+# 🎲 Proportion d'analyses dont on garde les logs DEBUG (1.0 = toutes)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+# 📦 Taille max de la file : au-delà, on JETTE le log plutôt que de bloquer
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Contexte propre à chaque requête (suit la requête, même dans un thread)
+request_id_var = contextvars.ContextVar("request_id", default="-")
+log_sampled_var = contextvars.ContextVar("log_sampled", default=True)
+log_step_var = contextvars.ContextVar("log_step", default=None)
+
+class JsonFormatter(logging.Formatter):
+    """Formate un enregistrement de log en une ligne JSON."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "level": record.levelname,
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        step = getattr(record, "step", None)
+        if step:
+            entry["step"] = step
+        entry["event"] = record.getMessage()
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """
+    Exécuté dans le thread APPELANT : on y capture l'ID de requête et
+    l'étape en cours, et on applique l'échantillonnage des logs DEBUG.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.INFO and not log_sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        record.step = log_step_var.get()
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler qui ne bloque jamais : si la file est pleine, on compte et on jette."""
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+logger = logging.getLogger("defacto")
+logger.setLevel(getattr(logging, LOG_LEVEL, logging.DEBUG))
+logger.propagate = False
+logger.addFilter(RequestContextFilter())
+
+_listeners = {}
+
+def start_queue_logging(target: logging.Logger, handler: logging.Handler):
+    """
+    (Re)branche un logger sur une file neuve + un thread d'écriture dédié.
+    Rappelé après un fork (gunicorn) : les threads ne survivent pas au fork.
+    """
+    for h in list(target.handlers):
+        if isinstance(h, NonBlockingQueueHandler):
+            target.removeHandler(h)
+    q = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    target.addHandler(NonBlockingQueueHandler(q))
+    listener = QueueListener(q, handler, respect_handler_level=True)
+    listener.start()
+    _listeners[target.name] = listener
+
+@atexit.register
+def _flush_logs():
+    for listener in _listeners.values():
+        listener.stop()
+
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(JsonFormatter())
+start_queue_logging(logger, _stdout_handler)
+
+def start_request_logging(request_id: Optional[str] = None) -> str:
+    """
+    Démarre le contexte de logs d'une requête : nouvel ID (ou celui fourni)
+    et tirage au sort de l'échantillonnage DEBUG.
+    """
+    rid = request_id or uuid.uuid4().hex[:12]
+    request_id_var.set(rid)
+    log_sampled_var.set(LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE)
+    return rid
+
+def log_enabled(level: int = logging.DEBUG) -> bool:
+    """Vrai si un log de ce niveau serait réellement émis (niveau + échantillonnage)."""
+    if not logger.isEnabledFor(level):
+        return False
+    return level >= logging.INFO or log_sampled_var.get()
+
+def log(title: str, message: str = "", level: int = logging.INFO, **fields):
+    """Log d'un événement (titre + message facultatif + champs structurés)."""
+    if not log_enabled(level):
         return
-    prefix = " " * indent
     if message:
-        print(f"{prefix}{color}{title}{C_RESET} {message}")
-    else:
-        print(f"{prefix}{color}{title}{C_RESET}")
+        fields["message"] = message
+    logger.log(level, title, extra={"fields": fields})
 
-def log_data(label: str, value: Any, indent: int = 4, color: str = C_YELLOW, max_len: int = 220):
-    """Affiche une donnée intermédiaire (tronquée si elle est trop longue)."""
-    if not DEBUG:
+def log_data(label: str, value: Any, max_len: int = 220, level: int = logging.DEBUG):
+    """
+    Log d'une donnée intermédiaire (tronquée si elle est trop longue).
+    `value` peut être une fonction sans argument : elle n'est appelée
+    que si le niveau est actif (aucun coût sinon).
+    """
+    if not log_enabled(level):
         return
+    if callable(value):
+        value = value()
     text = str(value)
     if len(text) > max_len:
         text = text[:max_len] + "…"
-    prefix = " " * indent
-    print(f"{prefix}{color}- {label}: {text}{C_RESET}")
+    logger.log(level, label, extra={"fields": {"value": text}})
+
+# -------------------------------------------------------------
+# 🔵 0bis) TRACES (spans imbriqués autour de StepTimer)
+# -------------------------------------------------------------
+# 👉 Chaque StepTimer est un "span" : il connaît son parent, sa durée et
+# quelques attributs. À la sortie, le span est écrit dans un fichier local
+# tournant (data/traces.jsonl), au format "Trace Event" de Chrome/Perfetto
+# (événements "ph": "X"). L'ID de trace = l'ID de la requête.
+# La vue /traces/<id> affiche la cascade (waterfall) et le chemin critique.
+
+ENABLE_TRACING = os.getenv("ENABLE_TRACING", "1") != "0"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(DATA_DIR, "traces.jsonl"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+
+current_span_var = contextvars.ContextVar("current_span", default=None)
+# Durées des étapes de l'analyse en cours, jointes à son événement "result" (section 5nonies)
+step_timings_var = contextvars.ContextVar("step_timings", default=None)
+
+class _RawFormatter(logging.Formatter):
+    """Le message est déjà une ligne JSON : on l'écrit tel quel."""
+    def format(self, record: logging.LogRecord) -> str:
+        return record.getMessage()
+
+trace_logger = logging.getLogger("defacto.trace")
+trace_logger.setLevel(logging.INFO)
+trace_logger.propagate = False
+if ENABLE_TRACING:
+    os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+    _trace_file_handler = RotatingFileHandler(
+        TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS,
+        encoding="utf-8", delay=True,
+    )
+    _trace_file_handler.setFormatter(_RawFormatter())
+    start_queue_logging(trace_logger, _trace_file_handler)
 
 class StepTimer:
-    """Contexte pour mesurer le temps d’une étape."""
-    def __init__(self, step_label: str):
+    """
+    Contexte pour mesurer le temps d’une étape… et span de trace.
+    - step_label : nom du span ("Étape 4 - Recherche web", "llm.chat"…)
+    - cat        : "request", "step" (logué en INFO) ou sous-span (DEBUG)
+    - attrs      : attributs libres, complétables via .set(...)
+    """
+    def __init__(self, step_label: str, cat: str = "step", **attrs):
         self.step_label = step_label
+        self.cat = cat
+        self.attrs = attrs
         self.start = None
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = None
+        self._tokens = None
+
+    def set(self, **attrs):
+        """Ajoute des attributs au span (nb de résultats, tokens…)."""
+        self.attrs.update(attrs)
+        return self
 
     def __enter__(self):
-        if DEBUG:
-            self.start = time.time()
+        parent = current_span_var.get()
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.perf_counter()
+        self._start_wall = time.time()
+        self._tokens = (current_span_var.set(self),
+                        log_step_var.set(self.step_label) if self.cat == "step" else None)
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        if DEBUG and self.start is not None:
-            duration = time.time() - self.start
-            log("⏱️ Temps", f"{self.step_label} terminé en {duration:.2f}s", C_GREEN, indent=4)
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        level = logging.INFO if self.cat in ("step", "request") else logging.DEBUG
+        log("⏱️ Temps", f"{self.step_label} terminé en {duration:.2f}s",
+            level=level, duration_ms=round(duration * 1000, 1))
+        if ENABLE_TRACING:
+            self._emit(duration)
+        if self.cat == "step":
+            timings = step_timings_var.get()
+            if timings is not None:
+                timings.append([self.step_label, round(duration * 1000, 1)])
+        span_token, step_token = self._tokens
+        current_span_var.reset(span_token)
+        if step_token is not None:
+            log_step_var.reset(step_token)
+
+    def _emit(self, duration: float):
+        event = {
+            "name": self.step_label,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": int(self._start_wall * 1_000_000),
+            "dur": int(duration * 1_000_000),
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {
+                "trace_id": request_id_var.get(),
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                **self.attrs,
+            },
+        }
+        trace_logger.info(json.dumps(event, ensure_ascii=False, default=str))
 
 # -------------------------------------------------------------
 # 🔵 1) CONFIG FLASK + OPENAI + SITES FIABLES
 # -------------------------------------------------------------
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Request-ID"])
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+@app.before_request
+def _bind_request_id():
+    """Chaque requête reçoit un ID (repris de X-Request-ID s'il est fourni)."""
+    start_request_logging(request.headers.get("X-Request-ID"))
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _expose_request_id(response):
+    response.headers["X-Request-ID"] = request_id_var.get()
+    return response
+
+# 🤖 Client OpenAI créé à la demande : importer le SDK coûte ~0,5 s,
+# payées par le warm-up en arrière-plan plutôt qu'au démarrage.
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Retourne le client OpenAI (créé au premier appel)."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return client
+
+def reset_after_fork():
+    """
+    🍴 Appelé par gunicorn (post_fork) dans chaque worker quand l'app est
+    préchargée dans le master : on relance les threads de logs, on oublie
+    le client OpenAI et le client HTTP sortant (leurs pools de connexions ne
+    doivent pas être partagés entre processus), ainsi que les connexions
+    SQLite et les pools de threads, puis on relance le warm-up.
+    """
+    global client, http_client, _db_local, _prefetch_pool, _revalidate_pool
+    for name, listener in list(_listeners.items()):
+        start_queue_logging(logging.getLogger(name), listener.handlers[0])
+    client = None
+    http_client = OutboundHTTP()
+    _db_local = threading.local()
+    _prefetch_pool = None
+    _revalidate_pool = None
+    if ENABLE_EVENT_LOG:
+        event_writer.start()
+    reset_warmup()
+    start_warmup()
+
+HISTORY_FILE = os.getenv("HISTORY_FILE", os.path.join(ROOT_DIR, "logs.jsonl"))
+
+# -------------------------------------------------------------
+# 🔵 1quater) CLIENT HTTP SORTANT PARTAGÉ (sites d'info + Google CSE)
+# -------------------------------------------------------------
+# 👉 Tous les appels HTTP sortants (hors OpenAI, qui a son propre
+# client) passent par un seul client :
+# - un pool keep-alive PAR HÔTE (urllib3), au plus HTTP_MAX_PER_HOST
+#   connexions simultanées vers un même site (les suivantes attendent)
+# - cache DNS (HTTP_DNS_TTL_S) : pas de résolution à chaque connexion
+# - timeouts uniformes (connexion, lecture) et 2 nouvelles tentatives
+#   en cas d'échec de connexion uniquement
+# - politesse : au plus HTTP_HOST_RATE requêtes/s par domaine (les API
+#   de HTTP_RATE_EXEMPT ne sont pas limitées)
+# Statistiques par hôte : /http/stats
+
+HTTP_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")), float(os.getenv("HTTP_READ_TIMEOUT", "10")))
+HTTP_MAX_HOSTS = int(os.getenv("HTTP_MAX_HOSTS", "32"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "6"))
+HTTP_DNS_TTL_S = float(os.getenv("HTTP_DNS_TTL_S", "300"))
+HTTP_HOST_RATE = float(os.getenv("HTTP_HOST_RATE", "4"))
+HTTP_RATE_EXEMPT = {"googleapis.com"}
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0")
+
+class DNSCache:
+    """Résolutions DNS gardées HTTP_DNS_TTL_S ; oubliées si la connexion échoue."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = self.misses = 0
+
+    def resolve(self, host: str, port: int) -> list:
+        """Toutes les adresses de l'hôte, dans l'ordre de getaddrinfo (sans doublons)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        import socket
+        addresses = list(dict.fromkeys(
+            info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        ))
+        with self._lock:
+            self._entries[host] = (addresses, now + HTTP_DNS_TTL_S)
+        return addresses
+
+    def forget(self, host: str):
+        with self._lock:
+            self._entries.pop(host, None)
+
+dns_cache = DNSCache()
+
+def _outbound_pool_classes() -> dict:
+    """
+    Pools urllib3 dont les connexions résolvent l'hôte via dns_cache.
+    Seule l'adresse du socket TCP change : host / _dns_host gardent le nom
+    du site, utilisé pour le SNI et la vérification du certificat. Les
+    adresses sont essayées dans l'ordre, comme le ferait create_connection
+    avec le nom (une IPv6 injoignable ne bloque pas l'IPv4 suivante).
+    """
+    import socket
+    import urllib3
+    from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+    from urllib3.util.connection import create_connection
+
+    class CachedDNS:
+        def _new_conn(self):
+            hostname = self._dns_host  # nom du site (jamais remplacé par l'IP)
+            try:
+                addresses = dns_cache.resolve(hostname, self.port)
+            except socket.gaierror as e:
+                raise NameResolutionError(self.host, self, e) from e
+            error = None
+            for address in addresses:
+                try:
+                    sock = create_connection((address, self.port), self.timeout,
+                                             source_address=self.source_address, socket_options=self.socket_options)
+                    break
+                except OSError as e:
+                    error = e
+            else:
+                dns_cache.forget(hostname)
+                if isinstance(error, socket.timeout):
+                    raise ConnectTimeoutError(
+                        self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                    ) from error
+                raise NewConnectionError(self, f"Failed to establish a new connection: {error}") from error
+            sys.audit("http.client.connect", self, self.host, self.port)
+            return sock
+
+    class HTTPConnection(CachedDNS, urllib3.connection.HTTPConnection):
+        pass
+
+    class HTTPSConnection(CachedDNS, urllib3.connection.HTTPSConnection):
+        pass
+
+    class HTTPPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = HTTPConnection
+
+    class HTTPSPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = HTTPSConnection
+
+    return {"http": HTTPPool, "https": HTTPSPool}
+
+class OutboundHTTP:
+    """Session requests partagée + limite de débit par domaine + compteurs par hôte."""
+    def __init__(self):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = HTTP_USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_MAX_HOSTS, pool_maxsize=HTTP_MAX_PER_HOST, pool_block=True,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3),
+        )
+        adapter.poolmanager.pool_classes_by_scheme = _outbound_pool_classes()
+        self.adapter = adapter
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._hosts = {}
+
+    def _wait_turn(self, domain: str) -> float:
+        """Espace les requêtes vers un même domaine ; renvoie l'attente (s)."""
+        if HTTP_HOST_RATE <= 0 or domain in HTTP_RATE_EXEMPT:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + 1 / HTTP_HOST_RATE
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlparse(url).hostname or ""
+        waited = self._wait_turn(domain_of(url) or host)
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        start = time.perf_counter()
+        error = False
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            error = True
+            raise
+        finally:
+            with self._lock:
+                h = self._hosts.setdefault(host, {"requests": 0, "errors": 0, "throttled_s": 0.0, "seconds": 0.0})
+                h["requests"] += 1
+                h["errors"] += error
+                h["throttled_s"] += waited
+                h["seconds"] += time.perf_counter() - start
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def stats(self) -> dict:
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                # La file du pool est pré-remplie de None : seules les vraies connexions comptent
+                idle = sum(conn is not None for conn in list(pool.pool.queue)) if pool.pool else 0
+                pools[pool.host] = {"connections_opened": pool.num_connections, "idle": idle,
+                                    "reused": max(pool.num_requests - pool.num_connections, 0)}
+        with self._lock:
+            hosts = {
+                host: {**c, "throttled_s": round(c["throttled_s"], 3), "seconds": round(c["seconds"], 3),
+                       **pools.get(host, {"connections_opened": 0, "idle": 0, "reused": 0})}
+                for host, c in self._hosts.items()
+            }
+        return {"hosts": hosts, "dns_cache": {"hits": dns_cache.hits, "misses": dns_cache.misses}}
+
+http_client = OutboundHTTP()
+
+@app.route("/http/stats", methods=["GET"])
+def http_stats():
+    """Connexions ouvertes / réutilisées, erreurs et attente de politesse par hôte (ce worker)."""
+    return jsonify({
+        "config": {"max_per_host": HTTP_MAX_PER_HOST, "host_rate": HTTP_HOST_RATE, "timeout": HTTP_TIMEOUT,
+                   "dns_ttl_s": HTTP_DNS_TTL_S},
+        **http_client.stats(),
+    })
+
+# -------------------------------------------------------------
+# 🔵 1ter) DÉMARRAGE À CHAUD (warm-up + /ready)
+# -------------------------------------------------------------
+# 👉 Les modules lourds et rarement utilisés (openai, trafilatura, bs4,
+# numpy ; Pillow ne sert qu'à encoder les variantes d'images)
+# ne sont PAS importés au démarrage. Un thread de warm-up les charge
+# en arrière-plan et ouvre les connexions TLS vers OpenAI et Google,
+# pour que la 1ère analyse coûte à peu près autant que les suivantes.
+# /ready répond 503 tant que le warm-up n'est pas terminé (sonde de
+# readiness Render / Replit), puis 200.
+# Profil d'import détaillé : python3 backend/profile_startup.py
+
+WARMUP = {"ready": False, "steps": {}}
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+def _warmup_step(name: str, fn):
+    """Exécute une étape de warm-up ; une erreur n'empêche pas les suivantes."""
+    start = time.perf_counter()
+    try:
+        fn()
+        status = "ok"
+    except Exception as e:
+        status = f"erreur : {e}"
+    WARMUP["steps"][name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "status": status}
+
+def _warmup():
+    _warmup_step("import openai", get_client)
+    _warmup_step("import trafilatura", lambda: __import__("trafilatura"))
+    _warmup_step("import bs4", lambda: __import__("bs4"))
+    _warmup_step("import numpy", lambda: __import__("numpy"))
+    # Une requête légère suffit à ouvrir la connexion TLS (même en 401)
+    _warmup_step("connexion OpenAI",
+                 lambda: get_client().with_options(timeout=5, max_retries=0).models.list())
+    _warmup_step("connexion Google",
+                 lambda: http_client.head("https://www.googleapis.com/", timeout=5))
+    _warmup_step("assets frontend", complete_assets)
+    WARMUP["ready"] = True
+    log("🔥 WARM-UP terminé", steps=WARMUP["steps"])
+
+def start_warmup():
+    """Lance le warm-up en arrière-plan (une seule fois par processus)."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warmup, name="warmup", daemon=True)
+            _warmup_thread.start()
+
+def reset_warmup():
+    """Oublie l'état de warm-up (après un fork : rien n'est encore chaud)."""
+    global _warmup_thread
+    _warmup_thread = None
+    WARMUP["ready"] = False
+    WARMUP["steps"] = {}
+
+@app.before_request
+def _ensure_warmup():
+    # Filet de sécurité si le serveur n'a pas lancé le warm-up lui-même
+    start_warmup()
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify(WARMUP), (200 if WARMUP["ready"] else 503)
 
 ALLOWED_SITES = [
     "reuters.com", "apnews.com", "bbc.com",
@@ -140,6 +633,10 @@ def extract_json(text: str, fallback: dict):
     🧩 OpenAI renvoie parfois du texte qui contient du JSON au milieu.
     On essaie d'extraire le bloc { ... } et de le parser.
     """
+    with StepTimer("json.parse", cat="parse", length=len(text or "")):
+        return _extract_json(text, fallback)
+
+def _extract_json(text: str, fallback: dict):
     try:
         # 1️⃣ Essaie direct parsing
         return json.loads(text)
@@ -154,10 +651,84 @@ def extract_json(text: str, fallback: dict):
             json_str = text[start:end+1]
             return json.loads(json_str)
     except Exception as e:
-        log("⚠️ JSON ERROR", str(e), color=C_YELLOW, indent=4)
+        log("⚠️ JSON ERROR", str(e), level=logging.WARNING)
 
     return fallback
 
+# 📼 Cassettes : enregistrement / rejeu de tous les appels externes
+# (OpenAI, Google CSE, téléchargement d'articles) pour mesurer le
+# pipeline sans réseau et sans variance. CASSETTE_MODE :
+#   off          → appels réels (par défaut)
+#   record       → appels réels + sauvegarde réponse et durée
+#   replay       → réponses enregistrées, servies à la vitesse d'origine
+#   replay-fast  → réponses enregistrées, servies instantanément
+# Une interaction = un fichier JSON, nommé par le hash de la requête.
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", os.path.join(DATA_DIR, "cassettes"))
+
+class CassetteMiss(RuntimeError):
+    """Rejeu demandé pour une requête jamais enregistrée."""
+
+def cassette_call(kind: str, request_data: Any, call, dump=lambda r: r, load=lambda d: d):
+    """
+    Exécute `call()` selon CASSETTE_MODE. `dump`/`load` convertissent la
+    réponse en JSON et inversement (ex. objets du SDK OpenAI).
+    """
+    if CASSETTE_MODE == "off":
+        return call()
+
+    key = hashlib.sha256(
+        json.dumps([kind, request_data], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()[:32]
+    path = os.path.join(CASSETTE_DIR, kind, key + ".json")
+
+    if CASSETTE_MODE in ("replay", "replay-fast"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            raise CassetteMiss(f"{kind} : aucune cassette pour {key}") from None
+        if CASSETTE_MODE == "replay":
+            time.sleep(entry["elapsed"])
+        return load(entry["response"])
+
+    t0 = time.perf_counter()
+    result = call()
+    entry = {
+        "kind": kind,
+        "request": request_data,
+        "response": dump(result),
+        "elapsed": round(time.perf_counter() - t0, 4),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, path)  # écriture atomique (plusieurs workers)
+    return result
+
+def _load_completion(data: dict):
+    with _client_lock:  # import concurrent d'openai (warm-up, autres requêtes)
+        from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+def llm_chat(**kwargs):
+    """
+    🤖 Appel OpenAI (chat.completions) dans un span "llm.chat" :
+    modèle, durée et tokens consommés apparaissent dans la trace.
+    """
+    with StepTimer("llm.chat", cat="llm", model=kwargs.get("model")) as span:
+        resp = cassette_call(
+            "llm", kwargs, lambda: get_client().chat.completions.create(**kwargs),
+            dump=lambda r: r.model_dump(), load=_load_completion,
+        )
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            span.set(prompt_tokens=usage.prompt_tokens,
+                     completion_tokens=usage.completion_tokens)
+        return resp
+
 def color_for(score: int) -> str:
     """🖌️ Convertit une note en un emoji couleur (pour le front)."""
     if score >= 70:
@@ -166,6 +737,130 @@ def color_for(score: int) -> str:
         return "🟡"
     return "🔴"
 
+# 🗄️ Base locale SQLite (data/defacto.db) : caches et index partagés par
+# tous les workers. Une connexion par thread, mode WAL (lectures non
+# bloquées par les écritures). Chaque module déclare son schéma via
+# register_schema() ; il est créé à la première connexion.
+DB_FILE = os.getenv("DB_FILE", os.path.join(DATA_DIR, "defacto.db"))
+_db_local = threading.local()
+_db_schemas = []
+
+def register_schema(sql: str):
+    _db_schemas.append(sql)
+
+def db() -> sqlite3.Connection:
+    """Connexion SQLite du thread courant (créée au premier appel)."""
+    conn = getattr(_db_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for sql in _db_schemas:
+            conn.executescript(sql)
+        _db_local.conn = conn
+    return conn
+
+def normalize_words(text: str) -> list:
+    """Minuscules, sans accents, mots de 3 lettres et plus hors mots vides."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [w for w in _WORD_RE.findall(text) if len(w) > 2 and w not in STOPWORDS_FR]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS_FR = {
+    "les", "des", "une", "est", "dans", "pour", "que", "qui", "par", "sur", "pas",
+    "plus", "aux", "avec", "son", "ses", "leur", "leurs", "cette", "ces", "ont",
+    "été", "ete", "sont", "mais", "comme", "elle", "ils", "elles", "nous", "vous",
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were",
+}
+
+# 🧠 Mémoïsation par étape : quand on retouche UN prompt (ex. la
+# synthèse), ré-analyser un corpus ne doit relancer que cette étape et
+# celles qui en dépendent. La sortie de chaque étape est gardée en
+# SQLite sous une clé = (nom de l'étape, empreinte du code de la
+# fonction — prompt et modèle compris —, empreinte des entrées).
+# Modifier le prompt change l'empreinte du code → l'étape est rejouée ;
+# ses sorties changent → les étapes suivantes aussi ; le reste est servi
+# depuis la base. Activé par STEP_MEMO=1 (ré-analyses, benchmarks).
+ENABLE_STEP_MEMO = os.getenv("STEP_MEMO", "0") == "1"
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS step_memo (
+    key TEXT PRIMARY KEY,
+    step TEXT NOT NULL,
+    output TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+""")
+
+def _code_parts(code) -> list:
+    """Bytecode + constantes (prompts, modèles…), fonctions imbriquées comprises."""
+    parts = [code.co_code.hex(), list(code.co_names)]
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            parts.append(_code_parts(const))
+        elif isinstance(const, frozenset):
+            parts.append(sorted(map(repr, const)))  # ordre stable entre processus
+        else:
+            parts.append(repr(const))
+    return parts
+
+def code_fingerprint(*fns) -> str:
+    data = json.dumps([_code_parts(fn.__code__) for fn in fns], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+def memoized_step(step: str, uses: tuple = (), config=lambda: None, ignore: tuple = ()):
+    """
+    Décorateur : mémoïse une étape du pipeline.
+    - uses   : fonctions appelées dont le code compte aussi (ex. cse_search)
+    - config : réglages qui changent la sortie (ex. AXES_CONFIG)
+    - ignore : paramètres sans effet sur le résultat (ex. prefetch)
+    """
+    def decorate(fn):
+        import inspect
+        signature = inspect.signature(fn)
+        fingerprint = None
+
+        def wrapper(*args, **kwargs):
+            nonlocal fingerprint
+            if not ENABLE_STEP_MEMO:
+                return fn(*args, **kwargs)
+            if fingerprint is None:
+                fingerprint = code_fingerprint(fn, *uses)
+            bound = signature.bind(*args, **kwargs)
+            inputs = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            key = hashlib.sha256(json.dumps(
+                [step, fingerprint, config(), inputs], sort_keys=True, ensure_ascii=False, default=str
+            ).encode("utf-8")).hexdigest()
+
+            row = db().execute("SELECT output FROM step_memo WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                db().execute("UPDATE step_memo SET hits = hits + 1 WHERE key = ?", (key,))
+                log("🧠 Étape mémoïsée", step=step)
+                return json.loads(row["output"])
+            result = fn(*args, **kwargs)
+            db().execute(
+                "INSERT OR REPLACE INTO step_memo (key, step, output, created_at) VALUES (?, ?, ?, ?)",
+                (key, step, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+            return result
+
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return wrapper
+    return decorate
+
+@app.route("/step-memo/stats", methods=["GET"])
+def step_memo_stats():
+    """Sorties mémoïsées et réutilisations, par étape."""
+    rows = db().execute(
+        "SELECT step, COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM step_memo GROUP BY step"
+    ).fetchall()
+    return jsonify({"enabled": ENABLE_STEP_MEMO, "steps": {r["step"]: dict(r) for r in rows}})
+
 # -------------------------------------------------------------
 # 🔵 3) STRUCTURES DE DONNÉES (Pydantic)
 # -------------------------------------------------------------
@@ -181,6 +876,7 @@ class Axes(BaseModel):
 
 class AnalyzeRequest(BaseModel):
     text: str = Field(..., min_length=1)
+    force: bool = False             # True = ignorer les analyses déjà faites
 
 class AnalyzeResponse(BaseModel):
     score_global: int
@@ -197,6 +893,755 @@ class AnalyzeResponse(BaseModel):
     confiance_analyse: int
     explication_confiance: str
 
+    # Réutilisation d'une analyse antérieure (quasi-doublon)
+    approximate: bool = False
+    similarite: Optional[float] = None
+    analyse_reference: Optional[str] = None
+
+# -------------------------------------------------------------
+# 🔵 3bis) CACHE DE PREUVES PAR PRÉSUPPOSÉ (partagé entre articles)
+# -------------------------------------------------------------
+# 👉 Des articles différents sur la même actualité produisent des
+# présupposés presque identiques. Plutôt que de relancer Google CSE,
+# on garde les sources trouvées pour chaque présupposé, indexées par
+# sa forme normalisée (mots sans accents, triés, sans mots vides).
+# Recherche floue : on récupère les présupposés qui partagent des mots
+# (index inversé), puis on garde le meilleur au-dessus d'un seuil de
+# Jaccard. Les présupposés d'un même article forment une "story" :
+# /evidence-cache/stats donne le taux de réutilisation par story.
+
+ENABLE_EVIDENCE_CACHE = os.getenv("ENABLE_EVIDENCE_CACHE", "1") != "0"
+EVIDENCE_MATCH_THRESHOLD = float(os.getenv("EVIDENCE_MATCH_THRESHOLD", "0.6"))
+EVIDENCE_TTL_HOURS = float(os.getenv("EVIDENCE_TTL_HOURS", "48"))
+EVIDENCE_CANDIDATES = 20
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS evidence_stories (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evidence_claims (
+    id INTEGER PRIMARY KEY,
+    claim TEXT NOT NULL,
+    norm TEXT NOT NULL UNIQUE,
+    story_id INTEGER NOT NULL,
+    sources TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evidence_tokens (
+    token TEXT NOT NULL,
+    claim_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evidence_tokens_token ON evidence_tokens(token);
+""")
+
+def claim_tokens(claim: str) -> set:
+    return set(normalize_words(claim))
+
+def evidence_lookup(claim: str) -> Optional[dict]:
+    """
+    Cherche un présupposé déjà couvert (même sens, formulation proche).
+    Renvoie {"claim_id", "story_id", "sources", "similarite"} ou None.
+    """
+    tokens = claim_tokens(claim)
+    if not tokens:
+        return None
+    conn = db()
+    min_created = time.time() - EVIDENCE_TTL_HOURS * 3600
+    marks = ",".join("?" * len(tokens))
+    rows = conn.execute(
+        f"""SELECT c.id, c.norm, c.story_id, c.sources
+            FROM evidence_tokens t JOIN evidence_claims c ON c.id = t.claim_id
+            WHERE t.token IN ({marks}) AND c.created_at >= ?
+            GROUP BY c.id ORDER BY COUNT(*) DESC LIMIT ?""",
+        (*tokens, min_created, EVIDENCE_CANDIDATES),
+    ).fetchall()
+
+    best = None
+    for row in rows:
+        other = set(row["norm"].split())
+        jaccard = len(tokens & other) / len(tokens | other)
+        if jaccard >= EVIDENCE_MATCH_THRESHOLD and (best is None or jaccard > best["similarite"]):
+            best = {
+                "claim_id": row["id"],
+                "story_id": row["story_id"],
+                "sources": json.loads(row["sources"]),
+                "similarite": round(jaccard, 3),
+            }
+    return best
+
+def evidence_store(claim: str, story_id: int, sources: list) -> Optional[int]:
+    """Enregistre (ou remplace) les sources trouvées pour un présupposé ; renvoie son id."""
+    tokens = claim_tokens(claim)
+    if not tokens or not sources:
+        return None
+    conn = db()
+    with conn:
+        conn.execute("BEGIN")
+        old = conn.execute("SELECT id FROM evidence_claims WHERE norm = ?", (" ".join(sorted(tokens)),)).fetchone()
+        if old:
+            conn.execute("DELETE FROM evidence_tokens WHERE claim_id = ?", (old["id"],))
+            conn.execute("DELETE FROM evidence_claims WHERE id = ?", (old["id"],))
+        cur = conn.execute(
+            "INSERT INTO evidence_claims (claim, norm, story_id, sources, created_at) VALUES (?, ?, ?, ?, ?)",
+            (claim, " ".join(sorted(tokens)), story_id, json.dumps(sources, ensure_ascii=False), time.time()),
+        )
+        conn.executemany(
+            "INSERT INTO evidence_tokens (token, claim_id) VALUES (?, ?)",
+            [(token, cur.lastrowid) for token in tokens],
+        )
+    return cur.lastrowid
+
+def evidence_new_story(label: str) -> int:
+    cur = db().execute(
+        "INSERT INTO evidence_stories (label, created_at) VALUES (?, ?)", (label[:200], time.time())
+    )
+    return cur.lastrowid
+
+def evidence_record(story_id: int, hits: int, misses: int):
+    db().execute(
+        "UPDATE evidence_stories SET hits = hits + ?, misses = misses + ? WHERE id = ?",
+        (hits, misses, story_id),
+    )
+
+@app.route("/evidence-cache/stats", methods=["GET"])
+def evidence_cache_stats():
+    """Taux de réutilisation des preuves, global et par story (les plus actives)."""
+    conn = db()
+    total = conn.execute(
+        "SELECT COUNT(*) AS stories, COALESCE(SUM(hits), 0) AS hits, COALESCE(SUM(misses), 0) AS misses "
+        "FROM evidence_stories"
+    ).fetchone()
+    claims = conn.execute("SELECT COUNT(*) FROM evidence_claims").fetchone()[0]
+    stories = conn.execute(
+        "SELECT id, label, hits, misses FROM evidence_stories ORDER BY hits + misses DESC, id DESC LIMIT 50"
+    ).fetchall()
+
+    def rate(hits, misses):
+        return round(hits / (hits + misses), 3) if hits + misses else None
+
+    return jsonify({
+        "claims": claims,
+        "stories": total["stories"],
+        "hits": total["hits"],
+        "misses": total["misses"],
+        "hit_rate": rate(total["hits"], total["misses"]),
+        "par_story": [
+            {"story_id": r["id"], "label": r["label"], "hits": r["hits"],
+             "misses": r["misses"], "hit_rate": rate(r["hits"], r["misses"])}
+            for r in stories
+        ],
+    })
+
+# -------------------------------------------------------------
+# 🔵 3ter) CORPUS LOCAL DES SITES FIABLES (SQLite FTS5)
+# -------------------------------------------------------------
+# 👉 Un index plein texte local des articles de ALLOWED_SITES, alimenté :
+# - au fil de l'eau par les URL analysées (extract_article_from_url) ;
+# - en masse par la commande `python3 backend/ingest.py <url>…`.
+# search_web l'interroge AVANT Google CSE : si le corpus local trouve
+# assez de sources pertinentes, aucune requête réseau n'est faite.
+# Une recherche locale prend quelques millisecondes, et le pipeline
+# devient testable hors connexion.
+
+ENABLE_LOCAL_CORPUS = os.getenv("ENABLE_LOCAL_CORPUS", "1") != "0"
+# Nombre de sources locales suffisant pour se passer de Google CSE
+LOCAL_MIN_HITS = int(os.getenv("LOCAL_MIN_HITS", "2"))
+# Part minimale des mots du présupposé retrouvés dans l'article
+LOCAL_MIN_COVERAGE = float(os.getenv("LOCAL_MIN_COVERAGE", "0.5"))
+LOCAL_MAX_HITS = 4
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS corpus_articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    site TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS corpus_articles_hash ON corpus_articles(content_hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS corpus_fts USING fts5(
+    title, text,
+    content='corpus_articles', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS corpus_ai AFTER INSERT ON corpus_articles BEGIN
+    INSERT INTO corpus_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS corpus_ad AFTER DELETE ON corpus_articles BEGIN
+    INSERT INTO corpus_fts(corpus_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS corpus_au AFTER UPDATE ON corpus_articles BEGIN
+    INSERT INTO corpus_fts(corpus_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    INSERT INTO corpus_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+""")
+
+def reliable_site(url: str) -> Optional[str]:
+    """Le site de ALLOWED_SITES auquel appartient l'URL, ou None."""
+    dom = domain_of(url) or ""
+    for site in ALLOWED_SITES:
+        if dom == site or dom.endswith("." + site):
+            return site
+    return None
+
+_CORPUS_UPSERT = """
+    INSERT INTO corpus_articles (url, site, title, text, content_hash, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        title = excluded.title, text = excluded.text,
+        content_hash = excluded.content_hash, fetched_at = excluded.fetched_at
+    WHERE corpus_articles.content_hash != excluded.content_hash
+"""
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def corpus_add(url: str, title: str, text: str) -> bool:
+    """
+    Ajoute (ou met à jour) un article d'un site fiable dans le corpus.
+    Renvoie False si le site n'est pas fiable ou si le contenu n'a pas changé.
+    """
+    site = reliable_site(url)
+    if not site or not text:
+        return False
+    cur = db().execute(_CORPUS_UPSERT, (url, site, title or "", text, content_hash(text), time.time()))
+    if cur.rowcount > 0 and ENABLE_VECTOR_INDEX:
+        vector_add_articles([{"url": url, "title": title, "text": text}])
+    return cur.rowcount > 0
+
+def corpus_add_many(articles: list) -> int:
+    """
+    Écriture groupée (une seule transaction) : [{"url", "title", "text"}, …].
+    Renvoie le nombre d'articles ajoutés ou modifiés.
+    """
+    now = time.time()
+    rows = [
+        (a["url"], reliable_site(a["url"]), a.get("title") or "", a["text"], content_hash(a["text"]), now)
+        for a in articles if a.get("text") and reliable_site(a["url"])
+    ]
+    if not rows:
+        return 0
+    conn = db()
+    with conn:
+        conn.execute("BEGIN")
+        changed = []
+        for row in rows:
+            if conn.execute(_CORPUS_UPSERT, row).rowcount > 0:
+                changed.append({"url": row[0], "title": row[2], "text": row[3]})
+    if changed and ENABLE_VECTOR_INDEX:
+        vector_add_articles(changed)
+    return len(changed)
+
+def corpus_known(url: str = None, text_hash: str = None) -> bool:
+    """Vrai si l'URL, ou un contenu identique, est déjà dans le corpus."""
+    conn = db()
+    if url and conn.execute("SELECT 1 FROM corpus_articles WHERE url = ?", (url,)).fetchone():
+        return True
+    if text_hash and conn.execute(
+        "SELECT 1 FROM corpus_articles WHERE content_hash = ?", (text_hash,)
+    ).fetchone():
+        return True
+    return False
+
+def corpus_search(claim: str, limit: int = LOCAL_MAX_HITS) -> list:
+    """
+    Recherche plein texte (BM25) d'un présupposé dans le corpus local.
+    Renvoie des sources au même format que Google CSE.
+    """
+    words = list(dict.fromkeys(normalize_words(claim)))
+    if not words:
+        return []
+    query = " OR ".join(f'"{w}"' for w in words)
+    with StepTimer("corpus.search", cat="search", claim=claim) as span:
+        rows = db().execute(
+            """SELECT a.url, a.title, a.text,
+                      snippet(corpus_fts, 1, '', '', '…', 32) AS snippet
+               FROM corpus_fts JOIN corpus_articles a ON a.id = corpus_fts.rowid
+               WHERE corpus_fts MATCH ?
+               ORDER BY bm25(corpus_fts, 2.0, 1.0) LIMIT ?""",
+            (query, limit * 3),
+        ).fetchall()
+
+        hits = []
+        wanted = set(words)
+        for row in rows:
+            found = wanted & set(normalize_words(row["title"] + " " + row["text"]))
+            if len(found) / len(wanted) < LOCAL_MIN_COVERAGE:
+                continue
+            hits.append({"titre": row["title"], "snippet": row["snippet"], "url": row["url"], "origine": "local"})
+            if len(hits) >= limit:
+                break
+        span.set(hits=len(hits))
+    return hits
+
+# -------------------------------------------------------------
+# 🔵 3quater) INDEX VECTORIEL (recherche sémantique de passages)
+# -------------------------------------------------------------
+# 👉 Les requêtes CSE construites à partir d'une phrase entière ratent
+# souvent des articles pertinents formulés autrement. Ici, chaque article
+# du corpus est découpé en passages, transformés en vecteurs par un
+# "embedding" local sur CPU (hachage de mots, bigrammes et trigrammes de
+# caractères → 256 dimensions normalisées, sans modèle à télécharger).
+#
+# Stockage : une matrice float32 ajoutée en fin de fichier
+# (data/vectors.f32), lue en mémoire mappée (np.memmap) ; le texte des
+# passages est en SQLite (vector_passages.row = ligne de la matrice).
+# Recherche : produits scalaires par blocs de lignes, toutes les
+# requêtes d'une analyse d'un coup, top-k par np.argpartition.
+# Un index approché (IVF/HNSW) n'est pas nécessaire à cette échelle :
+# le balayage complet reste de l'ordre de la dizaine de millisecondes
+# pour quelques centaines de milliers de passages.
+
+ENABLE_VECTOR_INDEX = os.getenv("ENABLE_VECTOR_INDEX", "1") != "0"
+EMBED_DIM = 256
+VECTOR_FILE = os.getenv("VECTOR_FILE", os.path.join(DATA_DIR, "vectors.f32"))
+VECTOR_TOP_K = int(os.getenv("VECTOR_TOP_K", "3"))
+VECTOR_MIN_SCORE = float(os.getenv("VECTOR_MIN_SCORE", "0.25"))
+VECTOR_SCAN_BLOCK = 65536
+PASSAGE_MAX_CHARS = 600
+PASSAGE_MIN_CHARS = 80
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS vector_passages (
+    row INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vector_passages_url ON vector_passages(url);
+""")
+
+def _hashed_features(text: str):
+    """Indices et signes des traits hachés d'un texte (mots, bigrammes, trigrammes)."""
+    words = normalize_words(text)
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"#{w}#"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    idx, sign = [], []
+    for f in features:
+        h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little")
+        idx.append(h % EMBED_DIM)
+        sign.append(1.0 if (h >> 31) & 1 else -1.0)
+    return idx, sign
+
+def embed_texts(texts: list) -> "np.ndarray":
+    """Embeddings locaux (n × EMBED_DIM, float32, normés L2)."""
+    import numpy as np
+    out = np.zeros((len(texts), EMBED_DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        idx, sign = _hashed_features(text)
+        if idx:
+            np.add.at(out[i], idx, sign)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+def split_passages(text: str) -> list:
+    """Découpe un article en passages de ~600 caractères (par paragraphes)."""
+    passages, current = [], ""
+    for para in (p.strip() for p in text.split("\n")):
+        if not para:
+            continue
+        if current and len(current) + len(para) > PASSAGE_MAX_CHARS:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n{para}" if current else para
+    if current:
+        passages.append(current)
+    return [p for p in passages if len(p) >= PASSAGE_MIN_CHARS]
+
+_vector_lock = threading.Lock()
+_vector_map = {"rows": 0, "matrix": None}
+
+def vector_add_articles(articles: list) -> int:
+    """
+    Ajoute les passages d'articles ({"url", "title", "text"}) à l'index.
+    Les anciens passages d'une URL mise à jour sont retirés (leurs lignes
+    restent dans la matrice mais ne pointent plus sur rien).
+    """
+    rows = []
+    for a in articles:
+        for passage in split_passages(a["text"]):
+            rows.append((a["url"], a.get("title") or "", passage))
+    if not rows:
+        return 0
+    vectors = embed_texts([f"{title} {text}" for _, title, text in rows])
+
+    os.makedirs(os.path.dirname(VECTOR_FILE), exist_ok=True)
+    conn = db()
+    with _vector_lock, open(VECTOR_FILE, "ab") as f:
+        # Verrou fichier : plusieurs workers peuvent indexer en même temps
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0, os.SEEK_END)
+            first_row = f.tell() // (EMBED_DIM * 4)
+            f.write(vectors.tobytes())
+            f.flush()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "DELETE FROM vector_passages WHERE url = ?",
+                    [(url,) for url in {a["url"] for a in articles}],
+                )
+                conn.executemany(
+                    "INSERT INTO vector_passages (row, url, title, text) VALUES (?, ?, ?, ?)",
+                    [(first_row + i, *r) for i, r in enumerate(rows)],
+                )
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return len(rows)
+
+def _vector_matrix():
+    """Matrice mappée en mémoire, ré-ouverte si le fichier a grandi."""
+    import numpy as np
+    if not os.path.exists(VECTOR_FILE):
+        return None
+    rows = os.path.getsize(VECTOR_FILE) // (EMBED_DIM * 4)
+    with _vector_lock:
+        if rows and rows != _vector_map["rows"]:
+            _vector_map["matrix"] = np.memmap(VECTOR_FILE, dtype=np.float32, mode="r", shape=(rows, EMBED_DIM))
+            _vector_map["rows"] = rows
+        return _vector_map["matrix"]
+
+def vector_search(queries: list, k: int = VECTOR_TOP_K) -> list:
+    """
+    Top-k passages par requête (toutes les requêtes en un seul balayage).
+    Renvoie une liste (une par requête) de {"texte", "titre", "url", "score"}.
+    """
+    import numpy as np
+    matrix = _vector_matrix()
+    if matrix is None or not queries:
+        return [[] for _ in queries]
+
+    with StepTimer("vector.search", cat="search", queries=len(queries), rows=len(matrix)) as span:
+        q = embed_texts(queries).T                      # d × m
+        best_scores = np.full((0, len(queries)), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((0, len(queries)), dtype=np.int64)
+        for start in range(0, len(matrix), VECTOR_SCAN_BLOCK):
+            scores = matrix[start:start + VECTOR_SCAN_BLOCK] @ q   # bloc × m
+            rows = np.arange(start, start + len(scores))[:, None].repeat(len(queries), axis=1)
+            # On fusionne le bloc avec le meilleur top-k courant
+            all_scores = np.vstack([best_scores, scores])
+            all_rows = np.vstack([best_rows, rows])
+            keep = min(k * 4, len(all_scores))  # marge : certaines lignes sont orphelines
+            top = np.argpartition(-all_scores, keep - 1, axis=0)[:keep]
+            best_scores = np.take_along_axis(all_scores, top, axis=0)
+            best_rows = np.take_along_axis(all_rows, top, axis=0)
+
+        wanted = {int(r) for r in best_rows.ravel()}
+        marks = ",".join("?" * len(wanted))
+        passages = {
+            row["row"]: row for row in db().execute(
+                f"SELECT row, url, title, text FROM vector_passages WHERE row IN ({marks})", tuple(wanted)
+            )
+        }
+        results = []
+        for j in range(len(queries)):
+            order = np.argsort(-best_scores[:, j])
+            hits, urls = [], set()
+            for i in order:
+                score, row = float(best_scores[i, j]), int(best_rows[i, j])
+                p = passages.get(row)
+                if score < VECTOR_MIN_SCORE or p is None or p["url"] in urls:
+                    continue
+                urls.add(p["url"])
+                hits.append({"texte": p["text"], "titre": p["title"], "url": p["url"], "score": round(score, 3)})
+                if len(hits) >= k:
+                    break
+            results.append(hits)
+        span.set(hits=sum(len(h) for h in results))
+    return results
+
+# -------------------------------------------------------------
+# 🔵 3quinquies) PRÉCHARGEMENT SPÉCULATIF DES PREUVES
+# -------------------------------------------------------------
+# 👉 search_web attend les présupposés de l'étape 3 (un appel LLM) :
+# la recherche de sources est donc toujours sur le chemin critique.
+# Dès l'arrivée du texte, on devine localement (regex, sans LLM) les
+# entités nommées les plus citées et on lance leurs recherches en
+# arrière-plan, en parallèle des étapes 1 à 3.
+# Leurs résultats restent en mémoire, le temps de l'analyse : chaque
+# présupposé qui CITE une entité (tous ses mots) reçoit ses sources en
+# candidats supplémentaires, à côté des siennes. Le reclassement BM25
+# (face au présupposé) décide ensuite lesquelles sont gardées. Une
+# recherche sur "Emmanuel Macron" ne remplace jamais celle, ciblée, d'un
+# présupposé qui le cite, et n'entre pas dans le cache de preuves
+# (rangée sous l'entité, elle n'y serait jamais retrouvée). Les
+# recherches pas encore arrivées à Google quand l'étape 4 se termine
+# sont abandonnées (quota CSE).
+# /speculation/stats : présupposés dont une source GARDÉE vient de la
+# spéculation, et requêtes spéculatives utiles.
+
+ENABLE_SPECULATIVE_SEARCH = os.getenv("ENABLE_SPECULATIVE_SEARCH", "1") != "0"
+SPECULATIVE_MAX_QUERIES = int(os.getenv("SPECULATIVE_MAX_QUERIES", "3"))
+SPECULATIVE_MAX_HITS = 6
+
+# Suite de mots à majuscule, avec les liaisons usuelles ("Banque de France")
+_ENTITY_RE = re.compile(
+    r"\b[A-ZÀ-Ý][\w'’-]+(?:\s+(?:(?:de|du|des|la|le|d'|d’)\s*)?[A-ZÀ-Ý][\w'’-]+)*"
+)
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS speculation_stats (
+    id INTEGER PRIMARY KEY,
+    queries INTEGER NOT NULL,
+    used INTEGER NOT NULL,
+    claims INTEGER NOT NULL,
+    claims_hit INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+""")
+
+_prefetch_pool = None
+_prefetch_pool_lock = threading.Lock()
+
+def prefetch_pool() -> ThreadPoolExecutor:
+    """Pool de threads partagé (créé au premier usage, recréé après fork)."""
+    global _prefetch_pool
+    if _prefetch_pool is None:
+        with _prefetch_pool_lock:
+            if _prefetch_pool is None:
+                _prefetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+    return _prefetch_pool
+
+def speculative_queries(text: str, limit: int = SPECULATIVE_MAX_QUERIES) -> list:
+    """
+    Entités candidates du texte brut, les plus fréquentes d'abord.
+    Un mot isolé en début de phrase ("Selon", "Le"…) n'est pas une entité.
+    """
+    counts, first_seen = {}, {}
+    for m in _ENTITY_RE.finditer(text):
+        entity = m.group(0).strip(" '’-")
+        words = normalize_words(entity)
+        if not words:
+            continue
+        before = text[:m.start()].rstrip()
+        if " " not in entity and (not before or before[-1] in ".!?«\"\n"):
+            continue
+        key = " ".join(words)
+        counts[key] = counts.get(key, 0) + 1
+        first_seen.setdefault(key, (m.start(), entity))
+    ranked = sorted(counts, key=lambda k: (-counts[k], first_seen[k][0]))
+    return [first_seen[k][1] for k in ranked[:limit]]
+
+class SpeculativePrefetch:
+    """Recherches lancées en avance sur les entités d'un texte ; candidats pour les présupposés qui les citent."""
+    def __init__(self, text: str):
+        self.key = os.getenv("GOOGLE_CSE_API_KEY")
+        self.cx = os.getenv("GOOGLE_CSE_CX")
+        self.queries = speculative_queries(text)
+        self.stopped = threading.Event()
+        self.results = {}         # requête spéculative → sources
+        self.offered = {}         # présupposé → {url proposée: requête spéculative}
+        self.used = set()
+        self.claims = 0
+        self.claims_hit = 0
+        self.futures = {
+            q: prefetch_pool().submit(contextvars.copy_context().run, self._fetch, q)
+            for q in self.queries
+        }
+        log_data("Requêtes spéculatives", self.queries)
+
+    def _fetch(self, query: str):
+        with StepTimer("speculative.query", cat="search", query=query) as span:
+            hits = corpus_search(query) if ENABLE_LOCAL_CORPUS else []
+            # Étape 4 déjà finie : inutile de dépenser une requête Google
+            if len(hits) < LOCAL_MIN_HITS and self.key and self.cx and not self.stopped.is_set():
+                seen = {h["url"] for h in hits}
+                hits += [h for h in cse_search(query, self.key, self.cx) if h["url"] not in seen]
+            span.set(hits=len(hits))
+            if hits and not self.stopped.is_set():
+                self.results[query] = hits[:SPECULATIVE_MAX_HITS]
+
+    def candidates(self, claim: str, hits: list) -> list:
+        """
+        Sources spéculatives des entités citées par le présupposé (recherches
+        déjà terminées seulement : on n'attend pas), absentes de `hits`.
+        """
+        self.claims += 1
+        words = claim_tokens(claim)
+        seen = {h["url"] for h in hits}
+        offered = self.offered.setdefault(claim, {})
+        extra = []
+        for query, found in list(self.results.items()):
+            if not set(normalize_words(query)) <= words:
+                continue
+            for h in found:
+                if h["url"] not in seen:
+                    seen.add(h["url"])
+                    offered[h["url"]] = query
+                    extra.append(h)
+        return extra
+
+    def record_kept(self, results: list):
+        """Après le reclassement : présupposés dont une source gardée vient de la spéculation."""
+        for r in results:
+            offered = self.offered.get(r["entité"], {})
+            queries = {offered[s["url"]] for s in r["sources"] if s.get("url") in offered}
+            self.claims_hit += bool(queries)
+            self.used |= queries
+
+    def finish(self):
+        """Abandonne les recherches en cours ou en attente et enregistre le taux."""
+        self.stopped.set()
+        for future in self.futures.values():
+            future.cancel()
+        if self.queries:
+            db().execute(
+                "INSERT INTO speculation_stats (queries, used, claims, claims_hit, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (len(self.queries), len(self.used), self.claims, self.claims_hit, time.time()),
+            )
+        log_data("Spéculation", lambda: f"{self.claims_hit}/{self.claims} présupposés servis, "
+                                        f"{len(self.used)}/{len(self.queries)} requêtes utiles")
+
+@app.route("/speculation/stats", methods=["GET"])
+def speculation_stats():
+    """Taux de réussite du préchargement : présupposés servis, requêtes utiles."""
+    row = db().execute(
+        "SELECT COUNT(*) AS analyses, COALESCE(SUM(queries), 0) AS queries, COALESCE(SUM(used), 0) AS used, "
+        "COALESCE(SUM(claims), 0) AS claims, COALESCE(SUM(claims_hit), 0) AS claims_hit FROM speculation_stats"
+    ).fetchone()
+    return jsonify({
+        **dict(row),
+        "hit_rate": round(row["claims_hit"] / row["claims"], 3) if row["claims"] else None,
+        "precision": round(row["used"] / row["queries"], 3) if row["queries"] else None,
+    })
+
+# -------------------------------------------------------------
+# 🔵 3sexies) PAYLOADS COMPACTS POUR LES LLM (étapes 5 et 6)
+# -------------------------------------------------------------
+# 👉 json.dumps(payload) par défaut échappe chaque accent (é → \u00e9,
+# 6 caractères et souvent plusieurs tokens) et envoie tout tel quel :
+# titres, URL, sujets, doublons d'extraits. Ici, pour chaque étape :
+# - JSON UTF-8 sans espaces superflus
+# - seuls les champs lus par le prompt sont gardés
+# - les extraits (quasi) identiques ne sont envoyés qu'une fois
+# - les preuves sont tronquées à un budget de tokens par étape, en
+#   prenant à tour de rôle la meilleure preuve de chaque présupposé
+# Les tokens économisés sont mesurés à chaque appel (/payload/stats).
+
+ENABLE_LEAN_PAYLOADS = os.getenv("LEAN_PAYLOADS", "1") != "0"
+EVIDENCE_TOKEN_BUDGETS = {
+    "compare": int(os.getenv("COMPARE_EVIDENCE_TOKENS", "1500")),
+    "evaluate_axes": int(os.getenv("EVAL_EVIDENCE_TOKENS", "1000")),
+}
+EVIDENCE_MAX_CHARS = 400
+EVIDENCE_DUP_JACCARD = 0.8   # mots communs au-delà desquels deux extraits sont des doublons
+
+# Compteur de tokens exact si tiktoken est installé (optionnel), sinon ≈ 4 caractères / token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+_token_encoding = {}
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS payload_stats (
+    id INTEGER PRIMARY KEY,
+    step TEXT NOT NULL,
+    tokens_before INTEGER NOT NULL,
+    tokens_after INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+""")
+
+def count_tokens(text: str) -> int:
+    if tiktoken is not None and "enc" not in _token_encoding:
+        try:
+            _token_encoding["enc"] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _token_encoding["enc"] = None
+    enc = _token_encoding.get("enc")
+    return len(enc.encode(text)) if enc else (len(text) + 3) // 4
+
+def compact_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _clip(text: str, max_chars: int = EVIDENCE_MAX_CHARS) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+def lean_evidence(web_hits: list, budget: int) -> list:
+    """
+    Preuves compactes : [{"presuppose", "preuves": [{"site", "extrait"}]}],
+    sans doublons, dans la limite de `budget` tokens.
+    """
+    seen = []   # ensembles de mots des extraits déjà gardés
+    candidates = []
+    for hit in web_hits:
+        items = []
+        for source in hit.get("sources", []):
+            items.append((source.get("url"), source.get("snippet") or source.get("titre") or ""))
+        for passage in hit.get("passages", []):
+            items.append((passage.get("url"), passage.get("texte", "")))
+        kept = []
+        for url, text in items:
+            words = set(normalize_words(text))
+            if not words or any(len(words & w) / len(words | w) >= EVIDENCE_DUP_JACCARD for w in seen):
+                continue
+            seen.append(words)
+            kept.append({"site": domain_of(url), "extrait": _clip(text)})
+        candidates.append(kept)
+
+    result = [{"presuppose": hit.get("entité", ""), "preuves": []} for hit in web_hits]
+    used = count_tokens(compact_json(result))
+    # Tour de rôle : 1re preuve de chaque présupposé, puis 2e, etc.
+    for rank in range(max((len(c) for c in candidates), default=0)):
+        for i, kept in enumerate(candidates):
+            if rank < len(kept):
+                cost = count_tokens(compact_json(kept[rank])) + 1
+                if used + cost > budget:
+                    return result
+                result[i]["preuves"].append(kept[rank])
+                used += cost
+    return result
+
+def lean_summary(summary: dict) -> dict:
+    faits = [f.get("texte", "") if isinstance(f, dict) else f for f in summary.get("faits", [])]
+    return {"resume": summary.get("resume", ""), "faits": faits, "opinions": summary.get("opinions", [])}
+
+def lean_payload(step: str, legacy: dict, lean: dict) -> str:
+    """
+    Contenu envoyé au modèle pour une étape : version compacte (ou
+    l'ancienne si LEAN_PAYLOADS=0). Les deux tailles sont mesurées.
+    """
+    before = json.dumps(legacy)
+    after = compact_json(lean)
+    tokens_before, tokens_after = count_tokens(before), count_tokens(after)
+    db().execute(
+        "INSERT INTO payload_stats (step, tokens_before, tokens_after, created_at) VALUES (?, ?, ?, ?)",
+        (step, tokens_before, tokens_after, time.time()),
+    )
+    log_data(f"Payload {step} (tokens)", lambda: f"{tokens_before} → {tokens_after}")
+    return after if ENABLE_LEAN_PAYLOADS else before
+
+@app.route("/payload/stats", methods=["GET"])
+def payload_stats():
+    """Tokens envoyés avant / après compaction, par étape."""
+    rows = db().execute(
+        "SELECT step, COUNT(*) AS calls, SUM(tokens_before) AS before, SUM(tokens_after) AS after "
+        "FROM payload_stats GROUP BY step"
+    ).fetchall()
+    return jsonify({"enabled": ENABLE_LEAN_PAYLOADS, "steps": {
+        r["step"]: {
+            "calls": r["calls"],
+            "tokens_avant": r["before"],
+            "tokens_apres": r["after"],
+            "economie": round(1 - r["after"] / r["before"], 3) if r["before"] else None,
+        } for r in rows
+    }})
+
 # -------------------------------------------------------------
 # 🔵 4) FONCTIONS D'ANALYSE (PIPELINE)
 # -------------------------------------------------------------
@@ -211,51 +1656,92 @@ def extract_article_from_url(url: str) -> str:
     Version simple et robuste : d'abord Trafilatura,
     sinon fallback HTML → texte.
     Retourne l'article propre ou "" si échec.
+    Les articles des sites fiables rejoignent au passage le corpus local.
     """
+    with StepTimer("Étape 0 - Extraction URL", url=url) as span:
+        article = fetch_article(url)
+        span.set(length=len(article["text"]))
+        if article["text"] and ENABLE_LOCAL_CORPUS:
+            corpus_add(url, article["title"], article["text"])
+        return article["text"]
+
+def article_from_html(downloaded: str) -> dict:
+    """Trafilatura : texte principal + titre d'une page HTML déjà téléchargée."""
+    import trafilatura
+    text = trafilatura.extract(downloaded) or ""
+    title = ""
+    try:
+        meta = trafilatura.extract_metadata(downloaded)
+        title = (meta.title or "") if meta else ""
+    except Exception:
+        pass
+    return {"title": title, "text": text}
+
+def text_from_page(page: str) -> dict:
+    """Fallback BeautifulSoup : lignes de texte longues d'une page → {"title", "text"}."""
+    from bs4 import BeautifulSoup
 
-    print("\n🔎 [EXTRACT] Tentative extraction URL…")
+    soup = BeautifulSoup(page, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+
+    # Supprime les éléments inutiles
+    for tag in soup(["script", "style", "noscript", "footer", "header"]):
+        tag.decompose()
+
+    text = "\n".join(
+        l.strip()
+        for l in soup.get_text("\n").split("\n")
+        if len(l.strip()) > 40
+    )
+    return {"title": title, "text": text}
+
+def fetch_page(url: str) -> str:
+    """Télécharge une page via le client sortant partagé → HTML décodé."""
+    r = http_client.get(url)
+    r.raise_for_status()
+    if "charset" in r.headers.get("Content-Type", "").lower():
+        return r.text
+    # Pas de charset dans l'en-tête : détection à partir du contenu (<meta>, BOM…)
+    from trafilatura.utils import decode_file
+    return decode_file(r.content)
+
+def fetch_article(url: str) -> dict:
+    """Télécharge et extrait un article → {"title", "text"} (text = "" si échec)."""
+    log("🔎 [EXTRACT] Tentative extraction URL…")
+
+    # Un seul téléchargement : Trafilatura puis le fallback lisent la même page
+    try:
+        with StepTimer("url.fetch", cat="fetch"):
+            page = cassette_call("fetch.http", url, lambda: fetch_page(url))
+    except Exception as e:
+        log("❌ [EXTRACT] Téléchargement impossible", str(e), level=logging.WARNING)
+        return {"title": "", "text": ""}
 
     # 1) Trafilatura
     try:
-        import trafilatura
-        downloaded = trafilatura.fetch_url(url)
-        extracted = trafilatura.extract(downloaded) if downloaded else ""
-        if extracted and len(extracted) > 300:
-            print(f"✅ [EXTRACT] Trafilatura OK (len={len(extracted)})")
-            return extracted
-        print("⚠️ [EXTRACT] Trafilatura trop court → fallback")
+        article = article_from_html(page)
+        if len(article["text"]) > 300:
+            log("✅ [EXTRACT] Trafilatura OK", length=len(article["text"]))
+            return article
+        log("⚠️ [EXTRACT] Trafilatura trop court → fallback")
     except Exception as e:
-        print("⚠️ [EXTRACT] Trafilatura erreur :", e)
+        log("⚠️ [EXTRACT] Trafilatura erreur", str(e), level=logging.WARNING)
 
     # 2) Fallback HTML → texte
     try:
-        import requests
-        from bs4 import BeautifulSoup
+        article = text_from_page(page)
 
-        r = requests.get(url, timeout=6, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        # Supprime les éléments inutiles
-        for tag in soup(["script", "style", "noscript", "footer", "header"]):
-            tag.decompose()
-
-        text = "\n".join(
-            l.strip()
-            for l in soup.get_text("\n").split("\n")
-            if len(l.strip()) > 40
-        )
-
-        if len(text) > 300:
-            print(f"✅ [EXTRACT] Fallback OK (len={len(text)})")
-            return text
-        print("❌ [EXTRACT] Fallback trop court")
-        return ""
+        if len(article["text"]) > 300:
+            log("✅ [EXTRACT] Fallback OK", length=len(article["text"]))
+            return article
+        log("❌ [EXTRACT] Fallback trop court", level=logging.WARNING)
 
     except Exception as e:
-        print("❌ [EXTRACT] Fallback erreur :", e)
-        return ""
+        log("❌ [EXTRACT] Fallback erreur", str(e), level=logging.WARNING)
+    return {"title": "", "text": ""}
 
 # 🟣 ÉTAPE 1 — Message global
+@memoized_step("message_global")
 def get_message_global(text: str):
     """
     1️⃣ On essaie de résumer en UNE idée globale :
@@ -263,7 +1749,7 @@ def get_message_global(text: str):
         - Quel message principal il veut faire passer ?
     """
     with StepTimer("Étape 1 - Message global"):
-        log("[1/8] Étape 1", "Analyse du message global…", C_BLUE)
+        log("[1/8] Étape 1", "Analyse du message global…")
         prompt = """
         Analyse ce texte et identifie ce qu’un lecteur RETIENT réellement après lecture.
 
@@ -280,7 +1766,7 @@ def get_message_global(text: str):
         - "sujets_majeurs" = les thèmes principaux sur lesquels le texte oriente la perception.
         """
 
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt + "\n\nTexte :\n" + text}]
         )
@@ -289,6 +1775,7 @@ def get_message_global(text: str):
         return data
 
 # 🟣 ÉTAPE 2 — Résumé + faits + opinions
+@memoized_step("summary")
 def summarize_facts(text: str):
     """
     2️⃣ On sépare :
@@ -296,7 +1783,7 @@ def summarize_facts(text: str):
         - ce qui est subjectif (opinions)
     """
     with StepTimer("Étape 2 - Résumé + faits/opinions"):
-        log("[2/8] Étape 2", "Résumé + extraction des faits et opinions…", C_BLUE)
+        log("[2/8] Étape 2", "Résumé + extraction des faits et opinions…")
         prompt = """
         Analyse le texte suivant.
 
@@ -313,7 +1800,7 @@ def summarize_facts(text: str):
         - Le résumé doit refléter ce que le texte cherche à faire retenir.
         """
 
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt + "\n\nTexte :\n" + text}],
             response_format={"type": "json_object"}
@@ -328,20 +1815,21 @@ def summarize_facts(text: str):
         # On affiche 1 ou 2 exemples pour pédagogie
         faits = data.get("faits", [])
         if faits:
-            log_data("Exemple de fait", faits[0].get("texte", "—"), indent=6)
+            log_data("Exemple de fait", faits[0].get("texte", "—"))
         opinions = data.get("opinions", [])
         if opinions:
-            log_data("Exemple d'opinion", opinions[0], indent=6)
+            log_data("Exemple d'opinion", opinions[0])
 
         return data
 
 # 🟣 ÉTAPE 3 — Assertions vérifiables (anciennement entités)
+@memoized_step("presupposes")
 def extract_entities(text: str):
     """
     3️⃣ Extraction des assertions vérifiables (présupposés/claims).
     """
     with StepTimer("Étape 3 - Assertions vérifiables"):
-        log("[3/8] Étape 3", "Extraction des assertions vérifiables…", C_BLUE)
+        log("[3/8] Étape 3", "Extraction des assertions vérifiables…")
 
         prompt = """
         Tu dois EXTRAIRE les PRÉSUPPOSÉS du texte **uniquement s’il y en a**.
@@ -400,7 +1888,7 @@ def extract_entities(text: str):
 
 
 
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o-mini",
             messages=[
                 {"role": "user", "content": prompt + "\n\nTexte :\n" + text}
@@ -415,47 +1903,185 @@ def extract_entities(text: str):
         return data
 
 # 🟣 ÉTAPE 4 — Recherche web
-def search_web(entities: list):
+def cse_search(claim: str, key: str, cx: str) -> list:
+    """Une requête Google CSE restreinte aux sites fiables → liste de sources."""
+    query = f"{claim} ({' OR '.join(['site:' + s for s in ALLOWED_SITES])})"
+    log_data("Requête web", query)
+
+    with StepTimer("cse.query", cat="search", claim=claim) as span:
+        def call():
+            r = http_client.get(
+                "https://www.googleapis.com/customsearch/v1",
+                params={"key": key, "cx": cx, "q": query, "num": 4}
+            )
+            return {"status": r.status_code, "data": r.json()}
+
+        # La clé API n'entre pas dans l'identifiant de la cassette
+        answer = cassette_call("cse", {"q": query, "cx": cx}, call)
+        data = answer["data"]
+        span.set(status=answer["status"], hits=len(data.get("items", [])))
+    return [
+        {"titre": i["title"], "snippet": i["snippet"], "url": i["link"]}
+        for i in data.get("items", [])
+    ]
+
+# 👉 Les résultats arrivent dans l'ordre de Google (ou du corpus), quelle
+# que soit leur pertinence pour le présupposé. On les reclasse
+# localement par BM25 (titre + extrait face au présupposé), avec des
+# statistiques de termes calculées en bloc (matrice documents × termes),
+# puis on ne garde que les k meilleurs par présupposé et au plus
+# EVIDENCE_GLOBAL_CAP au total : moins de contexte inutile pour les LLM.
+ENABLE_RERANK = os.getenv("ENABLE_RERANK", "1") != "0"
+EVIDENCE_TOP_K = int(os.getenv("EVIDENCE_TOP_K", "3"))
+EVIDENCE_GLOBAL_CAP = int(os.getenv("EVIDENCE_GLOBAL_CAP", "8"))
+BM25_K1, BM25_B = 1.2, 0.75
+
+def bm25_scores(queries: list, docs: list) -> "np.ndarray":
+    """Scores BM25 (documents × requêtes) ; l'IDF vient des documents candidats."""
+    import numpy as np
+    doc_tokens = [normalize_words(d) for d in docs]
+    query_tokens = [normalize_words(q) for q in queries]
+    vocab = {}
+    for tokens in doc_tokens + query_tokens:
+        for t in tokens:
+            vocab.setdefault(t, len(vocab))
+    if not vocab or not docs:
+        return np.zeros((len(docs), len(queries)))
+
+    tf = np.zeros((len(docs), len(vocab)))
+    for i, tokens in enumerate(doc_tokens):
+        np.add.at(tf[i], [vocab[t] for t in tokens], 1)
+    q = np.zeros((len(queries), len(vocab)))
+    for j, tokens in enumerate(query_tokens):
+        q[j, [vocab[t] for t in set(tokens)]] = 1
+
+    lengths = tf.sum(axis=1, keepdims=True)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1e-9))
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+    weights = idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return weights @ q.T
+
+def rerank_sources(results: list) -> list:
+    """Garde, par présupposé, ses meilleures sources (BM25) sous le plafond global."""
+    docs, owners = [], []
+    for i, r in enumerate(results):
+        for j, source in enumerate(r["sources"]):
+            docs.append(f"{source.get('titre', '')} {source.get('snippet', '')}")
+            owners.append((i, j))
+    if not docs:
+        return results
+
+    with StepTimer("evidence.rerank", cat="search", candidates=len(docs)) as span:
+        scores = bm25_scores([r["entité"] for r in results], docs)
+        ranked = [[] for _ in results]
+        for d, (i, j) in enumerate(owners):
+            ranked[i].append((scores[d, i], j))
+        for lst in ranked:
+            lst.sort(key=lambda x: (-x[0], x[1]))  # à score égal : ordre d'origine
+
+        # Tour de rôle entre présupposés : 1er de chacun, puis 2e… jusqu'au plafond
+        kept = [[] for _ in results]
+        total = 0
+        for rank in range(EVIDENCE_TOP_K):
+            for i, lst in enumerate(ranked):
+                if rank < len(lst) and total < EVIDENCE_GLOBAL_CAP:
+                    score, j = lst[rank]
+                    kept[i].append({**results[i]["sources"][j], "bm25": round(float(score), 3)})
+                    total += 1
+        span.set(kept=total)
+
+    return [{**r, "sources": k} for r, k in zip(results, kept)]
+
+def gather_sources(claim: str, key: Optional[str], cx: Optional[str]) -> list:
+    """Corpus local d'abord ; Google CSE seulement si ça ne suffit pas."""
+    hits = corpus_search(claim) if ENABLE_LOCAL_CORPUS else []
+    if len(hits) < LOCAL_MIN_HITS and key and cx:
+        seen = {h["url"] for h in hits}
+        hits += [h for h in cse_search(claim, key, cx) if h["url"] not in seen]
+    return hits
+
+@memoized_step("search_web", uses=(gather_sources, cse_search, rerank_sources, bm25_scores),
+               ignore=("prefetch",),
+               config=lambda: [ALLOWED_SITES, ENABLE_LOCAL_CORPUS, ENABLE_VECTOR_INDEX,
+                               ENABLE_RERANK, EVIDENCE_TOP_K, EVIDENCE_GLOBAL_CAP])
+def search_web(entities: list, prefetch: Optional[SpeculativePrefetch] = None):
     """
     4️⃣ À partir des entités, on interroge Google Custom Search
         sur une liste de médias considérés comme fiables.
+        Ordre : cache de preuves (présupposé déjà vu) → corpus local
+        (FTS5) → Google CSE seulement si le local ne suffit pas.
+        `prefetch` (recherches spéculatives) ajoute aux candidats d'un
+        présupposé les sources des entités qu'il cite ; seules celles que
+        BM25 garde lui sont comptées.
+        Les sources sont ensuite reclassées par BM25 (top-k par présupposé).
+        Chaque présupposé reçoit aussi des passages proches par le sens
+        (index vectoriel), transmis tels quels à compare_text_web.
     """
     with StepTimer("Étape 4 - Recherche web"):
-        log("[4/8] Étape 4", "Recherche web sur des sources fiables…", C_BLUE)
+        log("[4/8] Étape 4", "Recherche web sur des sources fiables…")
 
         key = os.getenv("GOOGLE_CSE_API_KEY")
         cx = os.getenv("GOOGLE_CSE_CX")
         if not key or not cx:
-            log("⚠️ GOOGLE_CSE", "Pas de clé API ou de CX configuré → recherche web désactivée.", C_YELLOW, indent=4)
-            return []
+            log("⚠️ GOOGLE_CSE", "Pas de clé API ou de CX configuré → recherche web désactivée.", level=logging.WARNING)
+            if not ENABLE_EVIDENCE_CACHE and not ENABLE_LOCAL_CORPUS:
+                return []
 
-        results = []
         # Si entities est un dict avec 'presupposes', extraire la liste
         if isinstance(entities, dict):
             entity_list = entities.get("presupposes", [])
         else:
             entity_list = entities if isinstance(entities, list) else []
 
+        results = []
+        story_id = None
+        to_store = []
+        hits_count = 0
         for ent in entity_list[:3]:  # on limite à 3 entités pour ne pas exploser le quota
-            query = f"{ent} ({' OR '.join(['site:' + s for s in ALLOWED_SITES])})"
-            log_data("Requête web", query, indent=6)
-
-            r = requests.get(
-                "https://www.googleapis.com/customsearch/v1",
-                params={"key": key, "cx": cx, "q": query, "num": 4}
-            )
-            data = r.json()
-            hits = [
-                {"titre": i["title"], "snippet": i["snippet"], "url": i["link"]}
-                for i in data.get("items", [])
-            ]
-            log_data(f"Nombre de sources pour « {ent} »", len(hits), indent=6)
-
+            cached = evidence_lookup(ent) if ENABLE_EVIDENCE_CACHE else None
+            if cached is not None:
+                hits = cached["sources"]
+                story_id = story_id or cached["story_id"]
+                hits_count += 1
+                log_data(f"Sources en cache pour « {ent} »", len(hits))
+            else:
+                hits = gather_sources(ent, key, cx)
+                if hits:
+                    to_store.append((ent, hits))
+                log_data(f"Nombre de sources pour « {ent} »", len(hits))
+
+            if prefetch is not None:
+                # Candidats seulement : le cache ne garde que les sources du présupposé
+                hits = hits + prefetch.candidates(ent, hits)
             results.append({"entité": ent, "sources": hits})
 
+        if ENABLE_RERANK and results:
+            results = rerank_sources(results)
+            log_data("Sources gardées après BM25", lambda: [len(r["sources"]) for r in results])
+            if prefetch is not None:
+                prefetch.record_kept(results)
+
+        # Passages sémantiquement proches (un seul balayage pour tous les présupposés)
+        if ENABLE_VECTOR_INDEX and results:
+            passages = vector_search([r["entité"] for r in results])
+            for r, found in zip(results, passages):
+                r["passages"] = found
+            log_data("Passages sémantiques", lambda: [len(p) for p in passages])
+
+        if ENABLE_EVIDENCE_CACHE and results:
+            if story_id is None:
+                story_id = evidence_new_story(entity_list[0])
+            for ent, hits in to_store:
+                evidence_store(ent, story_id, hits)
+            evidence_record(story_id, hits_count, len(results) - hits_count)
+            log_data("Cache de preuves", lambda: f"story {story_id} : {hits_count}/{len(results)} réutilisés")
+
         return results
 
 # 🟣 ÉTAPE 5 — Comparaison texte vs web
+@memoized_step("compare", uses=(lean_payload, lean_evidence, lean_summary),
+               config=lambda: [ENABLE_LEAN_PAYLOADS, EVIDENCE_TOKEN_BUDGETS])
 def compare_text_web(summary: dict, web_hits: list):
     """
     5️⃣ On compare :
@@ -467,14 +2093,16 @@ def compare_text_web(summary: dict, web_hits: list):
         - divergences
     """
     with StepTimer("Étape 5 - Comparaison texte vs sources"):
-        log("[5/8] Étape 5", "Comparaison du texte avec les sources web…", C_BLUE)
+        log("[5/8] Étape 5", "Comparaison du texte avec les sources web…")
 
         prompt = """
         Tu compares un texte avec des articles fiables.
 
         Entrées :
         - summary : résumé + faits/opinions
-        - web_hits : extraits de sources fiables
+        - web_hits : pour chaque présupposé, extraits de sources fiables
+          (résultats de recherche et paragraphes proches par le sens),
+          avec le site d'origine
 
         Analyse :
         1) Ce que disent les sources fiables sur les présupposés.
@@ -502,16 +2130,18 @@ def compare_text_web(summary: dict, web_hits: list):
 
 
         # On envoie un contexte compact (on évite d'injecter tout brut)
-        payload = {
-            "summary": summary,
-            "web_hits": web_hits,
-        }
+        payload = lean_payload(
+            "compare",
+            {"summary": summary, "web_hits": web_hits},
+            {"summary": lean_summary(summary),
+             "web_hits": lean_evidence(web_hits, EVIDENCE_TOKEN_BUDGETS["compare"])},
+        )
 
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o-mini",
             messages=[
                 {"role": "user", "content": prompt},
-                {"role": "user", "content": json.dumps(payload)}
+                {"role": "user", "content": payload}
             ]
         )
         data = extract_json(
@@ -527,13 +2157,71 @@ def compare_text_web(summary: dict, web_hits: list):
         return data
 
 # 🟣 ÉTAPE 6 — Évaluation des axes
+# 👉 Auto-cohérence : un même texte peut recevoir des notes différentes
+# d'une exécution à l'autre. On demande EVAL_SAMPLES évaluations dans le
+# MÊME appel (paramètre `n` : un seul aller-retour, le prompt n'est
+# facturé qu'une fois), puis on garde la note médiane de chaque axe,
+# ramenée sur la grille autorisée. L'écart entre les évaluations donne
+# la confiance de l'analyse (100 = toutes les évaluations d'accord).
+EVAL_SAMPLES = max(1, int(os.getenv("EVAL_SAMPLES", "3")))
+NOTE_GRID = [0, 20, 40, 60, 80, 100]
+
+def snap_note(value: float) -> int:
+    """Note autorisée la plus proche (la plus basse en cas d'égalité)."""
+    return min(NOTE_GRID, key=lambda g: (abs(g - value), g))
+
+def aggregate_axes(samples: list) -> dict:
+    """
+    Combine plusieurs évaluations {"axes": …} : note médiane par axe,
+    justification d'une évaluation qui a donné cette note.
+    Renvoie {"axes": …, "confiance": {"score", "explication", "evaluations", "ecarts"}}.
+    """
+    axes, ecarts = {}, {}
+    for category, axes_def in AXES_CONFIG.items():
+        axes[category] = {}
+        for key in axes_def:
+            votes = []
+            for sample in samples:
+                axis = sample.get("axes", {}).get(category, {}).get(key)
+                if isinstance(axis, dict) and isinstance(axis.get("note"), (int, float)):
+                    votes.append(axis)
+            if not votes:
+                continue
+            notes = sorted(v["note"] for v in votes)
+            mid = len(notes) // 2
+            median = notes[mid] if len(notes) % 2 else (notes[mid - 1] + notes[mid]) / 2
+            note = snap_note(median)
+            chosen = min(votes, key=lambda v: abs(v["note"] - note))
+            axes[category][key] = {**chosen, "note": note}
+            ecarts[f"{category}.{key}"] = notes[-1] - notes[0]
+
+    if len(samples) < 2 or not ecarts:
+        confiance = {"score": None, "explication": "Une seule évaluation : stabilité non mesurée.",
+                     "evaluations": len(samples), "ecarts": ecarts}
+        return {"axes": axes, "confiance": confiance}
+
+    # Écart moyen 0 → 100 ; un pas de grille (20) sur chaque axe → 60
+    mean_spread = sum(ecarts.values()) / len(ecarts)
+    score = max(0, min(100, round(100 - 2 * mean_spread)))
+    unstable = [f"{name} ({spread} pts)" for name, spread in ecarts.items() if spread]
+    explication = (
+        f"{len(samples)} évaluations indépendantes : "
+        + (f"notes variables sur {', '.join(unstable)}." if unstable else "notes identiques sur tous les axes.")
+    )
+    confiance = {"score": score, "explication": explication, "evaluations": len(samples), "ecarts": ecarts}
+    return {"axes": axes, "confiance": confiance}
+
+@memoized_step("evaluate_axes", uses=(aggregate_axes, lean_payload, lean_evidence, lean_summary),
+               config=lambda: [AXES_CONFIG, EVAL_SAMPLES, ENABLE_LEAN_PAYLOADS, EVIDENCE_TOKEN_BUDGETS])
 def evaluate_axes(summary: dict, web_facts: list, diffs: dict, global_msg: dict):
     """
     6️⃣ À partir de tout ce qu'on a vu, on attribue des notes
         selon AXES_CONFIG (fond/formes).
+        Avec EVAL_SAMPLES > 1, plusieurs évaluations sont tirées en un
+        seul appel puis agrégées (voir aggregate_axes).
     """
     with StepTimer("Étape 6 - Évaluation des axes"):
-        log("[6/8] Étape 6", "Évaluation des 4 axes…", C_BLUE)
+        log("[6/8] Étape 6", "Évaluation des 4 axes…")
 
         # Construction dynamique du texte d'axes + template JSON attendu
         axes_lines = []
@@ -671,26 +2359,31 @@ def evaluate_axes(summary: dict, web_facts: list, diffs: dict, global_msg: dict)
         ⚠️ Notes OBLIGATOIREMENT dans [0,20,40,60,80,100]
         """.strip()
 
-        payload = {
-            "global_msg": global_msg,
-            "summary": summary,
-            "web_facts": web_facts,
-            "diffs": diffs,
-        }
+        payload = lean_payload(
+            "evaluate_axes",
+            {"global_msg": global_msg, "summary": summary, "web_facts": web_facts, "diffs": diffs},
+            {
+                "global_msg": {k: global_msg.get(k, "") for k in ("message", "opinion_retention")},
+                "summary": lean_summary(summary),
+                "web_facts": lean_evidence(web_facts, EVIDENCE_TOKEN_BUDGETS["evaluate_axes"]),
+                "diffs": {k: diffs.get(k) for k in ("faits_manquants", "contradictions", "divergences",
+                                                    "impact", "perception_impactee") if k in diffs},
+            },
+        )
 
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o",
             messages=[
                 {"role": "user", "content": prompt},
-                {"role": "user", "content": json.dumps(payload)}
-            ]
+                {"role": "user", "content": payload}
+            ],
+            n=EVAL_SAMPLES,
         )
 
-        data = extract_json(resp.choices[0].message.content, {"axes": {}})
-
-        axes = data.get("axes", {})
-        fond = axes.get("fond", {})
-        forme = axes.get("forme", {})
+        samples = [extract_json(c.message.content, {"axes": {}}) for c in resp.choices]
+        data = aggregate_axes(samples)
+        axes = data["axes"]
+        log_data("Confiance (auto-cohérence)", data["confiance"])
 
         # Logs pédagogiques par axe
         for category, axes_def in AXES_CONFIG.items():
@@ -701,13 +2394,14 @@ def evaluate_axes(summary: dict, web_facts: list, diffs: dict, global_msg: dict)
         return data
 
 # 🟣 ÉTAPE 7 — Synthèse globale
+@memoized_step("synthesis")
 def build_synthesis(axes: dict):
     """
     7️⃣ On produit un texte synthétique qui explique le résultat global
         (ce que le frontend affiche dans le gros encadré).
     """
     with StepTimer("Étape 7 - Synthèse"):
-        log("[7/8] Étape 7", "Génération de la synthèse globale…", C_BLUE)
+        log("[7/8] Étape 7", "Génération de la synthèse globale…")
 
         prompt = """
         Tu dois écrire une synthèse très courte et percutante (3 phrases maximum).
@@ -729,7 +2423,7 @@ def build_synthesis(axes: dict):
             Phrase 3 : impact final sur la fiabilité du texte (fiable / assez fiable / partiel / peu fiable / non fiable).
         - Ne rien inventer.
         """
-        resp = client.chat.completions.create(
+        resp = llm_chat(
             model="gpt-4o-mini",
             messages=[
                 {"role": "user", "content": prompt},
@@ -747,7 +2441,7 @@ def compute_score(axes: dict) -> int:
     Fond compte plus que forme via les poids.
     """
     with StepTimer("Étape 8 - Score global"):
-        log("[8/8] Étape 8", "Calcul du score global…", C_BLUE)
+        log("[8/8] Étape 8", "Calcul du score global…")
 
         total = 0.0
         for category, axes_def in AXES_CONFIG.items():
@@ -767,41 +2461,99 @@ def compute_score(axes: dict) -> int:
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    if DEBUG:
-        print()
-        log("===== 🚀 NOUVELLE ANALYSE LANCÉE =====", color=C_MAGENTA)
+    with StepTimer("POST /analyze", cat="request"):
+        result, error = _analyze()
+        return error or jsonify(result)
+
+def _analyze():
+    """
+    Analyse la requête courante (texte ou URL).
+    Renvoie (réponse complète, None) ou (None, réponse d'erreur Flask).
+    """
+    log("🚀 NOUVELLE ANALYSE LANCÉE")
 
     try:
         payload = AnalyzeRequest(**request.json)
     except Exception as e:
-        log("❌ ERREUR REQUÊTE", str(e), color=C_YELLOW)
-        return jsonify({"error": "Requête invalide"}), 400
+        log("❌ ERREUR REQUÊTE", str(e), level=logging.WARNING)
+        return None, (jsonify({"error": "Requête invalide"}), 400)
 
     text = payload.text.strip()
 
-    log_data("Texte reçu (début)", text[:200] + ("…" if len(text) > 200 else ""), color=C_CYAN)
+    log_data("Texte reçu (début)", lambda: text[:200] + ("…" if len(text) > 200 else ""))
 
+    # Double clic, relance réseau : une seule exécution du pipeline (section 5septies)
+    idempotency_key = request.headers.get("Idempotency-Key", "").strip()
+    if len(idempotency_key) > IDEMPOTENCY_KEY_MAX:
+        return None, (jsonify({"error": "Idempotency-Key trop longue"}), 400)
+    flight_key = text_sha(text) + (":force" if payload.force else "")
+    run = lambda: analysis_flights.run(flight_key, lambda: analyze_input(text, payload.force))
+    if idempotency_key:
+        return with_idempotency_key(idempotency_key, flight_key, run)
+    return run(), None
+
+def analyze_input(text: str, force: bool = False) -> dict:
+    """Entrée brute (texte ou URL) → réponse complète, ajoutée à l'historique."""
     # --------------------------------------------------
     # Si l'entrée est une URL → on tente d'extraire l'article
     # --------------------------------------------------
+    source_url = None
     if ENABLE_URL_EXTRACT and re.match(r"^https?://", text):
-        print("🌐 [ANALYZE] URL détectée :", text[:80], "...")
+        source_url = text
+        # Analyse récente de cette URL → servie tout de suite (section 5octies)
+        if ENABLE_URL_SWR and not force:
+            cached = url_cache_get(source_url)
+            if cached is not None:
+                return cached
+        log("🌐 [ANALYZE] URL détectée", text[:80])
         extracted = extract_article_from_url(text)
 
         if extracted and len(extracted) > 300:
-            print(f"📝 [ANALYZE] Article extrait (len={len(extracted)}) → analyse OK\n")
+            log("📝 [ANALYZE] Article extrait → analyse OK", length=len(extracted))
             text = extracted[:8000]  # Limite sécurité
         else:
-            print("❌ [ANALYZE] Impossible d'extraire un article → analyse probablement vide")
-
-    # 1️⃣ → 7️⃣ : pipeline d'analyse
-    global_msg = get_message_global(text)
-    summary = summarize_facts(text)
-    entities = extract_entities(text)
-    web_hits = search_web(entities)
+            log("❌ [ANALYZE] Impossible d'extraire un article → analyse probablement vide", level=logging.WARNING)
+
+    # Texte déjà (presque) analysé ? → on renvoie l'analyse existante
+    result = None
+    if ENABLE_NEAR_DUP and not force:
+        result = find_previous_analysis(text)
+    if result is None:
+        result = run_pipeline(text)
+        append_history(build_history_item(text, source_url, result))
+    if ENABLE_URL_SWR and source_url and text != source_url:
+        url_cache_store(source_url, text, result)
+    return result
+
+def run_pipeline(text: str) -> dict:
+    """
+    1️⃣ → 8️⃣ : exécute tout le pipeline d'analyse sur un texte
+    et renvoie la réponse (dict validé par AnalyzeResponse).
+    """
+    token = step_timings_var.set([])
+    try:
+        return _run_pipeline(text)
+    finally:
+        step_timings_var.reset(token)
+
+def _run_pipeline(text: str) -> dict:
+    # Recherches spéculatives en arrière-plan pendant les étapes 1 à 3
+    # (inutile en ré-analyse mémoïsée : la recherche est servie depuis la base ;
+    # et sans reclassement BM25 : c'est lui qui trie les candidats spéculatifs)
+    prefetch = (SpeculativePrefetch(text)
+                if ENABLE_SPECULATIVE_SEARCH and ENABLE_RERANK and not ENABLE_STEP_MEMO else None)
+    try:
+        global_msg = get_message_global(text)
+        summary = summarize_facts(text)
+        entities = extract_entities(text)
+        web_hits = search_web(entities, prefetch)
+    finally:
+        if prefetch is not None:
+            prefetch.finish()
     diffs = compare_text_web(summary, web_hits)
     evals = evaluate_axes(summary, web_hits, diffs, global_msg)
     axes = evals["axes"]
+    confiance = evals["confiance"]
 
     synthese = build_synthesis(axes)
     score = compute_score(axes)
@@ -822,9 +2574,10 @@ def analyze():
     forme_l = axes["forme"]["Logique"]["note"]
 
     # Log final récap
-    log("✅ ANALYSE TERMINÉE", color=C_GREEN)
-    log_data("Score global", score, indent=4, color=C_GREEN)
-    log_data("Couleur globale", color_for(score), indent=4, color=C_GREEN)
+    log("✅ ANALYSE TERMINÉE", score_global=score, couleur_global=color_for(score))
+    record_event("result", input_sha=text_sha(text)[:16], score=score, couleur=color_for(score),
+                 notes={f"{c}.{k}": axes[c][k]["note"] for c in axes for k in axes[c]},
+                 confiance=confiance["score"], steps=step_timings_var.get())
 
     response = AnalyzeResponse(
         score_global=score,
@@ -837,33 +2590,1729 @@ def analyze():
         completude=fond_c,
         ton=forme_n,
         sophismes=forme_l,
-        confiance_analyse=score,           # pour l'instant = même valeur
-        explication_confiance=""           # tu pourras remplir ça plus tard
+        # Confiance = accord entre les évaluations (à défaut : le score)
+        confiance_analyse=confiance["score"] if confiance["score"] is not None else score,
+        explication_confiance=confiance["explication"],
+    )
+
+    return response.model_dump()
+
+# -------------------------------------------------------------
+# 🔵 5bis) HISTORIQUE DES ANALYSES (/history)
+# -------------------------------------------------------------
+# 👉 logs.jsonl est un fichier "append-only" : une analyse = une ligne.
+# On ne le charge JAMAIS en entier : on le lit par blocs depuis la fin
+# (pagination) ou depuis le début (export), donc la mémoire utilisée
+# reste constante quelle que soit la taille de l'historique.
+#
+# Pagination "keyset" : le curseur est la position (en octets) du début
+# de la dernière ligne renvoyée. Comme le fichier ne fait que grandir,
+# cette position reste valable même si de nouvelles analyses arrivent.
+#
+# Le score enregistré dépend des poids d'AXES_CONFIG au moment de
+# l'analyse. À la lecture, score et couleur sont recalculés à partir des
+# notes par axe avec les poids ACTUELS (l'ancien score reste visible
+# dans "score_enregistre" s'il diffère) : /history, l'export et les
+# analyses réutilisées restent cohérents après un changement de poids.
+
+HISTORY_PAGE_DEFAULT = 20
+HISTORY_PAGE_MAX = 200
+HISTORY_READ_BLOCK = 64 * 1024
+
+_history_lock = threading.Lock()
+
+def text_sha(text: str) -> str:
+    """Empreinte SHA-256 du texte analysé (espaces normalisés)."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def domain_of(url: Optional[str]) -> Optional[str]:
+    """Retourne le domaine d'une URL sans le "www." (ou None)."""
+    if not url:
+        return None
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else (host or None)
+
+def build_history_item(text: str, source_url: Optional[str], result: dict) -> dict:
+    """Construit la ligne d'historique enregistrée pour une analyse."""
+    notes = response_notes(result)
+    return {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "input_excerpt": text[:300],
+        "url": source_url,
+        "domaine": domain_of(source_url),
+        "text_sha": text_sha(text),
+        "score_global": result["score_global"],
+        "couleur_global": result["couleur_global"],
+        "notes": notes,
+        "resume": result["resume"],
+        "commentaire": result["commentaire"],
+        "simhash": f"{simhash(text):016x}",
+        "response": result,
+    }
+
+def response_notes(result: dict) -> dict:
+    """Notes par axe "catégorie.clé" d'une réponse du pipeline."""
+    notes = {}
+    for category, axes_def in AXES_CONFIG.items():
+        for key in axes_def:
+            notes[f"{category}.{key}"] = result["axes"].get(category, {}).get(key, {}).get("note", 0)
+    return notes
+
+def append_history(item: dict) -> Optional[int]:
+    """
+    Ajoute une analyse à la fin de logs.jsonl (une ligne JSON).
+    Renvoie la position (en octets) de la ligne écrite, ou None si échec.
+    """
+    line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        with _history_lock:
+            with open(HISTORY_FILE, "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(line)
+        return offset
+    except Exception as e:
+        log("ℹ️ Échec écriture historique", str(e), level=logging.WARNING)
+        return None
+
+def read_history_at(offset: int) -> Optional[dict]:
+    """Relit l'entrée d'historique qui commence à cette position."""
+    try:
+        with open(HISTORY_FILE, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+    except Exception:
+        return None
+
+def iter_lines_reverse(path: str, end: Optional[int] = None):
+    """
+    Parcourt un fichier JSONL de la FIN vers le début, par blocs.
+    Renvoie des couples (position_debut_ligne, ligne_bytes).
+    `end` = on ne lit que les octets situés avant cette position.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell() if end is None else min(end, f.tell())
+        buf = b""
+        while pos > 0:
+            size = min(HISTORY_READ_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            buf = f.read(size) + buf
+            lines = buf.split(b"\n")
+            # lines[0] peut être une ligne coupée : on la garde pour le bloc suivant
+            buf = lines[0]
+            line_end = pos + len(buf)
+            starts = []
+            for line in lines[1:]:
+                line_start = line_end + 1
+                starts.append((line_start, line))
+                line_end = line_start + len(line)
+            for line_start, line in reversed(starts):
+                if line.strip():
+                    yield line_start, line
+        if buf.strip():
+            yield 0, buf
+
+def iter_lines_forward(path: str):
+    """Parcourt un fichier JSONL du début vers la fin, ligne par ligne."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield line.rstrip(b"\n")
+
+def axis_weights() -> dict:
+    """Poids actuels d'AXES_CONFIG, par axe "catégorie.clé" (même ordre que compute_score)."""
+    return {f"{category}.{key}": meta.get("poids", 0)
+            for category, axes_def in AXES_CONFIG.items() for key, meta in axes_def.items()}
+
+def with_current_score(item: dict, weights: dict) -> dict:
+    """Recalcule score et couleur de l'entrée avec ces poids (modifie et renvoie l'entrée)."""
+    notes = item.get("notes")
+    if not isinstance(notes, dict):
+        return item  # anciennes entrées : pas de notes par axe
+    total = 0.0
+    for axis, poids in weights.items():
+        total += notes.get(axis, 0) * poids
+    score = int(round(total))
+    if score != item.get("score_global"):
+        item["score_enregistre"] = item.get("score_global")
+        item["score_global"] = score
+        item["couleur_global"] = color_for(score)
+        if isinstance(item.get("response"), dict):
+            item["response"] = {**item["response"], "score_global": score, "couleur_global": color_for(score)}
+    return item
+
+def response_with_current_score(result: dict) -> dict:
+    """Réponse enregistrée telle quelle (cache d'URL, Idempotency-Key), rescorée avec les poids actuels."""
+    if not isinstance(result.get("axes"), dict):
+        return result
+    item = {"notes": response_notes(result), "score_global": result.get("score_global"), "response": result}
+    return with_current_score(item, axis_weights())["response"]
+
+def parse_history_filters(args) -> dict:
+    """Lit les filtres de la query string (ValueError si invalide)."""
+    filters = {
+        "since": args.get("since") or None,
+        "until": args.get("until") or None,
+        "score_min": None,
+        "score_max": None,
+        "domaine": (args.get("domaine") or args.get("domain") or "").lower() or None,
+    }
+    for name in ("score_min", "score_max"):
+        if args.get(name) not in (None, ""):
+            filters[name] = int(args[name])
+    return filters
+
+def history_matches(item: dict, filters: dict) -> bool:
+    """Vrai si l'entrée d'historique passe tous les filtres."""
+    # Les horodatages ISO se comparent directement comme des chaînes
+    ts = item.get("timestamp", "")
+    if filters["since"] and ts < filters["since"]:
+        return False
+    if filters["until"] and ts > filters["until"]:
+        return False
+    score = item.get("score_global")
+    if filters["score_min"] is not None and (score is None or score < filters["score_min"]):
+        return False
+    if filters["score_max"] is not None and (score is None or score > filters["score_max"]):
+        return False
+    if filters["domaine"]:
+        dom = (item.get("domaine") or "").lower()
+        if dom != filters["domaine"] and not dom.endswith("." + filters["domaine"]):
+            return False
+    return True
+
+@app.route("/history", methods=["GET"])
+def get_history():
+    """
+    Historique paginé, du plus récent au plus ancien.
+    Paramètres : limit, cursor, since, until, score_min, score_max, domaine,
+    full=1 (inclut la réponse complète de chaque analyse).
+    Réponse : {"items": [...], "next_cursor": "<position>" ou null}
+    """
+    try:
+        filters = parse_history_filters(request.args)
+        limit = int(request.args.get("limit", HISTORY_PAGE_DEFAULT))
+        cursor = request.args.get("cursor")
+        full = request.args.get("full") == "1"
+        end = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Paramètres invalides"}), 400
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+
+    weights = axis_weights()
+    items = []
+    next_cursor = None
+    for line_start, line in iter_lines_reverse(HISTORY_FILE, end):
+        try:
+            item = with_current_score(json.loads(line), weights)
+        except Exception:
+            continue  # ligne corrompue ignorée
+        if not history_matches(item, filters):
+            continue
+        if not full:
+            item.pop("response", None)  # réponse complète : seulement avec ?full=1
+        items.append(item)
+        if len(items) >= limit:
+            next_cursor = str(line_start) if line_start > 0 else None
+            break
+
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@app.route("/history/export", methods=["GET"])
+def export_history():
+    """
+    Export complet (filtré) en NDJSON, envoyé en streaming :
+    une ligne lue = une ligne envoyée, rien n'est accumulé en mémoire.
+    """
+    try:
+        filters = parse_history_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "Paramètres invalides"}), 400
+    weights = axis_weights()
+
+    def generate():
+        for line in iter_lines_forward(HISTORY_FILE):
+            try:
+                item = with_current_score(json.loads(line), weights)
+            except Exception:
+                continue
+            if not history_matches(item, filters):
+                continue
+            if "score_enregistre" in item:
+                # Score recalculé : la ligne d'origine n'est plus à jour
+                line = json.dumps(item, ensure_ascii=False).encode("utf-8")
+            yield line + b"\n"
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=history.ndjson"},
+    )
+
+# -------------------------------------------------------------
+# 🔵 5ter) QUASI-DOUBLONS (SimHash) — réutiliser une analyse existante
+# -------------------------------------------------------------
+# 👉 Les utilisateurs recollent souvent le même article avec de petites
+# différences (espaces, dernier paragraphe coupé, chapeau différent).
+# Un hash exact ne les reconnaît pas ; SimHash, si : deux textes proches
+# ont des empreintes 64 bits qui ne diffèrent que de quelques bits.
+#
+# Index LSH : l'empreinte est découpée en (d_max + 1) bandes. Si deux
+# empreintes diffèrent d'au plus d_max bits, au moins une bande est
+# identique (principe des tiroirs) → on ne compare que ces candidats.
+#
+# L'index ne garde en mémoire que (empreinte, position dans logs.jsonl) ;
+# il relit la fin du fichier à chaque recherche pour voir les analyses
+# faites par les autres workers. `force: true` dans /analyze l'ignore.
+
+ENABLE_NEAR_DUP = os.getenv("ENABLE_NEAR_DUP", "1") != "0"
+# Similarité minimale (1 - bits différents / 64) pour réutiliser une analyse
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+
+def simhash(text: str) -> int:
+    """Empreinte SimHash 64 bits sur des 3-grammes de mots."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+class NearDupIndex:
+    """Index LSH d'empreintes SimHash → position dans l'historique."""
+    def __init__(self, threshold: float):
+        self.max_distance = int(SIMHASH_BITS * (1 - threshold))
+        n_bands = self.max_distance + 1
+        width = SIMHASH_BITS // n_bands
+        self.bands = [(i * width, width if i < n_bands - 1 else SIMHASH_BITS - i * width)
+                      for i in range(n_bands)]
+        self.tables = [dict() for _ in self.bands]
+        self.scanned_until = 0
+        self.lock = threading.Lock()
+
+    def _keys(self, fingerprint: int):
+        for i, (shift, width) in enumerate(self.bands):
+            yield i, (fingerprint >> shift) & ((1 << width) - 1)
+
+    def add(self, fingerprint: int, offset: int):
+        for i, key in self._keys(fingerprint):
+            self.tables[i].setdefault(key, []).append((fingerprint, offset))
+
+    def refresh(self):
+        """Indexe les lignes ajoutées à logs.jsonl depuis le dernier passage."""
+        if not os.path.exists(HISTORY_FILE):
+            return
+        with open(HISTORY_FILE, "rb") as f:
+            f.seek(self.scanned_until)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # ligne en cours d'écriture : on la reprendra
+                self.scanned_until = f.tell()
+                if b'"simhash"' not in line or b'"response"' not in line:
+                    continue  # anciennes entrées : pas de réponse à réutiliser
+                try:
+                    self.add(int(json.loads(line)["simhash"], 16), offset)
+                except Exception:
+                    continue
+
+    def lookup(self, fingerprint: int):
+        """Renvoie (distance, position) du plus proche voisin sous le seuil, ou None."""
+        with self.lock:
+            self.refresh()
+            best = None
+            for i, key in self._keys(fingerprint):
+                for candidate, offset in self.tables[i].get(key, ()):
+                    distance = bin(candidate ^ fingerprint).count("1")
+                    if distance <= self.max_distance and (
+                        best is None or (distance, -offset) < (best[0], -best[1])
+                    ):
+                        best = (distance, offset)
+            return best
+
+near_dup_index = NearDupIndex(NEAR_DUP_THRESHOLD)
+
+def find_previous_analysis(text: str) -> Optional[dict]:
+    """
+    Cherche une analyse antérieure du même texte (ou presque).
+    Renvoie la réponse enregistrée, marquée "approximate" si le texte
+    n'est pas strictement identique, ou None.
+    """
+    with StepTimer("near_dup.lookup", cat="cache") as span:
+        match = near_dup_index.lookup(simhash(text))
+        span.set(hit=match is not None)
+    if match is None:
+        return None
+    distance, offset = match
+    item = read_history_at(offset)
+    if not item or "response" not in item:
+        return None
+    item = with_current_score(item, axis_weights())
+
+    response = dict(item["response"])
+    response["approximate"] = item.get("text_sha") != text_sha(text)
+    response["similarite"] = round(1 - distance / SIMHASH_BITS, 3)
+    response["analyse_reference"] = item.get("timestamp")
+    log("♻️ Analyse existante réutilisée", similarite=response["similarite"],
+        approximate=response["approximate"])
+    return response
+
+# -------------------------------------------------------------
+# 🔵 5quater) TRACES (/traces) — cascade par requête
+# -------------------------------------------------------------
+# 👉 /traces                 : dernières requêtes tracées
+#    /traces/<id>            : cascade HTML (chemin critique en orange)
+#    /traces/<id>.json       : format Trace Event (à ouvrir dans ui.perfetto.dev)
+
+TRACE_LIST_MAX = 50
+
+def trace_files() -> list:
+    """Fichier de traces courant + archives de rotation (de la plus ancienne à la plus récente)."""
+    backups = [f"{TRACE_FILE}.{i}" for i in range(TRACE_BACKUPS, 0, -1)]
+    return [p for p in backups + [TRACE_FILE] if os.path.exists(p)]
+
+def load_trace(trace_id: str) -> list:
+    """Tous les spans d'une trace, triés par début."""
+    needle = f'"trace_id": "{trace_id}"'.encode("utf-8")
+    events = []
+    for path in trace_files():
+        for line in iter_lines_forward(path):
+            if needle in line:
+                try:
+                    events.append(json.loads(line))
+                except Exception:
+                    continue
+    events.sort(key=lambda e: (e["ts"], -e["dur"]))
+    return events
+
+def critical_path(events: list) -> set:
+    """
+    Chemin critique : pour chaque span, on remonte depuis l'enfant qui
+    finit le plus tard, puis l'enfant qui finit juste avant que celui-ci
+    commence, etc. Renvoie l'ensemble des span_id concernés.
+    """
+    tolerance = 1000  # µs : décalage horloge murale / perf_counter
+    children = {}
+    for e in events:
+        children.setdefault(e["args"].get("parent_id"), []).append(e)
+
+    path = set()
+
+    def walk(span):
+        span_id = span["args"]["span_id"]
+        path.add(span_id)
+        limit = span["ts"] + span["dur"]
+        while True:
+            candidates = [
+                c for c in children.get(span_id, [])
+                if c["args"]["span_id"] not in path and c["ts"] + c["dur"] <= limit + tolerance
+            ]
+            if not candidates:
+                return
+            last = max(candidates, key=lambda c: c["ts"] + c["dur"])
+            walk(last)
+            limit = last["ts"]
+
+    for root in children.get(None, []):
+        walk(root)
+    return path
+
+@app.route("/traces", methods=["GET"])
+def list_traces():
+    """Dernières requêtes tracées (span racine uniquement)."""
+    traces = []
+    for _, line in iter_lines_reverse(TRACE_FILE):
+        if b'"cat": "request"' not in line:
+            continue
+        try:
+            e = json.loads(line)
+        except Exception:
+            continue
+        traces.append({
+            "trace_id": e["args"]["trace_id"],
+            "name": e["name"],
+            "ts": e["ts"],
+            "duration_ms": round(e["dur"] / 1000, 1),
+        })
+        if len(traces) >= TRACE_LIST_MAX:
+            break
+    return jsonify(traces)
+
+@app.route("/traces/<trace_id>.json", methods=["GET"])
+def get_trace_json(trace_id: str):
+    events = load_trace(trace_id)
+    if not events:
+        return jsonify({"error": "Trace inconnue"}), 404
+    return jsonify({"traceEvents": events, "displayTimeUnit": "ms"})
+
+@app.route("/traces/<trace_id>", methods=["GET"])
+def get_trace_view(trace_id: str):
+    events = load_trace(trace_id)
+    if not events:
+        return jsonify({"error": "Trace inconnue"}), 404
+
+    crit = critical_path(events)
+    t0 = min(e["ts"] for e in events)
+    total = max(e["ts"] + e["dur"] for e in events) - t0 or 1
+    depth = {}
+    for e in events:
+        parent = e["args"].get("parent_id")
+        depth[e["args"]["span_id"]] = depth.get(parent, -1) + 1 if parent else 0
+
+    rows = []
+    for e in events:
+        span_id = e["args"]["span_id"]
+        left = (e["ts"] - t0) / total * 100
+        width = max(e["dur"] / total * 100, 0.2)
+        color = "#f39c12" if span_id in crit else "#5b8def"
+        attrs = {k: v for k, v in e["args"].items() if k not in ("trace_id", "span_id", "parent_id")}
+        rows.append(
+            f'<tr><td style="padding-left:{depth[span_id] * 14}px">{html.escape(e["name"])}</td>'
+            f'<td class="d">{e["dur"] / 1000:.1f} ms</td>'
+            f'<td class="w"><div title="{html.escape(json.dumps(attrs, ensure_ascii=False))}" '
+            f'style="margin-left:{left:.2f}%;width:{width:.2f}%;background:{color}"></div></td></tr>'
+        )
+
+    page = f"""<!doctype html><meta charset="utf-8"><title>Trace {html.escape(trace_id)}</title>
+<style>body{{font:13px system-ui,sans-serif;margin:20px}}table{{width:100%;border-collapse:collapse}}
+td{{padding:2px 6px;white-space:nowrap}}td.d{{text-align:right;color:#666}}td.w{{width:65%}}
+td.w div{{height:12px;border-radius:2px}}tr:hover{{background:#f4f4f4}}</style>
+<h3>Trace {html.escape(trace_id)} — {total / 1000:.0f} ms</h3>
+<p>🟧 chemin critique · 🟦 autres spans · <a href="/traces/{html.escape(trace_id)}.json">JSON (Perfetto)</a></p>
+<table>{"".join(rows)}</table>"""
+    return Response(page, mimetype="text/html")
+
+# -------------------------------------------------------------
+# 🔵 5quinquies) NOTES EN COLONNES — re-scoring instantané
+# -------------------------------------------------------------
+# 👉 Le score global = somme des notes par axe × "poids" d'AXES_CONFIG.
+# Si on change un poids, tout l'historique devient faux, mais relancer
+# les LLM serait hors de prix : les notes brutes suffisent.
+# Elles sont gardées en colonnes NumPy (une ligne par analyse, une
+# colonne par axe), complétées au fil de logs.jsonl comme l'index des
+# quasi-doublons, et sauvegardées dans data/notes_columns.npz.
+# Re-scorer tout l'historique = un produit matrice × vecteur.
+# /history/rescore compare aux scores servis par /history, c.-à-d.
+# recalculés avec les poids actuels (pas aux scores enregistrés).
+
+NOTES_FILE = os.path.join(DATA_DIR, "notes_columns.npz")
+AXIS_KEYS = [f"{category}.{key}" for category, axes_def in AXES_CONFIG.items() for key in axes_def]
+COLOR_BANDS = ["🔴", "🟡", "🟢"]           # même seuils que color_for
+COLOR_THRESHOLDS = [40, 70]
+
+class NoteColumns:
+    """Colonnes : position dans logs.jsonl, notes (n × axes), score enregistré."""
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = self.notes = self.scores = None  # chargées au premier snapshot
+        self.scanned_until = 0
+        self.lock = threading.Lock()
+
+    def _load(self):
+        import numpy as np
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.notes = np.zeros((0, len(AXIS_KEYS)), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.int16)
+        try:
+            with np.load(self.path) as data:
+                if list(data["axes"]) != AXIS_KEYS:
+                    return  # axes modifiés : on reconstruit depuis logs.jsonl
+                self.offsets, self.notes, self.scores = data["offsets"], data["notes"], data["scores"]
+                self.scanned_until = int(data["scanned_until"])
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def _save(self):
+        import numpy as np
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, offsets=self.offsets, notes=self.notes, scores=self.scores,
+                 scanned_until=self.scanned_until, axes=np.array(AXIS_KEYS))
+        os.replace(tmp, self.path)
+
+    def refresh(self):
+        """Ajoute les analyses écrites dans logs.jsonl depuis le dernier passage."""
+        import numpy as np
+        if not os.path.exists(HISTORY_FILE):
+            return
+        if os.path.getsize(HISTORY_FILE) < self.scanned_until:
+            # fichier remplacé (tronqué, restauré) : on repart de zéro
+            self.offsets, self.scanned_until = self.offsets[:0], 0
+            self.notes, self.scores = self.notes[:0], self.scores[:0]
+        offsets, notes, scores = [], [], []
+        with open(HISTORY_FILE, "rb") as f:
+            f.seek(self.scanned_until)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # ligne en cours d'écriture : on la reprendra
+                self.scanned_until = f.tell()
+                if b'"notes"' not in line:
+                    continue  # anciennes entrées : pas de notes par axe
+                try:
+                    item = json.loads(line)
+                    notes.append([item["notes"].get(k, 0) for k in AXIS_KEYS])
+                    scores.append(item["score_global"])
+                    offsets.append(offset)
+                except Exception:
+                    continue
+        if offsets:
+            self.offsets = np.concatenate([self.offsets, np.array(offsets, dtype=np.int64)])
+            self.notes = np.vstack([self.notes, np.array(notes, dtype=np.float32)])
+            self.scores = np.concatenate([self.scores, np.array(scores, dtype=np.int16)])
+            self._save()
+
+    def snapshot(self):
+        """(positions, notes, scores) à jour, cohérents entre eux."""
+        with self.lock:
+            if self.offsets is None:
+                self._load()
+            self.refresh()
+            return self.offsets, self.notes, self.scores
+
+note_columns = NoteColumns(NOTES_FILE)
+
+def color_bands(scores: "np.ndarray") -> "np.ndarray":
+    """Indice de bande de couleur (0 = 🔴, 1 = 🟡, 2 = 🟢) pour chaque score."""
+    import numpy as np
+    return np.digitize(scores, COLOR_THRESHOLDS)
+
+def rescore(notes: "np.ndarray", weights: "np.ndarray") -> "np.ndarray":
+    """Scores globaux pour un vecteur de poids (arrondi comme compute_score)."""
+    import numpy as np
+    return np.rint(notes @ weights).astype(np.int16)
+
+@app.route("/history/rescore", methods=["POST"])
+def history_rescore():
+    """
+    Simule de nouveaux poids sur tout l'historique, sans rien modifier.
+    Corps : {"poids": {"fond.Vrai": 0.5, …}, "limit": 50}
+    (axes absents = poids actuel d'AXES_CONFIG).
+    "avant" = scores avec les poids actuels, tels que /history les sert.
+    """
+    import numpy as np
+    body = request.get_json(silent=True) or {}
+    current = axis_weights()
+    poids = body.get("poids") or {}
+    if not isinstance(poids, dict) or set(poids) - set(AXIS_KEYS) \
+            or not all(isinstance(v, (int, float)) and v >= 0 for v in poids.values()):
+        return jsonify({"error": "Poids invalides", "axes": AXIS_KEYS}), 400
+    poids = {**current, **poids}
+    try:
+        limit = max(0, min(int(body.get("limit", 50)), HISTORY_PAGE_MAX))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Paramètre limit invalide"}), 400
+
+    with StepTimer("history.rescore", cat="cache") as span:
+        offsets, notes, _ = note_columns.snapshot()
+        old_scores = rescore(notes, np.array([current[k] for k in AXIS_KEYS], dtype=np.float64))
+        new_scores = rescore(notes, np.array([poids[k] for k in AXIS_KEYS], dtype=np.float64))
+        old_bands, new_bands = color_bands(old_scores), color_bands(new_scores)
+        changed = np.flatnonzero(old_bands != new_bands)
+        span.set(items=len(offsets), changed=len(changed))
+
+        transitions = {}
+        if len(changed):
+            pairs, counts = np.unique(np.stack([old_bands[changed], new_bands[changed]]), axis=1,
+                                      return_counts=True)
+            transitions = {f"{COLOR_BANDS[a]}→{COLOR_BANDS[b]}": int(n) for (a, b), n in zip(pairs.T, counts)}
+
+    return jsonify({
+        "items": int(len(offsets)),
+        "poids": poids,
+        "somme_poids": round(sum(poids.values()), 4),
+        "changements_couleur": int(len(changed)),
+        "transitions": transitions,
+        "score_moyen": {
+            "avant": round(float(old_scores.mean()), 2) if len(offsets) else None,
+            "apres": round(float(new_scores.mean()), 2) if len(offsets) else None,
+        },
+        "exemples": [
+            {"offset": int(offsets[i]),
+             "avant": {"score": int(old_scores[i]), "couleur": COLOR_BANDS[old_bands[i]]},
+             "apres": {"score": int(new_scores[i]), "couleur": COLOR_BANDS[new_bands[i]]}}
+            for i in changed[-limit:][::-1] if limit
+        ],
+    })
+
+# -------------------------------------------------------------
+# 🔵 5sexies) RÉPONSE COMPACTE v2 + COMPRESSION DES RÉPONSES
+# -------------------------------------------------------------
+# 👉 La réponse de /analyze répète beaucoup : resume == commentaire,
+# justesse/completude/ton/sophismes == notes des axes, et libellés +
+# infobulles d'AXES_CONFIG renvoyés à chaque analyse. Sur mobile, ça
+# pèse. /v2/analyze renvoie une forme compacte :
+#   {"v": 2, "score", "couleur", "synthese", "notes": {"fond.Vrai": 80, …},
+#    "justifications": {…}, "confiance", "explication_confiance", "axes_version"}
+# Les métadonnées fixes (libellés, infobulles, poids, seuils de couleur)
+# sont servies UNE fois par /v2/axes (ETag + cache navigateur).
+# ?fields=score,notes ne renvoie que les champs demandés.
+# Enfin, toute réponse JSON/HTML de plus de 1 Ko est compressée
+# (brotli si le client l'accepte et si le module est installé, sinon gzip).
+
+V2_FIELDS = ["score", "couleur", "synthese", "notes", "justifications", "confiance",
+             "explication_confiance", "approximate", "similarite", "analyse_reference", "axes_version"]
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_TYPES = ("application/json", "text/html")
+AXES_CACHE_MAX_AGE = 24 * 3600
+
+def axes_metadata() -> dict:
+    return {
+        "axes": {
+            f"{category}.{key}": {k: meta[k] for k in ("label", "tooltip", "description", "poids")}
+            for category, axes_def in AXES_CONFIG.items() for key, meta in axes_def.items()
+        },
+        "couleurs": {"seuils": COLOR_THRESHOLDS, "bandes": COLOR_BANDS},
+        "notes_autorisees": NOTE_GRID,
+    }
+
+AXES_VERSION = hashlib.sha256(compact_json(axes_metadata()).encode("utf-8")).hexdigest()[:12]
+
+def compact_response(result: dict, fields: Optional[list] = None) -> dict:
+    """Réponse v2 (sans doublons) à partir d'une réponse complète."""
+    notes, justifications = {}, {}
+    for category, axes_def in AXES_CONFIG.items():
+        for key in axes_def:
+            axis = result["axes"][category].get(key, {})
+            notes[f"{category}.{key}"] = axis.get("note", 0)
+            justifications[f"{category}.{key}"] = axis.get("justification", "")
+    out = {
+        "score": result["score_global"],
+        "couleur": result["couleur_global"],
+        "synthese": result["resume"],
+        "notes": notes,
+        "justifications": justifications,
+        "confiance": result["confiance_analyse"],
+        "explication_confiance": result["explication_confiance"],
+        "axes_version": AXES_VERSION,
+    }
+    # Champs de réutilisation : seulement s'ils ont un sens
+    if result.get("analyse_reference"):
+        out.update(approximate=result.get("approximate", False), similarite=result.get("similarite"),
+                   analyse_reference=result["analyse_reference"])
+    if fields:
+        out = {k: v for k, v in out.items() if k in fields}
+    return {"v": 2, **out}
+
+def parse_fields(raw: Optional[str]):
+    """?fields=a,b → liste validée (None = tout) ; lève ValueError si champ inconnu."""
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in V2_FIELDS]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    return fields
+
+@app.route("/v2/analyze", methods=["POST"])
+def analyze_v2():
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": f"Champs inconnus : {e}", "champs": V2_FIELDS}), 400
+    with StepTimer("POST /v2/analyze", cat="request"):
+        result, error = _analyze()
+        return error or jsonify(compact_response(result, fields))
+
+@app.route("/v2/axes", methods=["GET"])
+def axes_v2():
+    """Métadonnées fixes des axes : à mettre en cache côté client."""
+    headers = {"ETag": f'"{AXES_VERSION}"', "Cache-Control": f"public, max-age={AXES_CACHE_MAX_AGE}"}
+    if f'"{AXES_VERSION}"' in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    response = jsonify({"version": AXES_VERSION, **axes_metadata()})
+    response.headers.update(headers)
+    return response
+
+@app.after_request
+def _compress_response(response):
+    """Compression à la volée des réponses dynamiques (JSON, pages de traces)."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or "Content-Encoding" in response.headers
+            or not response.mimetype.startswith(COMPRESS_TYPES)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    # brotli : import optionnel (section 6) ; qualité moyenne = bon compromis à la volée
+    if "br" in accept_encoding and brotli is not None:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers["Content-Encoding"] = "br"
+    elif "gzip" in accept_encoding:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+    response.vary.add("Accept-Encoding")
+    return response
+
+# -------------------------------------------------------------
+# 🔵 5septies) IDEMPOTENCE + COALESCENCE DES REQUÊTES IDENTIQUES
+# -------------------------------------------------------------
+# 👉 Double clic sur "Analyser", relance du frontend après une coupure :
+# chaque requête lançait un pipeline complet (et payant) en parallèle
+# du premier.
+# - Coalescence : les requêtes en cours pour la même entrée normalisée
+#   (text_sha + force) attendent l'exécution déjà lancée et reçoivent
+#   le même résultat (ou la même erreur). Par processus.
+# - Idempotency-Key (en-tête, optionnel) : la réponse est gardée en
+#   base IDEMPOTENCY_TTL_HOURS ; la même clé renvoie la même réponse,
+#   même depuis un autre worker ou après la fin de la première requête.
+#   Clé réutilisée pour une autre entrée → 422. Exécution d'origine
+#   toujours en cours après IDEMPOTENCY_WAIT_S → 409.
+# Compteurs : /coalesce/stats
+
+ENABLE_COALESCING = os.getenv("ENABLE_COALESCING", "1") != "0"
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_S = float(os.getenv("IDEMPOTENCY_WAIT_S", "300"))
+IDEMPOTENCY_POLL_S = 0.25
+IDEMPOTENCY_KEY_MAX = 255
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    request_sha TEXT NOT NULL,
+    response TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coalesce_stats (
+    kind TEXT PRIMARY KEY,
+    n INTEGER NOT NULL DEFAULT 0
+);
+""")
+
+def count_coalesce(kind: str):
+    db().execute(
+        "INSERT INTO coalesce_stats (kind, n) VALUES (?, 1) ON CONFLICT(kind) DO UPDATE SET n = n + 1", (kind,)
+    )
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Une seule exécution en cours par clé ; les appels concurrents la partagent."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, key: str, fn):
+        if not ENABLE_COALESCING:
+            return fn()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            log("🔗 [COALESCE] analyse identique déjà en cours → on l'attend", key=key[:12])
+            with StepTimer("coalesce.wait", cat="wait", key=key[:12]):
+                flight.done.wait()
+            count_coalesce("joined")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        count_coalesce("executed")
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+analysis_flights = SingleFlight()
+
+def with_idempotency_key(key: str, request_sha: str, run):
+    """
+    Exécute run() au plus une fois par Idempotency-Key.
+    Renvoie (réponse, None) ou (None, réponse d'erreur Flask).
+    """
+    conn = db()
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_S
+    while True:
+        now = time.time()
+        # Clés expirées, et réservations abandonnées (worker tué en cours d'analyse)
+        conn.execute(
+            "DELETE FROM idempotency_keys WHERE created_at < ? OR (response IS NULL AND created_at < ?)",
+            (now - IDEMPOTENCY_TTL_HOURS * 3600, now - IDEMPOTENCY_WAIT_S),
+        )
+        reserved = conn.execute(
+            "INSERT OR IGNORE INTO idempotency_keys (key, request_sha, response, created_at) VALUES (?, ?, NULL, ?)",
+            (key, request_sha, now),
+        ).rowcount
+        if reserved:
+            try:
+                result = run()
+            except Exception:
+                conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+                raise
+            conn.execute(
+                "UPDATE idempotency_keys SET response = ? WHERE key = ?",
+                (json.dumps(result, ensure_ascii=False), key),
+            )
+            return result, None
+
+        row = conn.execute("SELECT request_sha, response FROM idempotency_keys WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            continue  # l'exécution d'origine a échoué entre-temps → on la relance
+        if row["request_sha"] != request_sha:
+            count_coalesce("conflict")
+            return None, (jsonify({"error": "Idempotency-Key déjà utilisée pour une autre requête"}), 422)
+        if row["response"] is not None:
+            log("♻️ [IDEMPOTENCY] réponse déjà calculée pour cette clé", key=key[:40])
+            count_coalesce("replayed")
+            return response_with_current_score(json.loads(row["response"])), None
+        if time.monotonic() >= deadline:
+            return None, (jsonify({"error": "Analyse toujours en cours pour cette Idempotency-Key"}), 409)
+        time.sleep(IDEMPOTENCY_POLL_S)
+
+@app.route("/coalesce/stats", methods=["GET"])
+def coalesce_stats():
+    """Pipelines exécutés vs requêtes servies par une exécution déjà en cours ou terminée."""
+    counts = {row["kind"]: row["n"] for row in db().execute("SELECT kind, n FROM coalesce_stats")}
+    executed = counts.get("executed", 0)
+    saved = counts.get("joined", 0) + counts.get("replayed", 0)
+    return jsonify({
+        "executed": executed,
+        "joined": counts.get("joined", 0),
+        "replayed": counts.get("replayed", 0),
+        "conflicts": counts.get("conflict", 0),
+        "in_flight": analysis_flights.in_flight(),
+        "saved_rate": round(saved / (executed + saved), 3) if executed + saved else None,
+    })
+
+# -------------------------------------------------------------
+# 🔵 5octies) ANALYSES D'URL : FRAÎCHES, PUIS PÉRIMÉES-MAIS-SERVIES
+# -------------------------------------------------------------
+# 👉 Un article d'actualité est mis à jour : son analyse peut vieillir.
+# Mais faire attendre chaque visiteur une minute pour la rafraîchir est
+# pire. Pour chaque URL, on garde la dernière analyse et l'empreinte du
+# texte extrait :
+# - fraîche (< URL_FRESH_MINUTES depuis la dernière vérification) :
+#   renvoyée telle quelle
+# - périmée (< URL_STALE_HOURS) : renvoyée tout de suite, et une
+#   ré-extraction part en arrière-plan (une seule à la fois par URL) ;
+#   texte identique → l'analyse redevient fraîche ; texte modifié → le
+#   pipeline est relancé et l'analyse remplacée (une seule écriture)
+# - au-delà : analyse normale, la requête attend
+# Compteurs : /url-cache/stats
+
+ENABLE_URL_SWR = os.getenv("ENABLE_URL_SWR", "1") != "0"
+URL_FRESH_MINUTES = float(os.getenv("URL_FRESH_MINUTES", "15"))
+URL_STALE_HOURS = float(os.getenv("URL_STALE_HOURS", "24"))
+URL_REVALIDATE_TIMEOUT_S = 600  # ré-extraction bloquée (worker tué) → relançable
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS url_analyses (
+    url TEXT PRIMARY KEY,
+    content_sha TEXT NOT NULL,
+    response TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    refreshing_since REAL
+);
+CREATE TABLE IF NOT EXISTS url_cache_stats (
+    kind TEXT PRIMARY KEY,
+    n INTEGER NOT NULL DEFAULT 0
+);
+""")
+
+_revalidate_pool = None
+_revalidate_pool_lock = threading.Lock()
+
+def revalidate_pool() -> ThreadPoolExecutor:
+    """Pool des ré-extractions en arrière-plan (créé au premier usage, recréé après fork)."""
+    global _revalidate_pool
+    if _revalidate_pool is None:
+        with _revalidate_pool_lock:
+            if _revalidate_pool is None:
+                _revalidate_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+    return _revalidate_pool
+
+def count_url_cache(kind: str):
+    db().execute(
+        "INSERT INTO url_cache_stats (kind, n) VALUES (?, 1) ON CONFLICT(kind) DO UPDATE SET n = n + 1", (kind,)
     )
 
-    return jsonify(response.model_dump())
+def url_cache_get(url: str) -> Optional[dict]:
+    """Analyse servable pour cette URL (fraîche ou périmée), sinon None."""
+    row = db().execute("SELECT response, checked_at FROM url_analyses WHERE url = ?", (url,)).fetchone()
+    age = time.time() - row["checked_at"] if row else None
+    if row is None or age >= URL_STALE_HOURS * 3600:
+        count_url_cache("miss")
+        return None
+    if age < URL_FRESH_MINUTES * 60:
+        log("🗃️ [URL-CACHE] analyse fraîche", url[:80], age_s=round(age))
+        count_url_cache("fresh")
+    else:
+        log("🗃️ [URL-CACHE] analyse périmée → servie, ré-extraction en arrière-plan", url[:80], age_s=round(age))
+        count_url_cache("stale")
+        schedule_revalidation(url)
+    return response_with_current_score(json.loads(row["response"]))
+
+def url_cache_store(url: str, text: str, result: dict):
+    """Remplace l'analyse de l'URL (une seule instruction : jamais d'état intermédiaire visible)."""
+    now = time.time()
+    db().execute(
+        "INSERT OR REPLACE INTO url_analyses (url, content_sha, response, analyzed_at, checked_at, refreshing_since) "
+        "VALUES (?, ?, ?, ?, ?, NULL)",
+        (url, text_sha(text), json.dumps(result, ensure_ascii=False), now, now),
+    )
+
+def schedule_revalidation(url: str):
+    """Lance la ré-extraction, sauf si un worker s'en occupe déjà."""
+    now = time.time()
+    claimed = db().execute(
+        "UPDATE url_analyses SET refreshing_since = ? WHERE url = ? AND (refreshing_since IS NULL OR refreshing_since < ?)",
+        (now, url, now - URL_REVALIDATE_TIMEOUT_S),
+    ).rowcount
+    if claimed:
+        # Contexte vide : la ré-extraction a ses propres logs et sa propre trace
+        revalidate_pool().submit(contextvars.Context().run, revalidate_url, url)
+
+def revalidate_url(url: str):
+    """Ré-extrait l'article ; relance le pipeline seulement si le texte a changé."""
+    start_request_logging(f"swr-{uuid.uuid4().hex[:8]}")
+    row = db().execute("SELECT content_sha FROM url_analyses WHERE url = ?", (url,)).fetchone()
+    if row is None:
+        return
+    outcome = "failed"
+    try:
+        with StepTimer("url_cache.revalidate", cat="request", url=url[:120]):
+            text = extract_article_from_url(url)
+            if len(text) <= 300:
+                log("⚠️ [URL-CACHE] ré-extraction impossible → analyse périmée gardée", url[:80],
+                    level=logging.WARNING)
+                return
+            text = text[:8000]
+            if text_sha(text) == row["content_sha"]:
+                outcome = "unchanged"
+                db().execute("UPDATE url_analyses SET checked_at = ? WHERE url = ?", (time.time(), url))
+                return
+            outcome = "changed"
+            log("🔄 [URL-CACHE] article modifié → nouvelle analyse", url[:80])
+            result = run_pipeline(text)
+            append_history(build_history_item(text, url, result))
+            url_cache_store(url, text, result)
+    except Exception as e:
+        log("❌ [URL-CACHE] échec de la ré-extraction", f"{type(e).__name__}: {e}", level=logging.WARNING)
+    finally:
+        db().execute("UPDATE url_analyses SET refreshing_since = NULL WHERE url = ?", (url,))
+        count_url_cache(outcome)
+
+@app.route("/url-cache/stats", methods=["GET"])
+def url_cache_stats():
+    """Analyses d'URL servies fraîches / périmées / recalculées, et issue des ré-extractions."""
+    counts = {row["kind"]: row["n"] for row in db().execute("SELECT kind, n FROM url_cache_stats")}
+    row = db().execute(
+        "SELECT COUNT(*) AS urls, COALESCE(SUM(refreshing_since IS NOT NULL), 0) AS refreshing FROM url_analyses"
+    ).fetchone()
+    served = counts.get("fresh", 0) + counts.get("stale", 0)
+    return jsonify({
+        **dict(row),
+        **{k: counts.get(k, 0) for k in ("fresh", "stale", "miss", "unchanged", "changed", "failed")},
+        "hit_rate": round(served / (served + counts.get("miss", 0)), 3) if served + counts.get("miss", 0) else None,
+    })
+
+# -------------------------------------------------------------
+# 🔵 5nonies) JOURNAL D'ÉVÉNEMENTS SEGMENTÉ (requêtes, durées, résultats)
+# -------------------------------------------------------------
+# 👉 Trace brute et volumineuse de tout ce qui se passe : chaque requête
+# (route, statut, durée), chaque étape chronométrée, chaque résultat.
+# Un seul fichier qui grossit sans fin se lit mal à l'envers et ne se
+# fait pas tourner sans risque. Ici, journal append-only segmenté :
+# - data/events/seg-<1er seq>.jsonl : segments de EVENT_SEGMENT_BYTES ;
+#   plein → on en ouvre un nouveau, l'ancien est compressé en .jsonl.gz
+#   en arrière-plan
+# - data/events/index-<seq de base>.idx : index binaire, un
+#   enregistrement de 32 octets par événement (horodatage, segment,
+#   position, longueur), lu via np.memmap. Les numéros se suivent :
+#   seq → rang = seq - base → accès direct, et les horodatages sont
+#   croissants → plage de dates par recherche dichotomique.
+# - lire les N derniers événements coûte pareil quelle que soit la
+#   taille du journal (N enregistrements d'index + N lectures)
+# - rétention : les segments fermés plus vieux que EVENT_RETENTION_DAYS,
+#   ou au-delà de EVENT_MAX_BYTES au total, sont supprimés (l'index est
+#   alors réécrit à partir du premier événement gardé)
+# Plusieurs workers écrivent : les ajouts se font sous verrou fichier,
+# mais JAMAIS dans le thread de la requête. record_event() ne fait
+# qu'ajouter (horodatage, événement) à un tampon en mémoire ; un thread
+# dédié le vide par lots toutes les EVENT_FLUSH_S secondes (un verrou,
+# une écriture de segment, une écriture d'index par lot). Tampon plein
+# → l'événement est compté et jeté. La position d'écriture (index,
+# segment ouvert, décalage) reste en mémoire : elle n'est relue sur
+# disque que si un autre worker a écrit entre-temps ou si la rétention
+# a remplacé l'index.
+# Les durées des étapes ne sont pas des événements à part : StepTimer
+# les ajoute à une liste propre à l'analyse, écrite avec son événement
+# "result" (rien de plus sur le chemin chaud des étapes).
+# Les fichiers statiques et /ready ne sont pas journalisés.
+# Routes : /events/tail, /events (par seq ou par dates), /events/stats
+
+ENABLE_EVENT_LOG = os.getenv("ENABLE_EVENT_LOG", "1") != "0"
+EVENT_DIR = os.getenv("EVENT_DIR", os.path.join(DATA_DIR, "events"))
+EVENT_SEGMENT_BYTES = int(os.getenv("EVENT_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+EVENT_RETENTION_DAYS = float(os.getenv("EVENT_RETENTION_DAYS", "30"))
+EVENT_MAX_BYTES = int(os.getenv("EVENT_MAX_BYTES", str(1024 * 1024 * 1024)))
+EVENT_READ_MAX = 1000
+EVENT_FLUSH_S = float(os.getenv("EVENT_FLUSH_S", "0.5"))
+EVENT_BUFFER_MAX = int(os.getenv("EVENT_BUFFER_MAX", "20000"))
+EVENT_BATCH_MAX = 5000
+EVENT_SKIP_ENDPOINTS = {"serve_frontend", "serve_static", "ready", "events_tail", "events_range", "events_stats"}
+EVENT_INDEX_FIELDS = [("ts", "<f8"), ("segment", "<u8"), ("offset", "<u8"), ("length", "<u4"), ("pad", "<u4")]
+EVENT_INDEX_ITEMSIZE = 32  # octets par enregistrement (somme des champs)
+
+@functools.lru_cache(maxsize=1)
+def event_index_dtype():
+    """dtype NumPy d'un enregistrement de l'index (NumPy importé au premier usage)."""
+    import numpy as np
+    return np.dtype(EVENT_INDEX_FIELDS)
+
+@functools.lru_cache(maxsize=4)
+def _gunzip_segment(path: str) -> bytes:
+    """Segment compacté décompressé (les derniers lus restent en mémoire)."""
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+class SegmentedLog:
+    """Journal append-only : segments JSONL de taille fixe + index binaire mappé en mémoire."""
+    def __init__(self, directory: str):
+        self.dir = directory
+        self._map_lock = threading.Lock()
+        self._map = {"path": None, "rows": 0, "base": 1, "index": None}
+        # Position d'écriture (modifiée sous verrou uniquement)
+        self._state = None
+
+    # --- fichiers -------------------------------------------------
+    @contextmanager
+    def _locked(self):
+        """Verrou exclusif entre processus (ajouts, rétention)."""
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _index_file(self) -> tuple:
+        """(chemin, seq de base) de l'index courant."""
+        paths = sorted(glob.glob(os.path.join(self.dir, "index-*.idx")))
+        if not paths:
+            return os.path.join(self.dir, f"index-{1:012d}.idx"), 1
+        return paths[-1], int(os.path.basename(paths[-1])[6:-4])
+
+    def segment_path(self, first_seq: int, compressed: bool = False) -> str:
+        return os.path.join(self.dir, f"seg-{first_seq:012d}.jsonl" + (".gz" if compressed else ""))
+
+    @staticmethod
+    def _last_record(index_path: str, rows: int):
+        import numpy as np
+        if not rows:
+            return None
+        return np.fromfile(index_path, dtype=event_index_dtype(), count=1,
+                           offset=(rows - 1) * EVENT_INDEX_ITEMSIZE)[0]
+
+    # --- écriture -------------------------------------------------
+    def _write_state(self) -> dict:
+        """
+        Position d'écriture (à appeler sous verrou). Gardée en mémoire ;
+        relue sur disque seulement si l'index a changé de taille (un autre
+        worker a écrit) ou a disparu (remplacé par la rétention), ou si le
+        segment ouvert a grossi sans l'index (worker tué entre les deux).
+        """
+        state = self._state
+        if state is not None:
+            try:
+                if (os.stat(state["index_path"]).st_size == state["rows"] * EVENT_INDEX_ITEMSIZE
+                        and os.stat(self.segment_path(state["segment"])).st_size == state["offset"]):
+                    return state
+            except FileNotFoundError:
+                pass
+        index_path, base = self._index_file()
+        rows = os.path.getsize(index_path) // EVENT_INDEX_ITEMSIZE if os.path.exists(index_path) else 0
+        last = self._last_record(index_path, rows)
+        segment = int(last["segment"]) if last is not None else base + rows
+        # Position réelle dans le segment (une ligne orpheline, écrite avant un crash, n'est pas indexée)
+        path = self.segment_path(segment)
+        self._state = {
+            "index_path": index_path, "base": base, "rows": rows, "segment": segment,
+            "offset": os.path.getsize(path) if os.path.exists(path) else 0,
+            "last_ts": float(last["ts"]) if last is not None else 0.0,
+        }
+        return self._state
+
+    def append_many(self, items: list) -> int:
+        """Ajoute [(ts, événement), …] sous un seul verrou ; renvoie le numéro de séquence du premier."""
+        import numpy as np
+        lines = [(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                 for _, event in items]
+        rolled = False
+        with self._locked():
+            state = self._write_state()
+            first_seq = state["base"] + state["rows"]
+            segment, offset, last_ts = state["segment"], state["offset"], state["last_ts"]
+            records, chunks = [], {}
+            for i, ((ts, _), line) in enumerate(zip(items, lines)):
+                if offset and offset + len(line) > EVENT_SEGMENT_BYTES:
+                    rolled = True
+                    segment, offset = first_seq + i, 0
+                # Horodatages croissants dans l'index (recherche dichotomique par date)
+                last_ts = max(ts or time.time(), last_ts)
+                records.append((last_ts, segment, offset, len(line), 0))
+                chunks.setdefault(segment, []).append(line)
+                offset += len(line)
+            for seg, seg_lines in chunks.items():
+                with open(self.segment_path(seg), "ab") as f:
+                    f.write(b"".join(seg_lines))
+            with open(state["index_path"], "ab") as f:
+                f.write(np.array(records, dtype=event_index_dtype()).tobytes())
+            state.update(rows=state["rows"] + len(items), segment=segment, offset=offset, last_ts=last_ts)
+        if rolled:
+            threading.Thread(target=self.compact, name="events-compact", daemon=True).start()
+        return first_seq
+
+    def append(self, event: dict, ts: Optional[float] = None) -> int:
+        """Ajoute un événement (survenu à `ts`, par défaut maintenant) ; renvoie son numéro de séquence."""
+        return self.append_many([(ts, event)])
+
+    # --- lecture --------------------------------------------------
+    def index(self) -> tuple:
+        """(seq de base, index mappé en mémoire ou None), ré-ouvert s'il a changé."""
+        import numpy as np
+        for _ in range(2):  # l'index peut être remplacé (rétention) entre glob et lecture
+            path, base = self._index_file()
+            try:
+                rows = os.path.getsize(path) // EVENT_INDEX_ITEMSIZE
+                break
+            except FileNotFoundError:
+                rows = 0
+        with self._map_lock:
+            if (path, rows) != (self._map["path"], self._map["rows"]):
+                self._map.update(path=path, rows=rows, base=base, index=(
+                    np.memmap(path, dtype=event_index_dtype(), mode="r", shape=(rows,)) if rows else None
+                ))
+            return self._map["base"], self._map["index"]
+
+    def _read_range(self, segment: int, start: int, end: int) -> Optional[bytes]:
+        """Octets [start, end) du segment ; None s'il a été supprimé par la rétention."""
+        try:
+            with open(self.segment_path(segment), "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+        except FileNotFoundError:  # segment compacté entre-temps
+            pass
+        try:
+            return _gunzip_segment(self.segment_path(segment, compressed=True))[start:end]
+        except FileNotFoundError:
+            return None
+
+    def _read(self, base: int, index, start: int, stop: int) -> list:
+        """
+        Événements des rangs [start, stop) d'un index (base, index) lu une
+        seule fois, par blocs contigus. Segments supprimés entre-temps par la
+        rétention : leurs événements sont simplement sautés.
+        """
+        import numpy as np
+        if index is None:
+            return []
+        records = np.array(index[max(start, 0):max(min(stop, len(index)), 0)])
+        events = []
+        first = 0
+        while first < len(records):
+            segment = records["segment"][first]
+            last = first
+            while last + 1 < len(records) and records["segment"][last + 1] == segment:
+                last += 1
+            block_start = int(records["offset"][first])
+            data = self._read_range(int(segment), block_start,
+                                    int(records["offset"][last] + records["length"][last]))
+            for i in range(first, last + 1) if data is not None else ():
+                rel = int(records["offset"][i]) - block_start
+                event = json.loads(data[rel:rel + int(records["length"][i])])
+                events.append({
+                    "seq": base + max(start, 0) + i,
+                    "ts": datetime.fromtimestamp(float(records["ts"][i]), timezone.utc)
+                          .strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                    **event,
+                })
+            first = last + 1
+        return events
+
+    def tail(self, n: int) -> list:
+        base, index = self.index()
+        rows = 0 if index is None else len(index)
+        return self._read(base, index, rows - n, rows)
+
+    def from_seq(self, seq: int, limit: int) -> list:
+        base, index = self.index()
+        return self._read(base, index, seq - base, seq - base + limit)
+
+    def between(self, since: float, until: float, limit: int) -> list:
+        import numpy as np
+        base, index = self.index()
+        if index is None:
+            return []
+        ts = index["ts"]
+        lo = int(np.searchsorted(ts, since, side="left"))
+        hi = int(np.searchsorted(ts, until, side="right"))
+        return self._read(base, index, lo, min(hi, lo + limit))
+
+    # --- compaction + rétention --------------------------------------
+    def segments(self) -> list:
+        """[(1er seq, chemin, compacté ?)] triés, segment ouvert compris."""
+        found = {}
+        for path in glob.glob(os.path.join(self.dir, "seg-*.jsonl*")):
+            name = os.path.basename(path)
+            if name.endswith((".jsonl", ".jsonl.gz")):
+                found.setdefault(int(name[4:16]), []).append(path)
+        return [(seq, min(paths, key=len), all(p.endswith(".gz") for p in paths))
+                for seq, paths in sorted(found.items())]
+
+    def _open_segment(self) -> Optional[int]:
+        """1er seq du segment ouvert (à appeler sous verrou)."""
+        index_path, _ = self._index_file()
+        rows = os.path.getsize(index_path) // EVENT_INDEX_ITEMSIZE if os.path.exists(index_path) else 0
+        last = self._last_record(index_path, rows)
+        return int(last["segment"]) if last is not None else None
+
+    def compact(self):
+        """Compresse les segments fermés (gzip), puis applique la rétention."""
+        with self._locked():
+            open_segment = self._open_segment()
+        if open_segment is None:
+            return
+
+        # Segments fermés : immuables → compressés sans bloquer les ajouts.
+        # Seulement ceux d'AVANT le segment ouvert : un autre worker a pu en
+        # ouvrir un nouveau depuis, qui reçoit des ajouts.
+        for seq, path, compressed in self.segments():
+            if compressed or seq >= open_segment:
+                continue
+            target = self.segment_path(seq, compressed=True)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                    dst.write(src.read())
+                os.replace(tmp, target)
+                os.remove(path)
+                log("🗜️ [EVENTS] segment compacté", os.path.basename(target))
+            except FileNotFoundError:
+                pass  # un autre worker vient de le compacter
+        self.apply_retention()
+
+    def apply_retention(self):
+        import numpy as np
+        with self._locked():
+            open_segment = self._open_segment()
+            base, index = self.index()
+            segments = [s for s in self.segments() if open_segment is not None and s[0] < open_segment]
+            if index is None or not segments:
+                return
+            sizes = {seq: sum(os.path.getsize(p) for p in glob.glob(self.segment_path(seq) + "*"))
+                     for seq, _, _ in self.segments()}
+            total = sum(sizes.values())
+            cutoff = time.time() - EVENT_RETENTION_DAYS * 86400
+            dropped = []
+            for i, (seq, _, _) in enumerate(segments):
+                # Dernier événement du segment = premier du suivant - 1
+                nxt = segments[i + 1][0] if i + 1 < len(segments) else open_segment
+                last_rank = nxt - 1 - base
+                too_old = 0 <= last_rank < len(index) and float(index["ts"][last_rank]) < cutoff
+                if not too_old and total <= EVENT_MAX_BYTES:
+                    break
+                dropped.append(seq)
+                total -= sizes.get(seq, 0)
+            if not dropped:
+                return
+
+            # Nouvel index à partir du premier événement gardé, puis remplacement atomique
+            new_base = segments[len(dropped)][0] if len(dropped) < len(segments) else open_segment
+            old_path, _ = self._index_file()
+            new_path = os.path.join(self.dir, f"index-{new_base:012d}.idx")
+            np.array(index[new_base - base:]).tofile(new_path + ".tmp")
+            os.replace(new_path + ".tmp", new_path)
+            if old_path != new_path:
+                os.remove(old_path)
+            for seq in dropped:
+                for path in glob.glob(self.segment_path(seq) + "*"):
+                    os.remove(path)
+        log("🧹 [EVENTS] rétention", f"{len(dropped)} segment(s) supprimé(s)", base=new_base)
+
+    def stats(self) -> dict:
+        base, index = self.index()
+        segments = self.segments()
+        sizes = [os.path.getsize(path) for _, path, _ in segments]
+        rows = 0 if index is None else len(index)
+        return {
+            "events": rows,
+            "first_seq": base if rows else None,
+            "last_seq": base + rows - 1 if rows else None,
+            "segments": len(segments),
+            "compressed_segments": sum(compressed for _, _, compressed in segments),
+            "segments_bytes": sum(sizes),
+            "index_bytes": rows * EVENT_INDEX_ITEMSIZE,
+        }
+
+event_log = SegmentedLog(EVENT_DIR)
+
+class EventWriter:
+    """Tampon d'événements en mémoire + thread qui l'écrit par lots dans le journal."""
+    def __init__(self, target: SegmentedLog):
+        self.target = target
+        self.buffer = deque()
+        self.dropped = 0
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+
+    def put(self, event: dict):
+        """Chemin chaud : un append, sans verrou ni appel système."""
+        if len(self.buffer) >= EVENT_BUFFER_MAX:
+            self.dropped += 1
+            return
+        self.buffer.append((time.time(), event))
+        if len(self.buffer) == EVENT_BATCH_MAX:
+            self._wake.set()
+
+    def flush(self):
+        """Écrit tout le tampon (thread d'écriture, arrêt, tests)."""
+        with self._flush_lock:
+            while self.buffer:
+                batch = []
+                while self.buffer and len(batch) < EVENT_BATCH_MAX:
+                    batch.append(self.buffer.popleft())
+                try:
+                    self.target.append_many(batch)
+                except OSError as e:
+                    log("⚠️ [EVENTS] écriture impossible", str(e), events=len(batch), level=logging.WARNING)
+
+    def _run(self):
+        while True:
+            self._wake.wait(EVENT_FLUSH_S)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        """(Re)lance le thread d'écriture. Après un fork : le tampon hérité appartient au parent."""
+        self.buffer.clear()
+        threading.Thread(target=self._run, name="events-writer", daemon=True).start()
+
+event_writer = EventWriter(event_log)
+if ENABLE_EVENT_LOG:
+    event_writer.start()
+    atexit.register(event_writer.flush)
+
+def record_event(kind: str, **fields):
+    """Dépose un événement dans le tampon du journal (ne bloque jamais la requête)."""
+    if ENABLE_EVENT_LOG:
+        event_writer.put({"type": kind, "id": request_id_var.get(), **fields})
+
+@app.after_request
+def _record_request_event(response):
+    if ENABLE_EVENT_LOG and request.endpoint not in EVENT_SKIP_ENDPOINTS:
+        start = g.get("request_start")
+        record_event("request", method=request.method, path=request.path, status=response.status_code,
+                     ms=round((time.perf_counter() - start) * 1000, 1) if start else None)
+    return response
+
+def parse_event_time(value: str) -> float:
+    """Horodatage ISO 8601 (UTC si sans fuseau) ou secondes epoch → epoch."""
+    try:
+        return float(value)
+    except ValueError:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+def _event_limit(default: int = 100) -> int:
+    return max(1, min(int(request.args.get("limit", default)), EVENT_READ_MAX))
+
+@app.route("/events/tail", methods=["GET"])
+def events_tail():
+    """Les N derniers événements (?n=, 100 par défaut)."""
+    try:
+        n = max(1, min(int(request.args.get("n", 100)), EVENT_READ_MAX))
+    except ValueError:
+        return jsonify({"error": "Paramètre n invalide"}), 400
+    return jsonify({"events": event_log.tail(n)})
+
+@app.route("/events", methods=["GET"])
+def events_range():
+    """
+    Lecture par numéro de séquence (?seq=&limit=) ou par dates
+    (?since=&until=&limit=, ISO 8601 ou epoch). next_seq = suite de la lecture.
+    """
+    try:
+        limit = _event_limit()
+        if request.args.get("seq"):
+            events = event_log.from_seq(int(request.args["seq"]), limit)
+        elif request.args.get("since") or request.args.get("until"):
+            since = parse_event_time(request.args["since"]) if request.args.get("since") else 0.0
+            until = parse_event_time(request.args["until"]) if request.args.get("until") else float("inf")
+            events = event_log.between(since, until, limit)
+        else:
+            return jsonify({"error": "Paramètre seq ou since/until requis"}), 400
+    except ValueError:
+        return jsonify({"error": "Paramètres invalides"}), 400
+    return jsonify({"events": events, "next_seq": events[-1]["seq"] + 1 if events else None})
+
+@app.route("/events/stats", methods=["GET"])
+def events_stats():
+    return jsonify({
+        **event_log.stats(),
+        "buffered": len(event_writer.buffer),
+        "dropped": event_writer.dropped,
+        "config": {"segment_bytes": EVENT_SEGMENT_BYTES, "retention_days": EVENT_RETENTION_DAYS,
+                   "max_bytes": EVENT_MAX_BYTES},
+    })
 
 # -------------------------------------------------------------
 # 🔵 6) ROUTES POUR LE FRONTEND (fichiers statiques)
 # -------------------------------------------------------------
+# 👉 Les fichiers du frontend (liste blanche ASSET_FILES : pas les
+# brouillons "save …html") sont chargés EN MÉMOIRE à la 1ère requête :
+# - chaque fichier reçoit un nom "haché" (logo.3f2a9c1b0d.png) ;
+# - les textes sont pré-compressés (gzip, et brotli si installé) ;
+# - les images ont des variantes WebP/AVIF (si Pillow est installé) ;
+# - index.html est réécrit pour pointer vers les noms hachés.
+# Rien n'est fait à l'import. Les variantes coûteuses (brotli q11,
+# AVIF/WebP) ne sont jamais calculées dans une requête : elles sont lues
+# sur disque (data/assets/), sinon construites par le warm-up en
+# arrière-plan. `python3 server.py --build-assets` les prépare à
+# l'avance (étape de build) : le démarrage n'a alors plus rien à faire.
+#
+# En-têtes :
+# - nom haché  → Cache-Control: immutable, 1 an (aucun transfert en visite répétée)
+# - nom simple → no-cache + ETag (revalidation → 304 Not Modified)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+@functools.lru_cache(maxsize=1)
+def pillow_installed() -> bool:
+    """Pillow présent ? (sans l'importer : il ne sert qu'à encoder les variantes)"""
+    import importlib.util
+    return importlib.util.find_spec("PIL") is not None
+
+FRONTEND_DIR = os.path.join(ROOT_DIR, "frontend")
+ASSET_FILES = [f.strip() for f in os.getenv("ASSET_FILES", "index.html,logo.png,toop.png").split(",") if f.strip()]
+ASSET_CACHE_DIR = os.path.join(DATA_DIR, "assets")
+ASSET_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMAGE_VARIANTS = {"image/avif": "AVIF", "image/webp": "WEBP"}
+
+class StaticAsset:
+    """Un fichier du frontend et toutes ses variantes, prêtes à être servies."""
+    def __init__(self, name: str, mimetype: str, digest: str):
+        self.name = name
+        self.mimetype = mimetype
+        self.digest = digest
+        root, ext = os.path.splitext(name)
+        self.hashed_name = f"{root}.{digest}{ext}"
+        # (type de contenu, encodage) → octets
+        self.variants = {}
+        # False tant qu'une variante coûteuse manque (pas encore construite)
+        self.complete = True
+
+def _cached_variant(digest: str, suffix: str, build, allow_build: bool = True) -> Optional[bytes]:
+    """Lit une variante sur disque, ou (si autorisé) la construit puis l'enregistre."""
+    path = os.path.join(ASSET_CACHE_DIR, f"{digest}.{suffix}")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    if not allow_build:
+        return None
+    try:
+        data = build()
+    except Exception as e:
+        log("⚠️ ASSETS", f"Variante {suffix} impossible : {e}", level=logging.WARNING)
+        return None
+    # Écriture atomique : plusieurs workers peuvent construire la même variante
+    os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+def _encode_image(data: bytes, fmt: str) -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as img:
+        img.save(out, format=fmt, quality=80)
+    return out.getvalue()
+
+def _build_asset(name: str, data: bytes, expensive: bool) -> StaticAsset:
+    mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    asset = StaticAsset(name, mimetype, digest)
+    asset.variants[(mimetype, None)] = data
+
+    if mimetype.startswith(COMPRESSIBLE_TYPES):
+        gz = _cached_variant(digest, "gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))
+        if gz:
+            asset.variants[(mimetype, "gzip")] = gz
+        if brotli is not None:
+            br = _cached_variant(digest, "br", lambda: brotli.compress(data, quality=11), expensive)
+            if br:
+                asset.variants[(mimetype, "br")] = br
+            else:
+                asset.complete = False
+    elif mimetype in ("image/png", "image/jpeg") and pillow_installed():
+        for target, fmt in IMAGE_VARIANTS.items():
+            encoded = _cached_variant(digest, fmt.lower(), lambda fmt=fmt: _encode_image(data, fmt), expensive)
+            if encoded is None and not expensive:
+                asset.complete = False
+            # On ne garde une variante que si elle est réellement plus légère
+            if encoded and len(encoded) < len(data):
+                asset.variants[(target, None)] = encoded
+    return asset
+
+def build_assets(expensive: bool = False) -> dict:
+    """
+    Charge et prépare les fichiers du frontend (liste ASSET_FILES).
+    expensive=False : gzip seulement ; brotli/AVIF/WebP lus sur disque s'ils existent.
+    Renvoie {chemin demandé: (asset, immuable?)}.
+    """
+    files = {}
+    for rel in ASSET_FILES:
+        full = os.path.join(FRONTEND_DIR, rel)
+        if not os.path.isfile(full):
+            log("⚠️ ASSETS", f"Fichier frontend absent : {rel}", level=logging.WARNING)
+            continue
+        with open(full, "rb") as f:
+            files[rel] = f.read()
+
+    table = {}
+    # 1) D'abord tout sauf le HTML, pour connaître les noms hachés…
+    for name, data in files.items():
+        if not name.endswith(".html"):
+            asset = _build_asset(name, data, expensive)
+            table[name] = (asset, False)
+            table[asset.hashed_name] = (asset, True)
+
+    # 2) …puis le HTML, réécrit pour pointer vers ces noms hachés
+    for name, data in files.items():
+        if name.endswith(".html"):
+            page = data.decode("utf-8")
+            for ref, (asset, immutable) in list(table.items()):
+                if not immutable:
+                    page = page.replace(f'="{ref}"', f'="{asset.hashed_name}"')
+            asset = _build_asset(name, page.encode("utf-8"), expensive)
+            table[name] = (asset, False)
+
+    log("📦 ASSETS", f"{len(files)} fichiers frontend chargés en mémoire",
+        brotli=brotli is not None, images=pillow_installed(), expensive=expensive)
+    return table
+
+_static_assets = None
+_assets_lock = threading.Lock()
+
+def static_assets() -> dict:
+    """Table des fichiers du frontend, chargée à la 1ère demande (sans variante coûteuse à calculer)."""
+    global _static_assets
+    if _static_assets is None:
+        with _assets_lock:
+            if _static_assets is None:
+                _static_assets = build_assets(expensive=False)
+    return _static_assets
+
+def complete_assets():
+    """Construit les variantes coûteuses manquantes (warm-up, --build-assets), puis remplace la table."""
+    global _static_assets
+    if all(asset.complete for asset, _ in static_assets().values()):
+        return
+    table = build_assets(expensive=True)
+    with _assets_lock:
+        _static_assets = table
+
+def _pick_variant(asset: StaticAsset):
+    """Choisit la meilleure variante selon Accept / Accept-Encoding."""
+    accept = request.headers.get("Accept", "")
+    for target in IMAGE_VARIANTS:
+        if target in accept and (target, None) in asset.variants:
+            return target, None
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    for encoding in ("br", "gzip"):
+        if encoding in accept_encoding and (asset.mimetype, encoding) in asset.variants:
+            return asset.mimetype, encoding
+    return asset.mimetype, None
+
+def serve_asset(path: str):
+    assets = static_assets()
+    entry = assets.get(path) or assets.get("index.html")
+    if entry is None:
+        return jsonify({"error": "Fichier introuvable"}), 404
+    asset, immutable = entry
+
+    mimetype, encoding = _pick_variant(asset)
+    etag = f'"{asset.digest}-{mimetype.split("/")[-1]}-{encoding or "id"}"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept, Accept-Encoding",
+        "Cache-Control": f"public, max-age={ASSET_MAX_AGE}, immutable" if immutable else "no-cache",
+    }
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(asset.variants[(mimetype, encoding)], mimetype=mimetype, headers=headers)
 
 @app.route("/")
 def serve_frontend():
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
-    return send_from_directory(frontend_dir, "index.html")
+    return serve_asset("index.html")
 
 @app.route("/<path:path>")
 def serve_static(path):
-    frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
-    file_path = os.path.join(frontend_dir, path)
-    if os.path.exists(file_path):
-        return send_from_directory(frontend_dir, path)
-    return send_from_directory(frontend_dir, "index.html")
+    return serve_asset(path)
 
 # -------------------------------------------------------------
 # 🔵 7) LANCEMENT DU SERVEUR
 # -------------------------------------------------------------
 
 if __name__ == "__main__":
-    log("🌐 SERVEUR", "Lancement sur http://0.0.0.0:5000", C_MAGENTA)
+    if "--build-assets" in sys.argv:
+        complete_assets()
+        log("📦 ASSETS", f"Variantes prêtes dans {ASSET_CACHE_DIR}")
+        sys.exit(0)
+    start_warmup()
+    log("🌐 SERVEUR", "Lancement sur http://0.0.0.0:5000")
     app.run(host="0.0.0.0", port=5000, debug=False)
@@ -0,0 +1,69 @@
+# =============================================================
+# 🟦 De Facto — Configuration commune des tests (pytest)
+# =============================================================
+# server.py lit sa configuration à l'import : on pose ici un DATA_DIR
+# jetable, de fausses clés et des logs silencieux AVANT `import server`.
+# Aucun test n'appelle OpenAI ni Google : le client OpenAI est remplacé
+# par FakeOpenAI (fixture `fake_llm`), les pages par des serveurs locaux.
+# Lancement (depuis la racine) : python -m pytest -q
+# =============================================================
+
+import json, os, sys, tempfile, threading, time, types
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmp = tempfile.mkdtemp(prefix="defacto-tests-")
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "LOG_LEVEL": "ERROR",
+    "ENABLE_TRACING": "0",
+    "DATA_DIR": _tmp,
+    "HISTORY_FILE": os.path.join(_tmp, "logs.jsonl"),
+})
+sys.path.insert(0, BACKEND)
+
+import pytest
+import server
+
+# Réponse JSON générique : chaque étape du pipeline y trouve ses clés
+GENERIC_ANSWER = {
+    "message": "m", "opinion_retention": "o", "sujets_majeurs": ["a"], "resume": "r",
+    "faits": [{"texte": "f"}], "opinions": ["x"], "presupposes": ["Emmanuel Macron a nommé Nicolas Revel"],
+    "faits_manquants": [], "contradictions": [], "divergences": [], "impact": "faible",
+    "axes": {
+        "fond": {"Vrai": {"note": 80, "justification": "j"}, "Complet": {"note": 60, "justification": "j"}},
+        "forme": {"Neutre": {"note": 100, "justification": "j"}, "Logique": {"note": 80, "justification": "j"}},
+    },
+}
+
+class FakeOpenAI:
+    """Client OpenAI minimal : chat.completions.create, compte les appels."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        content = json.dumps(GENERIC_ANSWER)
+        return ChatCompletion.model_validate({
+            "id": "test", "object": "chat.completion", "created": 0, "model": kwargs["model"],
+            "choices": [{"index": i, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+                        for i in range(kwargs.get("n", 1))],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        })
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    fake = FakeOpenAI()
+    monkeypatch.setattr(server, "client", fake)
+    return fake
+
+@pytest.fixture
+def app_client(monkeypatch):
+    # Pas de warm-up : il ouvrirait de vraies connexions (OpenAI, Google)
+    monkeypatch.setattr(server, "start_warmup", lambda: None)
+    return server.app.test_client()
@@ -0,0 +1,44 @@
+# Fichiers du frontend (section 6) : liste blanche, chargement paresseux,
+# variantes coûteuses hors requête.
+
+import os
+
+import pytest
+import server
+
+@pytest.fixture
+def cold_assets(tmp_path, monkeypatch):
+    """Cache de variantes vide et table pas encore chargée (démarrage à froid)."""
+    monkeypatch.setattr(server, "ASSET_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "_static_assets", None)
+    return tmp_path
+
+def test_nothing_is_built_at_import():
+    assert not hasattr(server, "STATIC_ASSETS")
+
+def test_only_whitelisted_files_are_served(cold_assets):
+    table = server.static_assets()
+    plain = {name for name, (_, immutable) in table.items() if not immutable}
+    assert plain == set(server.ASSET_FILES)
+    assert "save 12 11.html" not in table and "index thème noir.html" not in table
+
+def test_first_request_skips_expensive_variants(cold_assets, app_client):
+    r = app_client.get("/", headers={"Accept-Encoding": "br, gzip"})
+    assert r.status_code == 200
+    # gzip seulement : brotli q11 n'a pas été calculé pendant la requête
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert not [f for f in os.listdir(cold_assets) if f.endswith((".br", ".avif", ".webp"))]
+    page = app_client.get("/").get_data(as_text=True)
+    assert f'="{server.static_assets()["logo.png"][0].hashed_name}"' in page
+
+@pytest.mark.skipif(server.brotli is None, reason="brotli non installé")
+def test_complete_assets_builds_variants_for_later_requests(cold_assets, app_client):
+    server.static_assets()
+    server.complete_assets()
+    assert any(f.endswith(".br") for f in os.listdir(cold_assets))
+    r = app_client.get("/", headers={"Accept-Encoding": "br, gzip"})
+    assert r.headers["Content-Encoding"] == "br"
+
+    # Redémarrage : les variantes sont relues sur disque, rien à recalculer
+    server._static_assets = None
+    assert all(asset.complete for asset, _ in server.static_assets().values())
@@ -0,0 +1,26 @@
+# Micro-benchmarks CPU (bench_cpu.py) comparés à bench_cpu_baseline.json :
+# une régression au-delà du seuil fait échouer la suite, donc le build.
+# BENCH_CPU=0 saute le test (machine trop chargée pour mesurer),
+# BENCH_CPU_THRESHOLD change le seuil (0.25 = +25 %, comme le script).
+
+import os
+
+import pytest
+
+bench_cpu = pytest.importorskip("bench_cpu")
+
+THRESHOLD = float(os.getenv("BENCH_CPU_THRESHOLD", "0.25"))
+
+@pytest.mark.skipif(os.getenv("BENCH_CPU") == "0", reason="BENCH_CPU=0")
+@pytest.mark.skipif(not os.path.exists(bench_cpu.LOGS_FILE), reason="logs.jsonl absent (données du benchmark)")
+def test_no_cpu_regression_beyond_threshold():
+    baseline = bench_cpu.load_baseline()
+    assert baseline, "bench_cpu_baseline.json absent"
+    slow = {name: ratio for name, _, ratio in bench_cpu.run_cases(repeat=3)
+            if bench_cpu.is_regression(ratio, baseline.get(name), THRESHOLD)}
+    # Seconde mesure des cas en régression : écarte un pic de charge passager
+    for name in list(slow):
+        _, _, ratio = next(bench_cpu.run_cases(only=name, repeat=5))
+        if not bench_cpu.is_regression(ratio, baseline[name], THRESHOLD):
+            del slow[name]
+    assert not slow, {name: f"{ratio / baseline[name] - 1:+.0%}" for name, ratio in slow.items()}
@@ -0,0 +1,22 @@
+# Benchmark sur cassettes (bench_pipeline.py) : le rejeu reprend les
+# paramètres de l'enregistrement qui entrent dans les clés.
+
+import os
+
+import bench_pipeline
+
+def test_replay_uses_the_recorded_cse_cx(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "environ", {**os.environ, "GOOGLE_CSE_CX": "cx-enregistrement"})
+    bench_pipeline.save_meta(str(tmp_path))
+
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_CSE_CX"}
+    monkeypatch.setattr(os, "environ", {**env, "GOOGLE_CSE_CX": "cx-autre-compte"})
+    bench_pipeline.configure("replay", str(tmp_path))
+    assert os.environ["GOOGLE_CSE_CX"] == "cx-enregistrement"
+    assert os.environ["CASSETTE_MODE"] == "replay"
+
+def test_replay_without_meta_still_starts(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(os, "environ", {k: v for k, v in os.environ.items() if k != "GOOGLE_CSE_CX"})
+    bench_pipeline.configure("replay-fast", str(tmp_path))
+    assert os.environ["GOOGLE_CSE_CX"] == "replay"
+    assert "meta.json" in capsys.readouterr().out
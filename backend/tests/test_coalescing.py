@@ -0,0 +1,147 @@
+# Analyses identiques simultanées et Idempotency-Key (section 5septies).
+
+import threading, time, uuid
+
+import pytest
+import server
+
+def _concurrently(n, fn):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+@pytest.fixture
+def joined(monkeypatch):
+    """wait_for(n) : attend que n appels se soient joints à l'exécution en cours."""
+    waiting = []
+    real_log = server.log
+
+    def log(msg, *args, **kwargs):
+        if msg.startswith("🔗 [COALESCE]"):
+            waiting.append(1)
+        return real_log(msg, *args, **kwargs)
+
+    monkeypatch.setattr(server, "log", log)
+
+    def wait_for(n):
+        deadline = time.time() + 5
+        while len(waiting) < n and time.time() < deadline:
+            time.sleep(0.005)
+
+    return wait_for
+
+def test_single_flight_shares_one_execution(joined):
+    flights = server.SingleFlight()
+    release, calls = threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {"score": 42}
+
+    threads, results, errors = _concurrently(5, lambda: flights.run("k", slow))
+    joined(4)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and errors == []
+    assert results == [{"score": 42}] * 5
+    assert flights.in_flight() == 0
+    # Exécution terminée : un nouvel appel relance le calcul
+    assert flights.run("k", lambda: {"score": 7}) == {"score": 7}
+
+def test_waiting_is_not_counted_as_a_pipeline_step(joined):
+    # Le temps d'attente d'un appel joint n'entre pas dans les durées par étape
+    flights = server.SingleFlight()
+    release = threading.Event()
+
+    def call():
+        timings = []
+        server.step_timings_var.set(timings)
+        flights.run("k", lambda: release.wait(5))
+        return timings
+
+    threads, results, errors = _concurrently(3, call)
+    joined(2)
+    release.set()
+    for t in threads:
+        t.join()
+    assert errors == [] and results == [[], [], []]
+
+def test_single_flight_propagates_errors_to_joiners(joined):
+    flights = server.SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("OpenAI indisponible")
+
+    threads, results, errors = _concurrently(3, lambda: flights.run("k", failing))
+    joined(2)
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == [] and len(errors) == 3
+    assert all(str(e) == "OpenAI indisponible" for e in errors)
+
+def test_coalescing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(server, "ENABLE_COALESCING", False)
+    flights, calls = server.SingleFlight(), []
+    for _ in range(2):
+        flights.run("k", lambda: calls.append(1))
+    assert calls == [1, 1]
+
+@pytest.fixture
+def key():
+    return f"cle-{uuid.uuid4().hex}"
+
+def test_idempotency_key_runs_once_then_replays(key):
+    calls = []
+    run = lambda: calls.append(1) or {"score_global": 64}
+    with server.app.test_request_context():
+        assert server.with_idempotency_key(key, "sha-a", run) == ({"score_global": 64}, None)
+        assert server.with_idempotency_key(key, "sha-a", run) == ({"score_global": 64}, None)
+        result, (response, status) = server.with_idempotency_key(key, "sha-b", run)
+    assert calls == [1]
+    assert result is None and status == 422
+
+def test_idempotency_key_is_released_when_the_run_fails(key):
+    def boom():
+        raise RuntimeError("échec")
+
+    with server.app.test_request_context():
+        with pytest.raises(RuntimeError):
+            server.with_idempotency_key(key, "sha", boom)
+        assert server.with_idempotency_key(key, "sha", lambda: {"ok": True}) == ({"ok": True}, None)
+
+def test_idempotency_key_waits_for_the_run_in_progress(key, monkeypatch):
+    monkeypatch.setattr(server, "IDEMPOTENCY_POLL_S", 0.01)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"score_global": 51}
+
+    def call():
+        with server.app.test_request_context():
+            return server.with_idempotency_key(key, "sha", slow)
+
+    first, results, _ = _concurrently(1, call)
+    started.wait(5)
+    second, more, _ = _concurrently(1, call)
+    release.set()
+    for t in first + second:
+        t.join()
+    assert calls == [1]
+    assert results == more == [({"score_global": 51}, None)]
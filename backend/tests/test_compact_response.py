@@ -0,0 +1,60 @@
+# Réponse compacte v2, métadonnées des axes en cache et compression des
+# réponses (section 5sexies).
+
+import gzip, json, uuid
+
+import pytest
+import server
+from conftest import GENERIC_ANSWER
+
+def _full(text):
+    axes = GENERIC_ANSWER["axes"]
+    return {
+        "score_global": 77, "couleur_global": "🟢", "resume": f"Synthèse de {text}", "commentaire": f"Synthèse de {text}",
+        "axes": axes, "justesse": 80, "completude": 60, "ton": 100, "sophismes": 80,
+        "confiance_analyse": 90, "explication_confiance": "3 évaluations indépendantes",
+    }
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    monkeypatch.setattr(server, "analyze_input", lambda text, force=False: _full(text))
+
+def test_v2_response_drops_the_duplicated_fields(analyzed, app_client):
+    text = f"Texte v2 {uuid.uuid4()}"
+    body = app_client.post("/v2/analyze", json={"text": text}).get_json()
+    assert body == {
+        "v": 2, "score": 77, "couleur": "🟢", "synthese": f"Synthèse de {text}",
+        "notes": {"fond.Vrai": 80, "fond.Complet": 60, "forme.Neutre": 100, "forme.Logique": 80},
+        "justifications": {"fond.Vrai": "j", "fond.Complet": "j", "forme.Neutre": "j", "forme.Logique": "j"},
+        "confiance": 90, "explication_confiance": "3 évaluations indépendantes",
+        "axes_version": server.AXES_VERSION,
+    }
+
+def test_fields_selects_and_validates(analyzed, app_client):
+    text = f"Texte champs {uuid.uuid4()}"
+    body = app_client.post("/v2/analyze?fields=score,notes", json={"text": text}).get_json()
+    assert set(body) == {"v", "score", "notes"}
+    r = app_client.post("/v2/analyze?fields=score,inconnu", json={"text": text})
+    assert r.status_code == 400 and "inconnu" in r.get_json()["error"]
+
+def test_axes_metadata_is_served_once_then_revalidated(app_client):
+    r = app_client.get("/v2/axes")
+    body = r.get_json()
+    assert body["version"] == server.AXES_VERSION and set(body["axes"]) == {
+        "fond.Vrai", "fond.Complet", "forme.Neutre", "forme.Logique"}
+    assert "max-age" in r.headers["Cache-Control"]
+    again = app_client.get("/v2/axes", headers={"If-None-Match": r.headers["ETag"]})
+    assert again.status_code == 304 and again.get_data() == b""
+
+def test_large_json_is_gzipped_small_json_is_not(app_client, monkeypatch):
+    monkeypatch.setattr(server, "brotli", None)
+    monkeypatch.setattr(server, "COMPRESS_MIN_BYTES", 256)
+    raw = app_client.get("/v2/axes").get_data()
+    assert len(raw) >= 256
+
+    r = app_client.get("/v2/axes", headers={"Accept-Encoding": "br, gzip"})
+    assert r.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in r.headers["Vary"]
+    assert json.loads(gzip.decompress(r.get_data())) == json.loads(raw)
+
+    small = app_client.get("/ready", headers={"Accept-Encoding": "gzip"})
+    assert len(small.get_data()) < 256 and "Content-Encoding" not in small.headers
@@ -0,0 +1,164 @@
+# Journal d'événements segmenté (section 5nonies).
+
+import gzip, multiprocessing, os, time
+
+import pytest
+import server
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(server, "EVENT_SEGMENT_BYTES", 400)
+
+def _fill(log, n, start=0):
+    for i in range(start, start + n):
+        log.append({"type": "t", "i": i})
+
+def _wait_compaction(log):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        segments = log.segments()
+        if all(compressed for _, _, compressed in segments[:-1]):
+            return
+        time.sleep(0.05)
+
+def test_seek_by_sequence_tail_and_time_range(tmp_path, small_segments):
+    log = server.SegmentedLog(str(tmp_path))
+    assert log.tail(5) == []
+    _fill(log, 100)
+    _wait_compaction(log)
+
+    assert log.stats()["segments"] > 3
+    assert [e["i"] for e in log.tail(3)] == [97, 98, 99]
+    events = log.from_seq(40, 5)
+    assert [(e["seq"], e["i"]) for e in events] == [(40 + k, 39 + k) for k in range(5)]
+
+    base, index = log.index()
+    since = float(index["ts"][10])
+    until = float(index["ts"][12])
+    assert [e["seq"] for e in log.between(since, until, 100)] == [base + 10, base + 11, base + 12]
+    assert [e["seq"] for e in log.between(since, until, 2)] == [base + 10, base + 11]
+
+def test_closed_segments_are_gzipped_and_still_readable(tmp_path, small_segments):
+    log = server.SegmentedLog(str(tmp_path))
+    _fill(log, 60)
+    _wait_compaction(log)
+    *closed, (open_seq, open_path, open_compressed) = log.segments()
+    assert closed and all(compressed for _, _, compressed in closed)
+    assert not open_compressed and open_path.endswith(".jsonl")
+    with gzip.open(closed[0][1]) as f:
+        assert f.readline().startswith(b'{"type":"t","i":0')
+    assert [e["i"] for e in log.from_seq(1, 60)] == list(range(60))
+
+def test_retention_rewrites_index_and_keeps_sequence_numbers(tmp_path, small_segments, monkeypatch):
+    log = server.SegmentedLog(str(tmp_path))
+    _fill(log, 80)
+    _wait_compaction(log)
+    before = log.stats()
+
+    monkeypatch.setattr(server, "EVENT_MAX_BYTES", before["segments_bytes"] // 2)
+    log.compact()
+    after = log.stats()
+    assert after["first_seq"] > before["first_seq"] and after["last_seq"] == before["last_seq"]
+    assert after["segments_bytes"] <= before["segments_bytes"] // 2 or after["segments"] == 1
+    assert log.from_seq(1, 5) == []
+    first = log.from_seq(after["first_seq"], 1)[0]
+    assert first["seq"] == after["first_seq"] and first["i"] == after["first_seq"] - 1
+    # Les ajouts continuent sur la nouvelle base
+    log.append({"type": "t", "i": 80})
+    assert log.tail(1)[0]["seq"] == before["last_seq"] + 1
+
+def test_read_from_stale_snapshot_skips_deleted_segments(tmp_path, small_segments, monkeypatch):
+    log = server.SegmentedLog(str(tmp_path))
+    _fill(log, 80)
+    _wait_compaction(log)
+    base, index = log.index()  # index mappé AVANT la rétention
+    monkeypatch.setattr(server, "EVENT_MAX_BYTES", log.stats()["segments_bytes"] // 2)
+    log.compact()
+    events = log._read(base, index, 0, len(index))  # pas de FileNotFoundError
+    new_first = log.stats()["first_seq"]
+    assert events and events[0]["seq"] >= new_first and events[-1]["i"] == 79
+
+def test_orphan_line_after_crash_is_not_indexed(tmp_path):
+    log = server.SegmentedLog(str(tmp_path))
+    _fill(log, 3)
+    with open(log.segment_path(1), "ab") as f:
+        f.write(b'{"orphelin":true}\n')  # écrit, mais index jamais mis à jour
+    log.append({"type": "t", "i": 3})
+    assert [e["i"] for e in log.from_seq(1, 10)] == [0, 1, 2, 3]
+
+def _append_from_child(directory, worker):
+    log = server.SegmentedLog(directory)
+    for i in range(200):
+        log.append({"type": "t", "w": worker, "i": i})
+
+def test_concurrent_appends_from_several_processes(tmp_path, small_segments):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_append_from_child, args=(str(tmp_path), w)) for w in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    log = server.SegmentedLog(str(tmp_path))
+    events = log.from_seq(1, 1000)
+    assert len(events) == 600
+    assert len({(e["w"], e["i"]) for e in events}) == 600
+    for w in range(3):
+        mine = [e["i"] for e in events if e["w"] == w]
+        assert mine == sorted(mine)
+
+def test_requests_are_recorded_off_thread_and_static_files_skipped(app_client, monkeypatch):
+    slow_append_many = server.event_log.append_many
+
+    def append_many(items):
+        time.sleep(0.2)
+        return slow_append_many(items)
+
+    monkeypatch.setattr(server.event_log, "append_many", append_many)
+    start = time.perf_counter()
+    app_client.get("/history?limit=1", headers={"X-Request-ID": "evt-history"})
+    app_client.get("/", headers={"X-Request-ID": "evt-static"})
+    assert time.perf_counter() - start < 0.2  # l'écriture ne bloque pas la requête
+    server.event_writer.flush()
+
+    ids = {e["id"] for e in server.event_log.tail(20)}
+    assert "evt-history" in ids and "evt-static" not in ids
+
+def test_step_timings_travel_with_the_result_event(tmp_path, monkeypatch, fake_llm):
+    log = server.SegmentedLog(str(tmp_path))
+    writer = server.EventWriter(log)
+    monkeypatch.setattr(server, "event_writer", writer)
+    monkeypatch.setattr(server, "ENABLE_STEP_MEMO", False)
+
+    with server.StepTimer("Étape hors analyse"):
+        pass
+    assert len(writer.buffer) == 0  # une étape seule n'est pas un événement
+
+    server.run_pipeline("Emmanuel Macron a nommé Nicolas Revel à la tête de la RATP. " * 10)
+    assert [event["type"] for _, event in writer.buffer] == ["result"]
+    writer.flush()  # écrit par lot, hors du thread appelant
+    steps = dict(log.tail(1)[0]["steps"])
+    assert "Étape 8 - Score global" in steps and "Étape hors analyse" not in steps
+    assert server.step_timings_var.get() is None
+
+def test_full_buffer_drops_and_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "EVENT_BUFFER_MAX", 3)
+    writer = server.EventWriter(server.SegmentedLog(str(tmp_path)))
+    for i in range(5):
+        writer.put({"type": "t", "i": i})
+    assert len(writer.buffer) == 3 and writer.dropped == 2
+
+def test_write_position_stays_in_memory(tmp_path, small_segments, monkeypatch):
+    log = server.SegmentedLog(str(tmp_path))
+    log.append({"type": "t", "i": 0})
+    globs = []
+    real_glob = server.glob.glob
+    monkeypatch.setattr(server.glob, "glob", lambda pattern: globs.append(pattern) or real_glob(pattern))
+    for i in range(1, 5):
+        log.append({"type": "t", "i": i})
+    assert globs == []  # ni glob ni relecture de l'index entre deux ajouts
+
+    # Un autre worker écrit : la position est relue sur disque
+    other = server.SegmentedLog(str(tmp_path))
+    assert other.append({"type": "t", "i": 5}) == 6
+    assert log.append({"type": "t", "i": 6}) == 7
+    assert [e["i"] for e in log.from_seq(1, 10)] == list(range(7))
@@ -0,0 +1,52 @@
+# Cache de preuves par présupposé (section 3bis), partagé entre articles.
+
+import pytest
+import server
+
+SOURCES = [{"titre": "Décret", "snippet": "Le décret a été signé", "url": "https://www.lemonde.fr/decret"}]
+
+def test_reformulated_claim_finds_the_cached_sources():
+    claim_id = server.evidence_store("Léandre Coustaud a signé le décret sur les pensions", 1, SOURCES)
+    # Accents, casse, ordre des mots et mots vides n'y changent rien
+    hit = server.evidence_lookup("le décret sur les pensions a été signé par LEANDRE COUSTAUD")
+    assert hit["claim_id"] == claim_id and hit["sources"] == SOURCES
+    assert hit["similarite"] >= server.EVIDENCE_MATCH_THRESHOLD
+    assert server.evidence_lookup("Léandre Coustaud a perdu son procès en appel") is None
+
+def test_expired_claims_are_ignored():
+    claim_id = server.evidence_store("Solène Prabert dirige la commission des finances", 1, SOURCES)
+    server.db().execute("UPDATE evidence_claims SET created_at = created_at - ? WHERE id = ?",
+                        (server.EVIDENCE_TTL_HOURS * 3600 + 1, claim_id))
+    assert server.evidence_lookup("Solène Prabert dirige la commission des finances") is None
+
+def test_same_claim_replaces_its_sources():
+    server.evidence_store("Octave Rimbeau quitte le gouvernement", 1, SOURCES)
+    newer = [{"titre": "Démission", "snippet": "…", "url": "https://www.bbc.com/demission"}]
+    server.evidence_store("le gouvernement : Octave Rimbeau quitte", 2, newer)
+    assert server.evidence_lookup("Octave Rimbeau quitte le gouvernement")["sources"] == newer
+
+@pytest.fixture
+def fake_cse(monkeypatch):
+    calls = []
+
+    def cse_search(claim, key, cx):
+        calls.append(claim)
+        return [{"titre": claim, "snippet": claim, "url": f"https://www.lemonde.fr/{len(calls)}"}]
+
+    monkeypatch.setenv("GOOGLE_CSE_API_KEY", "k")
+    monkeypatch.setenv("GOOGLE_CSE_CX", "cx")
+    monkeypatch.setattr(server, "cse_search", cse_search)
+    monkeypatch.setattr(server, "ENABLE_LOCAL_CORPUS", False)
+    monkeypatch.setattr(server, "ENABLE_VECTOR_INDEX", False)
+    return calls
+
+def test_second_article_on_the_same_story_reuses_the_searches(fake_cse, app_client):
+    first = server.search_web(["Hortense Valmy a été élue maire de Lyon", "La participation a atteint 41 %"])
+    assert len(fake_cse) == 2
+    second = server.search_web(["Hortense Valmy élue maire de Lyon", "Un recours a été déposé"])
+    assert fake_cse[2:] == ["Un recours a été déposé"]  # le présupposé déjà vu n'interroge pas Google
+    assert second[0]["sources"] == first[0]["sources"]
+
+    stats = app_client.get("/evidence-cache/stats").get_json()
+    story = next(s for s in stats["par_story"] if s["label"] == "Hortense Valmy a été élue maire de Lyon")
+    assert (story["hits"], story["misses"]) == (1, 3)
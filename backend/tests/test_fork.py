@@ -0,0 +1,44 @@
+# gunicorn gthread + preload (gunicorn.conf.py) : après le fork, chaque
+# worker recrée ce qui ne se partage pas entre processus (section 1).
+
+import json, os, runpy, sys, types
+
+import pytest
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_config_uses_threads_and_preload(monkeypatch):
+    monkeypatch.setenv("GUNICORN_THREADS", "8")
+    conf = runpy.run_path(os.path.join(ROOT, "gunicorn.conf.py"))
+    assert (conf["worker_class"], conf["threads"], conf["preload_app"]) == ("gthread", 8, True)
+
+    calls = []
+    monkeypatch.setitem(sys.modules, "backend.server", types.SimpleNamespace(reset_after_fork=lambda: calls.append(1)))
+    conf["post_fork"](None, None)
+    assert calls == [1]
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork indisponible")
+def test_worker_gets_fresh_threads_clients_and_connections(monkeypatch):
+    monkeypatch.setattr(server, "start_warmup", lambda: None)  # pas d'appel réseau dans le fils
+    parent_http, parent_db = server.http_client, server.db()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # worker
+        try:
+            server.reset_after_fork()
+            server.db().execute("SELECT 1")
+            report = {
+                "listeners": all(l._thread is not None and l._thread.is_alive() for l in server._listeners.values()),
+                "http_client": server.http_client is not parent_http,
+                "db": server.db() is not parent_db,
+                "client": server.client is None,
+            }
+            os.write(write_fd, json.dumps(report).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        report = json.loads(f.read() or "{}")
+    os.waitpid(pid, 0)
+    assert report == {"listeners": True, "http_client": True, "db": True, "client": True}
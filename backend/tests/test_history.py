@@ -0,0 +1,180 @@
+# Lecture de l'historique à l'envers (section 5), score servi aux poids
+# actuels (section 5bis) et index des quasi-doublons (section 5ter).
+
+import json
+
+import pytest
+import server
+from conftest import GENERIC_ANSWER
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    path = tmp_path / "logs.jsonl"
+    monkeypatch.setattr(server, "HISTORY_FILE", str(path))
+    return path
+
+def _write(path, lines):
+    with open(path, "ab") as f:
+        for line in lines:
+            f.write(line + b"\n")
+
+@pytest.mark.parametrize("block", [7, 16, 64 * 1024])
+def test_iter_lines_reverse_across_block_boundaries(tmp_path, monkeypatch, block):
+    monkeypatch.setattr(server, "HISTORY_READ_BLOCK", block)
+    path = tmp_path / "h.jsonl"
+    lines = [json.dumps({"i": i, "pad": "x" * (i % 5)}).encode() for i in range(40)]
+    _write(path, lines[:20])
+    with open(path, "ab") as f:
+        f.write(b"\n")  # ligne vide : ignorée
+    _write(path, lines[20:])
+    data = path.read_bytes()
+
+    got = list(server.iter_lines_reverse(str(path)))
+    assert [line for _, line in got] == lines[::-1]
+    # Chaque position pointe bien sur le début de sa ligne
+    assert all(data[start:start + len(line)] == line for start, line in got)
+
+def test_iter_lines_reverse_stops_at_end_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "HISTORY_READ_BLOCK", 8)
+    path = tmp_path / "h.jsonl"
+    _write(path, [b'{"i": 0}', b'{"i": 1}', b'{"i": 2}'])
+    start_of_2 = path.read_bytes().index(b'{"i": 2}')
+    assert [line for _, line in server.iter_lines_reverse(str(path), end=start_of_2)] == [b'{"i": 1}', b'{"i": 0}']
+    assert list(server.iter_lines_reverse(str(tmp_path / "absent.jsonl"))) == []
+
+def _dated(i):
+    return json.dumps({"timestamp": f"2024-03-0{i}T08:00:00Z", "score_global": 10 * i,
+                       "domaine": "bbc.com" if i % 2 == 0 else "lemonde.fr"}).encode()
+
+def test_history_pages_follow_the_cursor_newest_first(history, app_client):
+    _write(history, [_dated(i) for i in range(1, 6)])
+    pages, cursor = [], ""
+    while cursor is not None:
+        body = app_client.get(f"/history?limit=2&cursor={cursor}").get_json()
+        pages.append([item["score_global"] for item in body["items"]])
+        cursor = body["next_cursor"]
+    assert pages == [[50, 40], [30, 20], [10]]
+    assert app_client.get("/history?cursor=abc").status_code == 400
+
+def test_history_filters_apply_to_pages_and_export(history, app_client):
+    _write(history, [_dated(i) for i in range(1, 6)])
+    scores = lambda q: [i["score_global"] for i in app_client.get(f"/history?{q}").get_json()["items"]]
+    assert scores("domaine=bbc.com") == [40, 20]
+    assert scores("score_min=30&until=2024-03-04T23:59:59Z") == [40, 30]
+    lines = app_client.get("/history/export?since=2024-03-03").get_data().splitlines()
+    assert [json.loads(line)["score_global"] for line in lines] == [30, 40, 50]  # ordre du fichier
+
+TEXT = ("Le gouvernement a présenté mardi un projet de loi sur les retraites qui "
+        "repousse l'âge légal de départ à 64 ans, malgré l'opposition des syndicats "
+        "et de plusieurs partis, selon un communiqué publié dans la soirée.")
+
+def _entry(text, **extra):
+    return json.dumps({"simhash": f"{server.simhash(text):016x}", "response": {"t": text[:10]}, **extra}).encode()
+
+def test_near_dup_index_finds_similar_text_and_prefers_latest(history):
+    index = server.NearDupIndex(0.9)
+    assert index.lookup(server.simhash(TEXT)) is None  # pas encore d'historique
+
+    _write(history, [_entry(TEXT, n=1), b'{"ancienne": "entree"}', _entry("Tout autre chose : la météo de demain.")])
+    distance, first = index.lookup(server.simhash(TEXT + " Mise à jour."))
+    assert 0 < distance <= index.max_distance
+    assert server.read_history_at(first)["n"] == 1
+
+    # Nouvelle analyse du même texte : la plus récente l'emporte
+    _write(history, [_entry(TEXT, n=2)])
+    distance, latest = index.lookup(server.simhash(TEXT))
+    assert distance == 0 and latest > first
+    assert server.read_history_at(latest)["n"] == 2
+    assert index.lookup(server.simhash("Un texte sans aucun rapport avec le précédent, sur le football.")) is None
+
+def test_near_dup_index_waits_for_a_complete_line(history):
+    index = server.NearDupIndex(0.9)
+    line = _entry(TEXT)
+    with open(history, "ab") as f:
+        f.write(line[:20])  # écriture en cours dans un autre worker
+    assert index.lookup(server.simhash(TEXT)) is None
+    with open(history, "ab") as f:
+        f.write(line[20:] + b"\n")
+    assert index.lookup(server.simhash(TEXT)) == (0, 0)
+
+def test_previous_analysis_is_reused_and_marked_approximate(history, monkeypatch):
+    monkeypatch.setattr(server, "near_dup_index", server.NearDupIndex(server.NEAR_DUP_THRESHOLD))
+    result = {**GENERIC_ANSWER, "score_global": 77, "couleur_global": "🟢", "commentaire": "c"}
+    server.append_history(server.build_history_item(TEXT, None, result))
+
+    exact = server.find_previous_analysis(TEXT)
+    assert (exact["approximate"], exact["similarite"], exact["score_global"]) == (False, 1.0, 77)
+    close = server.find_previous_analysis(TEXT + " Mise à jour.")
+    assert close["approximate"] is True and close["similarite"] < 1
+    assert server.find_previous_analysis("Un texte sans aucun rapport, sur le football.") is None
+
+# Score servi = notes par axe × poids ACTUELS d'AXES_CONFIG (section 5bis)
+
+def _analysis(text):
+    result = {**GENERIC_ANSWER, "score_global": 77, "couleur_global": "🟢", "commentaire": "c"}
+    return server.build_history_item(text, None, result)
+
+@pytest.fixture
+def reweighted(history, tmp_path, monkeypatch, app_client):
+    """Deux analyses enregistrées (77 🟢), puis les poids changent : 77 → 35 🔴."""
+    monkeypatch.setattr(server, "note_columns", server.NoteColumns(str(tmp_path / "notes.npz")))
+    for text in ("Premier texte analysé.", "Second texte analysé."):
+        server.append_history(_analysis(text))
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Vrai"], "poids", 0.10)
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Complet"], "poids", 0.0)
+    return app_client
+
+def test_history_serves_scores_under_current_weights(reweighted):
+    items = reweighted.get("/history?full=1").get_json()["items"]
+    assert [(i["score_global"], i["couleur_global"], i["score_enregistre"]) for i in items] == [(35, "🔴", 77)] * 2
+    assert all(i["response"]["score_global"] == 35 for i in items)
+    # Les filtres portent sur le score servi
+    assert reweighted.get("/history?score_min=70").get_json()["items"] == []
+    assert len(reweighted.get("/history?score_max=40").get_json()["items"]) == 2
+
+def test_export_serves_scores_under_current_weights(reweighted):
+    lines = reweighted.get("/history/export").get_data().splitlines()
+    assert [json.loads(line)["score_global"] for line in lines] == [35, 35]
+
+def test_unchanged_weights_keep_the_original_line(history, app_client):
+    server.append_history(_analysis("Texte sans changement de poids."))
+    assert app_client.get("/history/export").get_data() == history.read_bytes()
+    assert "score_enregistre" not in app_client.get("/history").get_json()["items"][0]
+
+def test_rescore_compares_with_served_scores(reweighted):
+    body = reweighted.post("/history/rescore", json={"poids": {}}).get_json()
+    assert body["changements_couleur"] == 0
+    assert body["score_moyen"] == {"avant": 35.0, "apres": 35.0}
+    body = reweighted.post("/history/rescore", json={"poids": {"fond.Vrai": 0.4, "fond.Complet": 0.3}}).get_json()
+    assert body["score_moyen"]["apres"] == 77.0 and body["transitions"] == {"🔴→🟢": 2}
+
+def test_rescore_rejects_an_invalid_limit(reweighted):
+    for body in ({"limit": "x"}, {"limit": None}, {"poids": ["fond.Vrai"]}):
+        assert reweighted.post("/history/rescore", json=body).status_code == 400
+
+def test_stored_responses_are_served_under_current_weights(monkeypatch):
+    # Cache d'URL et rejeu d'Idempotency-Key : réponse enregistrée à 77 🟢
+    url = "https://www.lemonde.fr/poids-actuels.html"
+    result = _analysis("Texte du cache d'URL.")["response"]
+    server.url_cache_store(url, "Texte du cache d'URL.", result)
+    key = f"cle-poids-{server.text_sha(url)[:8]}"
+    with server.app.test_request_context():
+        server.with_idempotency_key(key, "sha", lambda: result)
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Vrai"], "poids", 0.10)
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Complet"], "poids", 0.0)
+
+    served = server.url_cache_get(url)
+    assert (served["score_global"], served["couleur_global"]) == (35, "🔴")
+    with server.app.test_request_context():
+        replayed, _ = server.with_idempotency_key(key, "sha", lambda: pytest.fail("rejouée"))
+    assert replayed["score_global"] == 35
+
+def test_bulk_scoring_cache_uses_current_weights(history, monkeypatch):
+    import bulk_score
+    url = "https://www.lemonde.fr/audit.html"
+    result = _analysis("Texte audité.")["response"]
+    server.append_history(server.build_history_item("Texte audité.", url, result))
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Vrai"], "poids", 0.10)
+    monkeypatch.setitem(server.AXES_CONFIG["fond"]["Complet"], "poids", 0.0)
+    row = bulk_score.history_by_url()[url]
+    assert (row["score_global"], row["couleur_global"]) == (35, "🔴")
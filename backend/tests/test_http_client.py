@@ -0,0 +1,128 @@
+# Client HTTP sortant (section 1quater) : cache DNS, TLS, pools par hôte.
+
+import http.server, shutil, socket, ssl, subprocess, threading, time
+
+import pytest
+import requests
+import server
+
+PAGE = b"<html><body><p>ok</p></body></html>"
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+def _serve(httpd):
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+@pytest.fixture
+def no_throttle(monkeypatch):
+    monkeypatch.setattr(server, "HTTP_HOST_RATE", 0)
+    server.dns_cache.forget("localhost")
+
+@pytest.fixture(scope="module")
+def tls_server(tmp_path_factory):
+    """Serveur HTTPS local ; certificat valable pour le NOM localhost uniquement (pas pour 127.0.0.1)."""
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl indisponible")
+    d = tmp_path_factory.mktemp("tls")
+    cert, key = d / "cert.pem", d / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+    _serve(httpd)
+    yield httpd.server_address[1], str(cert)
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(scope="module")
+def plain_server():
+    httpd = _serve(http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler))
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_tls_checks_certificate_against_hostname(tls_server, no_throttle):
+    port, cert = tls_server
+    client = server.OutboundHTTP()
+    r = client.get(f"https://localhost:{port}/", verify=cert)
+    assert r.status_code == 200 and r.content == PAGE
+    # Connexion neuve : l'adresse vient du cache, le SNI reste "localhost"
+    client.adapter.poolmanager.clear()
+    hits = server.dns_cache.hits
+    assert client.get(f"https://localhost:{port}/", verify=cert).status_code == 200
+    assert server.dns_cache.hits == hits + 1
+
+def test_tls_still_rejects_wrong_certificate(tls_server, no_throttle):
+    port, _ = tls_server
+    with pytest.raises(requests.exceptions.SSLError):
+        server.OutboundHTTP().get(f"https://localhost:{port}/")  # certificat auto-signé inconnu
+
+def test_dns_cache_is_keyed_by_hostname(plain_server, no_throttle):
+    client = server.OutboundHTTP()
+    for _ in range(2):
+        client.adapter.poolmanager.clear()
+        assert client.get(f"http://localhost:{plain_server}/").status_code == 200
+    assert "localhost" in server.dns_cache._entries
+    assert not any(host[0].isdigit() for host in server.dns_cache._entries)
+
+def test_failed_connection_forgets_hostname(no_throttle):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # port libre : personne n'écoute
+    with pytest.raises(requests.exceptions.ConnectionError):
+        server.OutboundHTTP().get(f"http://localhost:{port}/")
+    assert "localhost" not in server.dns_cache._entries
+
+def test_every_cached_address_is_tried_in_order(plain_server, no_throttle, monkeypatch):
+    # Deux adresses : la première ne répond pas (rien n'écoute sur 127.0.0.2)
+    real_getaddrinfo, lookups = socket.getaddrinfo, []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host != "multi.test":
+            return real_getaddrinfo(host, port, *args, **kwargs)
+        lookups.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, port)) for ip in ("127.0.0.2", "127.0.0.1")]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    client = server.OutboundHTTP()
+    for _ in range(2):
+        client.adapter.poolmanager.clear()
+        assert client.get(f"http://multi.test:{plain_server}/").content == PAGE
+    assert lookups == ["multi.test"]  # la seconde connexion repart du cache
+    assert server.dns_cache._entries["multi.test"][0] == ["127.0.0.2", "127.0.0.1"]
+    server.dns_cache.forget("multi.test")
+
+def test_keep_alive_reuses_one_connection_per_host(plain_server, no_throttle):
+    client = server.OutboundHTTP()
+    for _ in range(5):
+        client.get(f"http://localhost:{plain_server}/")
+    stats = client.stats()["hosts"]["localhost"]
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1 and stats["reused"] == 4
+
+def test_host_rate_spaces_requests(monkeypatch):
+    monkeypatch.setattr(server, "HTTP_HOST_RATE", 20)
+    client = server.OutboundHTTP()
+    start = time.monotonic()
+    waits = [client._wait_turn("exemple.fr") for _ in range(3)]
+    # Créneaux espacés de 1/20 s ; un autre domaine n'attend pas
+    assert time.monotonic() - start >= 2 / 20
+    assert waits[0] == 0 and waits[1] > 0
+    assert client._wait_turn("autre.fr") == 0
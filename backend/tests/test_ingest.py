@@ -0,0 +1,94 @@
+# Ingestion du corpus local (ingest.py) : flux, sitemaps, dédoublonnage.
+# Flux et sitemaps sont des fichiers locaux (tests/fixtures), les
+# téléchargements sont simulés.
+
+import os, threading, uuid
+
+import pytest
+import ingest
+import server
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+def test_rss_feed_links():
+    assert ingest.urls_from_feed(fixture("rss.xml")) == [
+        "https://www.lemonde.fr/politique/article/2024/03/01/reforme-retraites_1.html",
+        "https://www.lemonde.fr/economie/article/2024/03/02/budget-2025_2.html",
+    ]
+
+def test_atom_feed_takes_the_alternate_link_of_each_entry():
+    assert ingest.urls_from_feed(fixture("atom.xml")) == [
+        "https://www.bbc.com/news/world-1",
+        "https://www.bbc.com/news/business-2",
+    ]
+
+def test_sitemap_urls():
+    assert ingest.urls_from_sitemap(fixture("sitemap.xml")) == [
+        "https://www.francetvinfo.fr/politique/article-1.html",
+        "https://www.francetvinfo.fr/sante/article-2.html",
+    ]
+
+def test_sitemap_index_is_followed_two_levels_deep(monkeypatch, capsys):
+    # Les <loc> des index sont relatifs au dossier des fixtures
+    monkeypatch.chdir(FIXTURES)
+    urls = ingest.urls_from_sitemap("sitemapindex.xml")
+    assert urls == [
+        "https://www.francetvinfo.fr/politique/article-1.html",
+        "https://www.francetvinfo.fr/sante/article-2.html",
+        "https://www.francetvinfo.fr/monde/article-3.html",
+    ]  # sitemap-3.xml est au 3e niveau d'index : ignoré
+    assert "sitemap illisible : sitemap-absent.xml" in capsys.readouterr().out
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    """fetch_article simulé : texte choisi par URL, appels comptés."""
+    pages, calls = {}, []
+    lock = threading.Lock()
+
+    def fetch_article(url):
+        with lock:
+            calls.append(url)
+        return {"title": url.rsplit("/", 1)[-1], "text": pages.get(url, "")}
+
+    monkeypatch.setattr(server, "fetch_article", fetch_article)
+    monkeypatch.setattr(server, "ENABLE_VECTOR_INDEX", False)
+    return pages, calls
+
+def test_run_dedups_by_url_then_by_content(fake_fetch):
+    pages, calls = fake_fetch
+    run = uuid.uuid4().hex[:8]  # base partagée entre tests : URL et textes uniques
+    url = lambda n: f"https://www.lemonde.fr/{run}/article-{n}.html"
+    text = lambda n: f"Article {n} de la série {run}. " * 20
+
+    server.corpus_add(url(0), "déjà là", text(0))
+    pages.update({
+        url(1): text(1),
+        url(2): text(1),          # même texte qu'article-1 sous une autre URL
+        url(3): text(0),          # même texte qu'un article déjà dans le corpus
+        url(4): "",               # extraction ratée
+        url(5): text(5),
+    })
+    urls = [url(1), url(1), url(0), "https://example.com/hors-liste", url(2), url(3), url(4), url(5)]
+
+    stats = ingest.Ingestor(workers=4, per_host=2, batch_size=1, refresh=False).run(urls)
+
+    assert sorted(calls) == sorted([url(1), url(2), url(3), url(4), url(5)])  # 1 seul appel pour article-1
+    assert stats == {"candidates": 5, "skipped_url": 2, "failed": 1, "duplicates": 2, "written": 2}
+    assert server.corpus_known(url=url(5))
+    # Des deux URL au texte identique, une seule est écrite
+    assert server.corpus_known(url=url(1)) != server.corpus_known(url=url(2))
+    assert not server.corpus_known(url=url(3))
+
+def test_refresh_downloads_known_urls_again(fake_fetch):
+    pages, calls = fake_fetch
+    known = f"https://www.bbc.com/news/{uuid.uuid4().hex[:8]}"
+    server.corpus_add(known, "v1", "Première version. " * 20)
+    pages[known] = "Version corrigée. " * 20
+
+    assert ingest.Ingestor(2, 1, 10, refresh=False).run([known])["candidates"] == 0
+    assert calls == []
+    stats = ingest.Ingestor(2, 1, 10, refresh=True).run([known])
+    assert calls == [known] and stats["written"] == 1
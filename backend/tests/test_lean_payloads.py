@@ -0,0 +1,59 @@
+# Payloads compacts pour les LLM (section 3sexies) : UTF-8 sans espaces,
+# extraits dédoublonnés, preuves tenues dans un budget de tokens.
+
+import json
+
+import server
+
+def _hit(claim, *snippets, site="lemonde.fr"):
+    return {"entité": claim, "sources": [
+        {"titre": "t", "snippet": s, "url": f"https://www.{site}/{i}"} for i, s in enumerate(snippets)
+    ]}
+
+def test_duplicate_snippets_are_sent_once():
+    hits = [
+        _hit("Clothilde Varenne a démissionné",
+             "Clothilde Varenne a démissionné lundi de son poste de ministre",
+             "Clothilde Varenne a démissionné lundi de son poste de ministre."),
+        _hit("La loi a été votée", "Clothilde Varenne a démissionné lundi de son poste de ministre",
+             "Le texte a été adopté par 300 voix", site="bbc.com"),
+    ]
+    lean = server.lean_evidence(hits, budget=10_000)
+    assert lean == [
+        {"presuppose": "Clothilde Varenne a démissionné",
+         "preuves": [{"site": "lemonde.fr", "extrait": "Clothilde Varenne a démissionné lundi de son poste de ministre"}]},
+        {"presuppose": "La loi a été votée",
+         "preuves": [{"site": "bbc.com", "extrait": "Le texte a été adopté par 300 voix"}]},
+    ]
+
+def test_budget_keeps_the_best_evidence_of_each_claim_first():
+    words = iter("budget conseil régional tramway collège hôpital piscine stade musée crèche "
+                 "parking marché théâtre gare lycée mairie".split())
+    hits = [_hit(f"Présupposé {c}", *(" ".join(next(words) for _ in range(2)) + " annoncé le financement"
+                                      for _ in range(3)))
+            for c in ("alpha", "beta")]
+    full = server.lean_evidence(hits, budget=10_000)
+    assert [len(h["preuves"]) for h in full] == [3, 3]
+    # Budget : la structure vide + la 1re preuve de chaque présupposé
+    one_each = server.count_tokens(server.compact_json([{**h, "preuves": []} for h in full]))
+    one_each += sum(server.count_tokens(server.compact_json(h["preuves"][0])) + 1 for h in full)
+    lean = server.lean_evidence(hits, budget=one_each)
+    assert [len(h["preuves"]) for h in lean] == [1, 1]
+    assert [h["preuves"][0] for h in lean] == [h["preuves"][0] for h in full]
+    assert server.count_tokens(server.compact_json(lean)) <= one_each
+
+def test_long_snippets_are_clipped_on_a_word():
+    [hit] = server.lean_evidence([_hit("x", "mot " * 200)], budget=10_000)
+    extrait = hit["preuves"][0]["extrait"]
+    assert len(extrait) <= server.EVIDENCE_MAX_CHARS + 1 and extrait.endswith("mot…")
+
+def test_payload_is_compact_and_measured(monkeypatch, app_client):
+    legacy = {"summary": {"resume": "Élection à Besançon", "sujets_majeurs": ["élection"]}}
+    lean = {"summary": {"resume": "Élection à Besançon"}}
+    sent = server.lean_payload("test.lean", legacy, lean)
+    assert sent == '{"summary":{"resume":"Élection à Besançon"}}'
+    monkeypatch.setattr(server, "ENABLE_LEAN_PAYLOADS", False)
+    assert json.loads(server.lean_payload("test.lean", legacy, lean)) == legacy
+
+    stats = app_client.get("/payload/stats").get_json()["steps"]["test.lean"]
+    assert stats["calls"] == 2 and stats["tokens_apres"] < stats["tokens_avant"] and stats["economie"] > 0
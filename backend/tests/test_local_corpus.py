@@ -0,0 +1,49 @@
+# Corpus local FTS5 (section 3ter) : interrogé avant Google CSE.
+
+import pytest
+import server
+
+@pytest.fixture
+def cse(monkeypatch):
+    calls = []
+
+    def cse_search(claim, key, cx):
+        calls.append(claim)
+        return [{"titre": "CSE", "snippet": claim, "url": "https://www.bbc.com/cse"}]
+
+    monkeypatch.setattr(server, "cse_search", cse_search)
+    monkeypatch.setattr(server, "ENABLE_LOCAL_CORPUS", True)
+    monkeypatch.setattr(server, "ENABLE_VECTOR_INDEX", False)
+    return calls
+
+def test_only_reliable_sites_enter_the_corpus(cse):
+    assert server.corpus_add("https://www.lemonde.fr/gaspard-orlin", "Gaspard Orlin", "Gaspard Orlin nommé préfet")
+    assert not server.corpus_add("https://blog.example.com/orlin", "Rumeur", "Gaspard Orlin nommé préfet")
+    assert server.corpus_known(url="https://www.lemonde.fr/gaspard-orlin")
+    assert not server.corpus_known(url="https://blog.example.com/orlin")
+    # Même contenu : rien ne change
+    assert not server.corpus_add("https://www.lemonde.fr/gaspard-orlin", "Gaspard Orlin", "Gaspard Orlin nommé préfet")
+
+def test_search_ignores_accents_and_weak_matches(cse):
+    server.corpus_add("https://www.reuters.com/bertille-quenard",
+                      "Bertille Quénard réélue", "Bertille Quénard a été réélue présidente de la région")
+    [hit] = server.corpus_search("bertille quenard reelue presidente")
+    assert hit["url"] == "https://www.reuters.com/bertille-quenard" and hit["origine"] == "local"
+    # Un seul mot commun sur quatre : sous LOCAL_MIN_COVERAGE
+    assert server.corpus_search("Bertille Vaudrin perd procès") == []
+
+def test_enough_local_hits_skip_cse(cse):
+    server.corpus_add_many([
+        {"url": "https://www.apnews.com/maxence-tilloy", "title": "Maxence Tilloy", "text": "Maxence Tilloy démissionne du conseil"},
+        {"url": "https://www.bbc.com/maxence-tilloy", "title": "Tilloy", "text": "Le conseiller Maxence Tilloy démissionne"},
+    ])
+    hits = server.gather_sources("Maxence Tilloy démissionne", "k", "cx")
+    assert cse == [] and {h["origine"] for h in hits} == {"local"}
+
+def test_too_few_local_hits_complete_with_cse(cse):
+    server.corpus_add("https://www.lefigaro.fr/ninon-calvet", "Ninon Calvet", "Ninon Calvet élue sénatrice")
+    hits = server.gather_sources("Ninon Calvet élue sénatrice", "k", "cx")
+    assert cse == ["Ninon Calvet élue sénatrice"]
+    assert [h["url"] for h in hits] == ["https://www.lefigaro.fr/ninon-calvet", "https://www.bbc.com/cse"]
+    # Sans clé CSE, le corpus local seul
+    assert len(server.gather_sources("Ninon Calvet élue sénatrice", None, None)) == 1
@@ -0,0 +1,64 @@
+# Logs structurés (section 0) : une ligne JSON par événement, ID de
+# requête, écriture hors du thread appelant, échantillonnage DEBUG.
+
+import io, json, logging, queue
+
+import pytest
+import server
+
+@pytest.fixture
+def captured(monkeypatch):
+    """Logs DEBUG redirigés vers un tampon ; lines() vide la file et renvoie les lignes JSON."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(server.JsonFormatter())
+    level = server.logger.level
+    server.logger.setLevel(logging.DEBUG)
+    server._listeners["defacto"].stop()
+    server.start_queue_logging(server.logger, handler)
+
+    def lines():
+        server._listeners["defacto"].stop()  # écrit ce qui reste dans la file
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield lines
+    server.logger.setLevel(level)
+    server.start_queue_logging(server.logger, server._stdout_handler)
+
+def test_one_json_line_per_event_with_request_context(captured):
+    server.start_request_logging("rid-test-1")
+    token = server.log_step_var.set("Étape 4 - Recherche web")
+    try:
+        server.log("🔎 Recherche", "3 présupposés", sources=2)
+    finally:
+        server.log_step_var.reset(token)
+    [line] = captured()
+    assert {k: line[k] for k in ("level", "request_id", "step", "event", "message", "sources")} == {
+        "level": "INFO", "request_id": "rid-test-1", "step": "Étape 4 - Recherche web",
+        "event": "🔎 Recherche", "message": "3 présupposés", "sources": 2,
+    }
+
+def test_request_id_is_taken_from_the_header_and_echoed(app_client):
+    assert app_client.get("/ready", headers={"X-Request-ID": "abc123"}).headers["X-Request-ID"] == "abc123"
+    generated = app_client.get("/ready").headers["X-Request-ID"]
+    assert len(generated) == 12 and generated != "abc123"
+
+def test_unsampled_request_skips_debug_without_computing_it(captured):
+    server.start_request_logging("rid-test-2")
+    token = server.log_sampled_var.set(False)
+    computed = []
+    try:
+        server.log_data("Donnée coûteuse", lambda: computed.append(1) or "x")
+        server.log("Étape terminée")
+    finally:
+        server.log_sampled_var.reset(token)
+    assert computed == []
+    assert [line["event"] for line in captured()] == ["Étape terminée"]
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(server.NonBlockingQueueHandler, "dropped", 0)
+    handler = server.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("defacto", logging.INFO, __file__, 1, "x", None, None)
+    for _ in range(3):
+        handler.enqueue(record)
+    assert server.NonBlockingQueueHandler.dropped == 2
@@ -0,0 +1,44 @@
+# Reclassement BM25 des sources (étape 4) : top-k par présupposé, plafond
+# global, tour de rôle entre présupposés.
+
+import pytest
+import server
+
+def _src(title, snippet=""):
+    return {"titre": title, "snippet": snippet, "url": f"https://www.lemonde.fr/{title[:12]}"}
+
+def test_bm25_prefers_documents_sharing_rare_terms():
+    docs = ["Marius Dautel élu maire de Quimper", "La météo de Quimper", "Résultats sportifs du week-end"]
+    scores = server.bm25_scores(["Marius Dautel élu maire de Quimper"], docs)
+    assert scores.shape == (3, 1)
+    assert scores[0, 0] > scores[1, 0] > 0 == scores[2, 0]
+
+def test_relevant_sources_move_up_and_the_rest_is_dropped(monkeypatch):
+    monkeypatch.setattr(server, "EVIDENCE_TOP_K", 2)
+    sources = [_src("Programme télé"), _src("Horaires des marées"),
+               _src("Apolline Vercors nommée ambassadrice", "Apolline Vercors rejoint Ottawa"),
+               _src("Ambassadrice au Canada", "nommée par décret")]
+    [result] = server.rerank_sources([{"entité": "Apolline Vercors nommée ambassadrice au Canada", "sources": sources}])
+    assert [s["titre"] for s in result["sources"]] == ["Apolline Vercors nommée ambassadrice", "Ambassadrice au Canada"]
+    assert result["sources"][0]["bm25"] >= result["sources"][1]["bm25"] > 0
+
+def test_global_cap_shares_the_slots_between_claims(monkeypatch):
+    monkeypatch.setattr(server, "EVIDENCE_TOP_K", 3)
+    monkeypatch.setattr(server, "EVIDENCE_GLOBAL_CAP", 4)
+    results = [
+        {"entité": claim, "sources": [_src(f"{claim} {i}") for i in range(3)]}
+        for claim in ("Grève des cheminots", "Hausse du SMIC", "Sommet de Bruxelles")
+    ]
+    kept = server.rerank_sources(results)
+    # Tour de rôle : un par présupposé, puis le 2e du premier
+    assert [len(r["sources"]) for r in kept] == [2, 1, 1]
+    assert [r["entité"] for r in kept] == [r["entité"] for r in results]
+
+def test_equal_scores_keep_the_original_order():
+    sources = [_src("Aucun rapport A"), _src("Aucun rapport B"), _src("Aucun rapport C")]
+    [result] = server.rerank_sources([{"entité": "Sommet du G7", "sources": sources}])
+    assert [s["titre"] for s in result["sources"]] == ["Aucun rapport A", "Aucun rapport B", "Aucun rapport C"]
+
+def test_no_sources_is_a_no_op():
+    results = [{"entité": "Rien trouvé", "sources": []}]
+    assert server.rerank_sources(results) == results
@@ -0,0 +1,55 @@
+# Auto-cohérence (étape 6) : EVAL_SAMPLES évaluations tirées en un seul
+# appel (paramètre n), note médiane par axe, confiance = accord entre elles.
+
+import json, types
+
+import server
+
+def _sample(vrai, complet=60, neutre=100, logique=80):
+    return {"axes": {
+        "fond": {"Vrai": {"note": vrai, "justification": f"vrai={vrai}"},
+                 "Complet": {"note": complet, "justification": "c"}},
+        "forme": {"Neutre": {"note": neutre, "justification": "n"},
+                  "Logique": {"note": logique, "justification": "l"}},
+    }}
+
+def test_median_note_with_its_justification_and_spread():
+    data = server.aggregate_axes([_sample(80), _sample(40), _sample(60)])
+    assert data["axes"]["fond"]["Vrai"] == {"note": 60, "justification": "vrai=60"}
+    assert data["confiance"]["ecarts"] == {"fond.Vrai": 40, "fond.Complet": 0, "forme.Neutre": 0, "forme.Logique": 0}
+    # Écart moyen de 10 points → 100 - 2 × 10
+    assert data["confiance"]["score"] == 80 and data["confiance"]["evaluations"] == 3
+    assert "fond.Vrai (40 pts)" in data["confiance"]["explication"]
+
+def test_even_median_snaps_to_the_lower_grid_note():
+    data = server.aggregate_axes([_sample(40), _sample(60)])
+    assert data["axes"]["fond"]["Vrai"]["note"] == 40
+
+def test_identical_samples_give_full_confidence():
+    assert server.aggregate_axes([_sample(80)] * 3)["confiance"]["score"] == 100
+
+def test_single_sample_leaves_confidence_unmeasured():
+    data = server.aggregate_axes([_sample(80)])
+    assert data["confiance"]["score"] is None and data["axes"]["fond"]["Vrai"]["note"] == 80
+
+def test_malformed_samples_are_ignored():
+    broken = {"axes": {"fond": {"Vrai": {"note": "beaucoup"}}}}
+    data = server.aggregate_axes([_sample(80), broken, _sample(80)])
+    assert data["axes"]["fond"]["Vrai"]["note"] == 80 and data["confiance"]["ecarts"]["fond.Vrai"] == 0
+
+def test_one_request_for_all_samples(monkeypatch):
+    requests = []
+
+    def llm_chat(**kwargs):
+        requests.append(kwargs)
+        notes = [100, 20, 80][:kwargs["n"]]
+        return types.SimpleNamespace(choices=[
+            types.SimpleNamespace(message=types.SimpleNamespace(content=json.dumps(_sample(n)))) for n in notes
+        ])
+
+    monkeypatch.setattr(server, "llm_chat", llm_chat)
+    monkeypatch.setattr(server, "EVAL_SAMPLES", 3)
+    data = server.evaluate_axes({"resume": "r"}, [], {}, {"message": "m"})
+    assert len(requests) == 1 and requests[0]["n"] == 3
+    assert data["axes"]["fond"]["Vrai"]["note"] == 80
+    assert data["confiance"]["ecarts"]["fond.Vrai"] == 80
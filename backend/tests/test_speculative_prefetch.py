@@ -0,0 +1,106 @@
+# Préchargement spéculatif (section 3quinquies) : les sources des entités
+# rejoignent les candidats des présupposés qui les citent, BM25 trie, et la
+# recherche ciblée du présupposé a toujours lieu.
+
+import threading
+
+import pytest
+import server
+
+CLAIM = "Bérénice Quatremer a signé le décret sur les retraites"
+
+@pytest.fixture
+def fake_cse(monkeypatch):
+    """
+    cse_search déterministe : réponses choisies par requête (pages), sinon
+    une source dont l'URL dérive de la requête. Renvoie (appels, pages).
+    """
+    calls, pages = [], {}
+
+    def cse_search(claim, key, cx):
+        calls.append(claim)
+        if claim in pages:
+            return [{"titre": t, "snippet": s, "url": u} for t, s, u in pages[claim]]
+        slug = "-".join(server.normalize_words(claim))
+        return [{"titre": claim, "snippet": f"À propos de {claim}", "url": f"https://www.lemonde.fr/{slug}"}]
+
+    monkeypatch.setenv("GOOGLE_CSE_API_KEY", "k")
+    monkeypatch.setenv("GOOGLE_CSE_CX", "cx")
+    monkeypatch.setattr(server, "cse_search", cse_search)
+    monkeypatch.setattr(server, "ENABLE_LOCAL_CORPUS", False)
+    monkeypatch.setattr(server, "ENABLE_VECTOR_INDEX", False)
+    monkeypatch.setattr(server, "ENABLE_STEP_MEMO", False)
+    return calls, pages
+
+def _prefetch(text):
+    prefetch = server.SpeculativePrefetch(text)
+    for future in prefetch.futures.values():
+        future.result()
+    return prefetch
+
+def _urls(result):
+    return sorted(h["url"] for h in result["sources"])
+
+def test_claim_citing_an_entity_gets_the_relevant_speculative_sources(fake_cse, monkeypatch):
+    calls, pages = fake_cse
+    monkeypatch.setattr(server, "EVIDENCE_TOP_K", 2)
+    pages["Bérénice Quatremer"] = [
+        ("Retraites : Bérénice Quatremer a signé le décret", "Le décret sur les retraites signé jeudi",
+         "https://www.lemonde.fr/decret-retraites"),
+        ("Bérénice Quatremer en vacances", "Séjour à Biarritz", "https://www.lemonde.fr/biarritz"),
+    ]
+    pages[CLAIM] = [(CLAIM, "Le décret sur les retraites", "https://www.francetvinfo.fr/decret")]
+
+    prefetch = _prefetch("Hier, Bérénice Quatremer a parlé. Lundi, Bérénice Quatremer a signé le décret.")
+    assert prefetch.queries == ["Bérénice Quatremer"]
+    results = server.search_web([CLAIM], prefetch)
+    prefetch.finish()
+
+    assert CLAIM in calls  # la recherche ciblée a bien eu lieu
+    # BM25 garde la source spéculative pertinente, écarte l'autre
+    assert _urls(results[0]) == ["https://www.francetvinfo.fr/decret", "https://www.lemonde.fr/decret-retraites"]
+    assert (prefetch.claims, prefetch.claims_hit, prefetch.used) == (1, 1, {"Bérénice Quatremer"})
+
+    # Le cache garde, sous le présupposé, ses propres sources uniquement ;
+    # rien n'est rangé sous l'entité, aucune story spéculative
+    cached = server.evidence_lookup(CLAIM)
+    assert [h["url"] for h in cached["sources"]] == ["https://www.francetvinfo.fr/decret"]
+    assert server.evidence_lookup("Bérénice Quatremer") is None
+    labels = [row[0] for row in server.db().execute("SELECT label FROM evidence_stories")]
+    assert not [label for label in labels if label.startswith("spéculation")]
+
+def test_speculative_sources_ranked_out_are_not_counted(fake_cse, monkeypatch):
+    calls, pages = fake_cse
+    monkeypatch.setattr(server, "EVIDENCE_TOP_K", 1)
+    claim = "Ondine Valcourbe a réformé le code minier"
+    pages["Ondine Valcourbe"] = [("Ondine Valcourbe au festival", "Cinéma", "https://www.bbc.com/festival")]
+
+    prefetch = _prefetch("Hier, Ondine Valcourbe a parlé. Ondine Valcourbe reviendra.")
+    results = server.search_web([claim], prefetch)
+    prefetch.finish()
+    assert "https://www.bbc.com/festival" not in _urls(results[0])
+    assert (prefetch.claims, prefetch.claims_hit, prefetch.used) == (1, 0, set())
+
+def test_claim_not_citing_the_entity_gets_no_candidate(fake_cse):
+    prefetch = _prefetch("Hier, Anselme Torvillac a parlé. Anselme Torvillac reviendra.")
+    claim = "Le budget de la défense augmente en 2025"
+    results = server.search_web([claim], prefetch)
+    prefetch.finish()
+    assert _urls(results[0]) == ["https://www.lemonde.fr/" + "-".join(server.normalize_words(claim))]
+    assert prefetch.claims_hit == 0
+
+def test_finish_stops_searches_before_google(fake_cse, monkeypatch):
+    calls, _ = fake_cse
+    gate = threading.Event()
+    real_corpus_search = server.corpus_search
+    monkeypatch.setattr(server, "ENABLE_LOCAL_CORPUS", True)
+    monkeypatch.setattr(server, "corpus_search", lambda q: gate.wait(5) and [] or real_corpus_search(q))
+
+    prefetch = server.SpeculativePrefetch("Puis Théodric Malvaux a répondu. Théodric Malvaux insiste.")
+    prefetch.finish()  # étape 4 terminée pendant la recherche locale
+    gate.set()
+    for future in prefetch.futures.values():
+        if not future.cancelled():
+            future.result()
+    assert calls == []
+    assert prefetch.results == {}
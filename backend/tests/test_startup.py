@@ -0,0 +1,32 @@
+# Démarrage à chaud (section 1ter) : imports différés, warm-up, /ready.
+
+import json, os, subprocess, sys
+
+import pytest
+import server
+
+BACKEND = os.path.dirname(server.__file__)
+HEAVY = ["openai", "trafilatura", "bs4", "numpy", "PIL"]
+
+def test_heavy_modules_are_not_imported_at_startup():
+    probe = f"import json, sys, server; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND, capture_output=True, text=True,
+                         env={**os.environ, "ENABLE_EVENT_LOG": "0"}, check=True).stdout
+    assert json.loads(out.splitlines()[-1]) == []
+
+@pytest.fixture
+def warmup(monkeypatch):
+    state = {"ready": False, "steps": {}}
+    monkeypatch.setattr(server, "WARMUP", state)
+    return state
+
+def test_ready_answers_503_until_warmup_is_done(warmup, app_client):
+    assert app_client.get("/ready").status_code == 503
+    warmup["ready"] = True
+    assert app_client.get("/ready").get_json()["ready"] is True
+
+def test_failed_warmup_step_is_recorded_not_raised(warmup):
+    server._warmup_step("import numpy", lambda: __import__("numpy"))
+    server._warmup_step("connexion OpenAI", lambda: 1 / 0)
+    assert warmup["steps"]["import numpy"]["status"] == "ok"
+    assert warmup["steps"]["connexion OpenAI"]["status"].startswith("erreur")
@@ -0,0 +1,65 @@
+# Mémoïsation par étape (STEP_MEMO=1) : une étape n'est rejouée que si
+# son code (prompt compris), ses réglages ou ses entrées changent.
+
+import pytest
+import server
+
+@pytest.fixture
+def memo(monkeypatch):
+    """STEP_MEMO=1 ; renvoie la liste des exécutions réelles des étapes."""
+    monkeypatch.setattr(server, "ENABLE_STEP_MEMO", True)
+    return []
+
+def test_same_inputs_are_served_from_the_base(memo, app_client):
+    @server.memoized_step("test.resume")
+    def summarize(text):
+        memo.append(text)
+        return {"resume": text.upper()}
+
+    assert summarize("Armance Telier") == summarize("Armance Telier") == {"resume": "ARMANCE TELIER"}
+    assert summarize("Basile Ferrou") == {"resume": "BASILE FERROU"}
+    assert memo == ["Armance Telier", "Basile Ferrou"]
+    stats = app_client.get("/step-memo/stats").get_json()
+    assert stats["enabled"] and stats["steps"]["test.resume"] == {"step": "test.resume", "entries": 2, "hits": 1}
+
+def test_editing_the_prompt_replays_the_step(memo):
+    def make(prompt):
+        # Même nom, même signature : seule la constante du prompt change
+        if prompt == "v1":
+            def synthesis(axes):
+                memo.append("Résume en 3 phrases")
+                return "Résume en 3 phrases"
+        else:
+            def synthesis(axes):
+                memo.append("Résume en 2 phrases")
+                return "Résume en 2 phrases"
+        return server.memoized_step("test.synthese")(synthesis)
+
+    assert make("v1")({"a": 1}) == make("v1")({"a": 1}) == "Résume en 3 phrases"
+    assert make("v2")({"a": 1}) == "Résume en 2 phrases"
+    assert memo == ["Résume en 3 phrases", "Résume en 2 phrases"]
+
+def test_config_change_invalidates_and_ignored_params_do_not(memo):
+    settings = {"top_k": 3}
+
+    @server.memoized_step("test.recherche", config=lambda: settings["top_k"], ignore=("prefetch",))
+    def search(claims, prefetch=None):
+        memo.append(settings["top_k"])
+        return claims[:settings["top_k"]]
+
+    search(["a", "b", "c", "d"], prefetch=object())
+    search(["a", "b", "c", "d"], prefetch=object())
+    settings["top_k"] = 2
+    assert search(["a", "b", "c", "d"]) == ["a", "b"]
+    assert memo == [3, 2]
+
+def test_disabled_memo_always_runs(memo, monkeypatch):
+    monkeypatch.setattr(server, "ENABLE_STEP_MEMO", False)
+
+    @server.memoized_step("test.desactive")
+    def step(x):
+        memo.append(x)
+        return x
+
+    step(1), step(1)
+    assert memo == [1, 1]
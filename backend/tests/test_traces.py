@@ -0,0 +1,70 @@
+# Traces (section 0bis) : spans imbriqués autour de StepTimer, chemin
+# critique et vue /traces/<id>.
+
+import json
+
+import pytest
+import server
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Spans émis, décodés (au lieu du fichier de traces)."""
+    emitted = []
+
+    class Recorder:
+        def info(self, line):
+            emitted.append(json.loads(line))
+
+    monkeypatch.setattr(server, "ENABLE_TRACING", True)
+    monkeypatch.setattr(server, "trace_logger", Recorder())
+    return emitted
+
+def test_nested_spans_share_the_trace_and_know_their_parent(spans):
+    server.start_request_logging("trace-test-1")
+    with server.StepTimer("POST /analyze", cat="request") as root:
+        with server.StepTimer("Étape 4 - Recherche web") as step:
+            with server.StepTimer("cse.query", cat="search", q="retraites") as leaf:
+                leaf.set(hits=3)
+    by_name = {e["name"]: e for e in spans}
+    assert [e["name"] for e in spans] == ["cse.query", "Étape 4 - Recherche web", "POST /analyze"]
+    assert {e["args"]["trace_id"] for e in spans} == {"trace-test-1"}
+    assert by_name["POST /analyze"]["args"]["parent_id"] is None
+    assert by_name["Étape 4 - Recherche web"]["args"]["parent_id"] == root.span_id
+    assert by_name["cse.query"]["args"]["parent_id"] == step.span_id
+    assert by_name["cse.query"]["args"]["q"] == "retraites" and by_name["cse.query"]["args"]["hits"] == 3
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in spans)
+
+def test_failed_span_records_the_error_and_restores_the_parent(spans):
+    with pytest.raises(ValueError):
+        with server.StepTimer("llm.chat", cat="llm"):
+            raise ValueError("JSON invalide")
+    assert spans[0]["args"]["error"] == "ValueError: JSON invalide"
+    assert server.current_span_var.get() is None
+
+def _event(span_id, parent, ts, dur, trace="t-crit", name=None, cat="step"):
+    return {"name": name or span_id, "cat": cat, "ph": "X", "ts": ts, "dur": dur, "pid": 1, "tid": 1,
+            "args": {"trace_id": trace, "span_id": span_id, "parent_id": parent}}
+
+# Racine 0 → 100 ms ; "a" puis "c" en série, "b" en parallèle de "a" et plus court
+EVENTS = [
+    _event("root", None, 0, 100_000, name="POST /analyze", cat="request"),
+    _event("a", "root", 0, 60_000),
+    _event("b", "root", 10_000, 30_000),
+    _event("c", "root", 60_000, 40_000),
+    _event("a1", "a", 5_000, 50_000),
+]
+
+def test_critical_path_follows_the_latest_finishing_children():
+    assert server.critical_path(EVENTS) == {"root", "c", "a", "a1"}
+
+def test_trace_routes_read_the_trace_file(tmp_path, monkeypatch, app_client):
+    path = tmp_path / "traces.jsonl"
+    other = _event("x", None, 0, 5_000, trace="t-autre", cat="request")
+    path.write_text("".join(json.dumps(e) + "\n" for e in EVENTS + [other]))
+    monkeypatch.setattr(server, "TRACE_FILE", str(path))
+
+    assert [t["trace_id"] for t in app_client.get("/traces").get_json()] == ["t-autre", "t-crit"]
+    assert len(app_client.get("/traces/t-crit.json").get_json()["traceEvents"]) == 5
+    page = app_client.get("/traces/t-crit").get_data(as_text=True)
+    assert "POST /analyze" in page and page.count("#f39c12") == 4  # spans du chemin critique
+    assert app_client.get("/traces/inconnue").status_code == 404
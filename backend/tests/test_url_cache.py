@@ -0,0 +1,105 @@
+# Analyses d'URL fraîches / périmées-mais-servies (section 5octies).
+
+import threading, uuid
+
+import pytest
+import server
+from conftest import GENERIC_ANSWER
+
+ARTICLE = "Emmanuel Macron a nommé Nicolas Revel à la tête de la RATP. " * 20
+UPDATED = "Texte mis à jour : le gouvernement annonce une réforme des retraites. " * 20
+
+def _result(text):
+    """Réponse minimale du pipeline (de quoi construire la ligne d'historique ; score cohérent avec les notes)."""
+    return {"axes": GENERIC_ANSWER["axes"], "score_global": 77, "couleur_global": "🟢",
+            "resume": text[:20], "commentaire": ""}
+
+@pytest.fixture
+def swr(monkeypatch):
+    """Page et pipeline simulés ; pool de ré-extraction propre au test."""
+    page, pipeline_runs = {"text": ARTICLE}, []
+    monkeypatch.setattr(server, "extract_article_from_url", lambda url: page["text"])
+
+    def run_pipeline(text):
+        pipeline_runs.append(text)
+        return _result(text)
+
+    monkeypatch.setattr(server, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(server, "_revalidate_pool", None)
+    return page, pipeline_runs
+
+def _drain():
+    """Attend la fin des ré-extractions lancées."""
+    server.revalidate_pool().shutdown(wait=True)
+    server._revalidate_pool = None
+
+def _age(url, seconds):
+    server.db().execute("UPDATE url_analyses SET checked_at = checked_at - ? WHERE url = ?", (seconds, url))
+
+def _row(url):
+    return server.db().execute("SELECT * FROM url_analyses WHERE url = ?", (url,)).fetchone()
+
+@pytest.fixture
+def url():
+    return f"https://www.lemonde.fr/{uuid.uuid4().hex}.html"
+
+def test_fresh_then_expired(swr, url):
+    assert server.url_cache_get(url) is None
+    server.url_cache_store(url, ARTICLE, {"resume": "v1"})
+    assert server.url_cache_get(url) == {"resume": "v1"}
+    _age(url, server.URL_STALE_HOURS * 3600 + 1)
+    assert server.url_cache_get(url) is None
+    assert _row(url)["refreshing_since"] is None  # pas de ré-extraction pour une analyse expirée
+
+def test_stale_is_served_and_unchanged_text_only_refreshes(swr, url):
+    page, pipeline_runs = swr
+    server.url_cache_store(url, ARTICLE, {"resume": "v1"})
+    _age(url, server.URL_FRESH_MINUTES * 60 + 1)
+    checked = _row(url)["checked_at"]
+
+    assert server.url_cache_get(url) == {"resume": "v1"}  # servie tout de suite
+    _drain()
+    row = _row(url)
+    assert pipeline_runs == [] and row["refreshing_since"] is None
+    assert row["checked_at"] > checked  # redevenue fraîche
+
+def test_changed_text_replaces_the_analysis(swr, url):
+    page, pipeline_runs = swr
+    server.url_cache_store(url, ARTICLE, {"resume": "v1"})
+    _age(url, server.URL_FRESH_MINUTES * 60 + 1)
+    page["text"] = UPDATED
+
+    assert server.url_cache_get(url) == {"resume": "v1"}
+    _drain()
+    assert pipeline_runs == [UPDATED[:8000]]
+    assert server.url_cache_get(url) == _result(UPDATED[:8000])
+    assert _row(url)["content_sha"] == server.text_sha(UPDATED[:8000])
+
+def test_one_revalidation_at_a_time(swr, url, monkeypatch):
+    page, pipeline_runs = swr
+    release, extractions = threading.Event(), []
+
+    def slow_extract(u):
+        extractions.append(u)
+        release.wait(5)
+        return UPDATED
+
+    monkeypatch.setattr(server, "extract_article_from_url", slow_extract)
+    server.url_cache_store(url, ARTICLE, {"resume": "v1"})
+    _age(url, server.URL_FRESH_MINUTES * 60 + 1)
+    for _ in range(4):
+        assert server.url_cache_get(url) == {"resume": "v1"}
+    release.set()
+    _drain()
+    assert extractions == [url] and len(pipeline_runs) == 1
+
+def test_failed_extraction_keeps_the_stale_analysis(swr, url):
+    page, pipeline_runs = swr
+    server.url_cache_store(url, ARTICLE, {"resume": "v1"})
+    _age(url, server.URL_FRESH_MINUTES * 60 + 1)
+    page["text"] = "trop court"
+    server.url_cache_get(url)
+    _drain()
+    row = _row(url)
+    assert pipeline_runs == [] and row["refreshing_since"] is None
+    assert server.url_cache_get(url) == {"resume": "v1"}
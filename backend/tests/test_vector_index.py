@@ -0,0 +1,50 @@
+# Index vectoriel des passages du corpus (section 3quater).
+
+import pytest
+import server
+
+RETRAITES = ("Le Conseil constitutionnel a validé vendredi l'essentiel de la réforme des retraites, "
+             "dont le report de l'âge légal de départ à 64 ans, malgré la mobilisation syndicale.")
+FOOTBALL = ("Le club lyonnais s'est imposé trois buts à un face à Marseille dimanche soir, "
+            "grâce à un doublé de son attaquant en seconde période au Groupama Stadium.")
+METEO = ("Un épisode de fortes pluies est attendu sur le sud-est, Météo-France a placé "
+         "quatre départements en vigilance orange pour les orages et les inondations.")
+
+@pytest.fixture
+def vectors(tmp_path, monkeypatch):
+    """Matrice vide dans un fichier du test, passages de la base effacés."""
+    monkeypatch.setattr(server, "VECTOR_FILE", str(tmp_path / "vectors.f32"))
+    monkeypatch.setattr(server, "_vector_map", {"rows": 0, "matrix": None})
+    server.db().execute("DELETE FROM vector_passages")
+    server.vector_add_articles([
+        {"url": "https://www.lemonde.fr/retraites", "title": "Retraites", "text": RETRAITES},
+        {"url": "https://www.lequipe.fr/ol-om", "title": "Ligue 1", "text": FOOTBALL},
+        {"url": "https://www.francetvinfo.fr/meteo", "title": "Météo", "text": METEO},
+    ])
+
+def test_each_query_gets_its_closest_passage(vectors):
+    results = server.vector_search(["l'âge de départ à la retraite repoussé à 64 ans",
+                                    "vigilance orange orages dans le sud-est"], k=1)
+    assert [[h["url"] for h in hits] for hits in results] == [
+        ["https://www.lemonde.fr/retraites"], ["https://www.francetvinfo.fr/meteo"]]
+    assert results[0][0]["texte"] == RETRAITES and results[0][0]["score"] >= server.VECTOR_MIN_SCORE
+
+def test_unrelated_query_returns_nothing(vectors):
+    assert server.vector_search(["xylophone zeppelin quokka"]) == [[]]
+    assert server.vector_search([]) == []
+
+def test_block_scan_matches_a_single_pass(vectors, monkeypatch):
+    queries = ["réforme des retraites validée", "doublé de l'attaquant lyonnais"]
+    whole = server.vector_search(queries, k=2)
+    monkeypatch.setattr(server, "VECTOR_SCAN_BLOCK", 1)
+    assert server.vector_search(queries, k=2) == whole
+
+def test_updated_article_replaces_its_passages(vectors):
+    query = ["Conseil constitutionnel réforme des retraites"]
+    assert server.vector_search(query, k=1)[0][0]["texte"] == RETRAITES
+    corrected = RETRAITES.replace("vendredi", "jeudi soir")
+    server.vector_add_articles([{"url": "https://www.lemonde.fr/retraites", "title": "Retraites", "text": corrected}])
+    # La matrice a grandi : elle est ré-ouverte, l'ancienne ligne ne pointe plus sur rien
+    hits = server.vector_search(query, k=3)[0]
+    assert [h["texte"] for h in hits if h["url"].endswith("/retraites")] == [corrected]
+    assert server._vector_map["rows"] == 4
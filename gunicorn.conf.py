@@ -0,0 +1,50 @@
+# =============================================================
+# 🟦 De Facto — Configuration gunicorn (production)
+# =============================================================
+# Une analyse = ~8 appels réseau (OpenAI, Google CSE, sites d'info) :
+# le worker passe presque tout son temps à ATTENDRE. Avec les workers
+# "sync" par défaut, un worker = une analyse à la fois.
+# Ici : workers "gthread" → chaque processus traite plusieurs analyses
+# en parallèle dans des threads (l'attente réseau libère le GIL).
+#
+# Tout est réglable par variables d'environnement.
+# Lancement : gunicorn --config gunicorn.conf.py backend.server:app
+# =============================================================
+
+import multiprocessing
+import os
+import sys
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+reuse_port = True
+
+# ⚙️ Processus × threads : peu de processus (CPU), beaucoup de threads (attente I/O)
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2, 4)))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# ⏱️ Une analyse complète peut durer 60 à 90 s : on laisse de la marge
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+# 🛬 À l'arrêt (déploiement, scale-down) : on laisse finir les analyses en cours
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "150"))
+
+# 🔌 Keep-alive un peu plus long que le délai d'inactivité du proxy devant nous,
+# pour que ce soit toujours le proxy qui ferme la connexion (pas de 502)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "65"))
+
+# ♻️ Recyclage régulier des workers (fuites mémoire éventuelles), étalé dans le temps
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# 🚀 L'app est importée UNE fois dans le master puis partagée par fork :
+# démarrage plus rapide et mémoire commune. Les ressources non partageables
+# (threads de logs, client OpenAI) sont recréées dans post_fork.
+preload_app = True
+
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    app_module = sys.modules.get("backend.server")
+    if app_module is not None:
+        app_module.reset_after_fork()